@@ -0,0 +1,32 @@
+"""Add composite indexes for hot user_content and streaming_availability lookups
+
+(user_id, content_id) lookups are already served by the _user_content_uc
+unique constraint, so no separate index is added for them.
+
+Revision ID: 1f05d11d4b76
+Revises: bb885ddc6164
+Create Date: 2026-10-18 10:12:40.118392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f05d11d4b76'
+down_revision: Union[str, Sequence[str], None] = 'bb885ddc6164'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_index('ix_streaming_availability_content_region', 'streaming_availability', ['content_id', 'region'], unique=False)
+    op.create_index('ix_user_content_user_updated', 'user_content', ['user_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_user_content_user_status_updated', 'user_content', ['user_id', 'status', 'updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_content_user_status_updated', table_name='user_content')
+    op.drop_index('ix_user_content_user_updated', table_name='user_content')
+    op.drop_index('ix_streaming_availability_content_region', table_name='streaming_availability')
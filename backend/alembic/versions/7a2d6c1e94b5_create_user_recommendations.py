@@ -0,0 +1,41 @@
+"""Create user_recommendations for the offline batch recommendation job
+
+Revision ID: 7a2d6c1e94b5
+Revises: c4e81a9d3f27
+Create Date: 2026-10-18 16:21:47.730912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2d6c1e94b5'
+down_revision: Union[str, Sequence[str], None] = 'c4e81a9d3f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table('user_recommendations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('content_id', sa.Integer(), nullable=False),
+    sa.Column('region', sa.String(length=10), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('run_id', sa.String(length=32), nullable=False),
+    sa.Column('generated_at', sa.TIMESTAMP(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['content_id'], ['content.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'region', 'rank', name='_user_recommendation_rank_uc')
+    )
+    op.create_index(op.f('ix_user_recommendations_id'), 'user_recommendations', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_recommendations_id'), table_name='user_recommendations')
+    op.drop_table('user_recommendations')
@@ -0,0 +1,25 @@
+"""Add users.last_login index for the recommendation warmer's recently-active scan
+
+Revision ID: c4e81a9d3f27
+Revises: 1f05d11d4b76
+Create Date: 2026-10-18 15:02:11.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e81a9d3f27'
+down_revision: Union[str, Sequence[str], None] = '1f05d11d4b76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_users_last_login'), 'users', ['last_login'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_users_last_login'), table_name='users')
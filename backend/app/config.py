@@ -15,6 +15,115 @@ class Settings(BaseSettings):
     TMDB_API_KEY: Optional[str] = None
     WATCHMODE_API_KEY: Optional[str] = None
     
+    # TMDB HTTP client
+    TMDB_BASE_URL: str = "https://api.themoviedb.org/3"
+    TMDB_POOL_SIZE: int = 20
+    TMDB_POOL_BLOCK: bool = False
+    TMDB_CONNECT_TIMEOUT: float = 3.05
+    TMDB_READ_TIMEOUT: float = 10
+    TMDB_ASYNC_MAX_CONNECTIONS: int = 100
+    
+    # TMDB outbound governor (rate in requests per second per process, times in seconds)
+    TMDB_RATE_LIMIT: float = 40
+    TMDB_RATE_BURST: float = 40
+    TMDB_RATE_LIMIT_MAX_WAIT: float = 2
+    TMDB_RETRIES: int = 2
+    TMDB_RETRY_BASE_DELAY: float = 0.25
+    TMDB_RETRY_MAX_DELAY: float = 4
+    TMDB_BREAKER_FAILURES: int = 5
+    TMDB_BREAKER_RESET: float = 30
+    
+    # TMDB response cache (TTLs in seconds)
+    TMDB_SEARCH_CACHE_TTL: int = 600
+    TMDB_TRENDING_CACHE_TTL: int = 3600
+    TMDB_CACHE_MAX_ENTRIES: int = 2048
+    TMDB_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    TMDB_PROVIDERS_CACHE_TTL: int = 60 * 60
+    # How long past its TTL a cached response may still be served while TMDB is failing
+    TMDB_CACHE_STALE_TTL: int = 24 * 60 * 60
+    
+    # Cache shared by every worker on the host (off when unset: each worker caches in memory),
+    # sqlite:///path/to/cache.db or redis://[:password@]host:port/db; timeout in seconds
+    CACHE_URL: Optional[str] = None
+    CACHE_TIMEOUT: float = 0.1
+    CACHE_MAX_ENTRIES: int = 200000
+    
+    # TMDB daily ID export ingestion (rate in TMDB requests per second)
+    TMDB_EXPORT_BASE_URL: str = "https://files.tmdb.org/p/exports"
+    TMDB_EXPORT_DIR: str = "var/tmdb_exports"
+    TMDB_INGEST_BATCH_SIZE: int = 1000
+    TMDB_INGEST_CONCURRENCY: int = 20
+    
+    # Streaming availability
+    AVAILABILITY_BATCH_MAX_ITEMS: int = 100
+    AVAILABILITY_REFRESH_WORKERS: int = 8
+    
+    # Background availability refresher (rates in TMDB requests per second)
+    AVAILABILITY_BACKGROUND_REFRESH: bool = True
+    AVAILABILITY_BACKGROUND_WORKERS: int = 2
+    AVAILABILITY_REFRESH_RATE: float = 5
+    AVAILABILITY_REFRESH_BURST: float = 10
+    AVAILABILITY_SCAN_INTERVAL: int = 300
+    AVAILABILITY_SCAN_LIMIT: int = 200
+    AVAILABILITY_REFRESH_AHEAD: int = 24 * 60 * 60
+    
+    # Authenticated user cache (TTL in seconds). Per worker: a change to a user's row is seen at once
+    # by the worker that made it and within AUTH_USER_CACHE_TTL by the others
+    AUTH_USER_CACHE_TTL: int = 60
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Ratings list
+    RATINGS_COUNT_ESTIMATE_CAP: int = 10000
+    
+    # Recommender (model TTL and Retry-After in seconds); the first model is built at startup, 503 until then
+    RECOMMENDER_NEIGHBORS: int = 50
+    RECOMMENDER_SHRINKAGE: float = 10
+    RECOMMENDER_MODEL_TTL: int = 60 * 60
+    RECOMMENDER_BUILD_AT_STARTUP: bool = True
+    RECOMMENDER_RETRY_AFTER: int = 30
+    # Shared memory-mapped model versions published by jobs/publish_model (off when unset; poll interval in seconds)
+    RECOMMENDER_ARTIFACT_DIR: Optional[str] = None
+    RECOMMENDER_ARTIFACT_POLL: int = 5
+    RECOMMENDER_ARTIFACT_KEEP: int = 3
+    
+    # Rating events that update the serving model between rebuilds; ignored with RECOMMENDER_ARTIFACT_DIR set
+    RECOMMENDER_INCREMENTAL_UPDATES: bool = True
+    RATING_EVENTS_MAX_BATCH: int = 500
+    RATING_EVENTS_MAX_QUEUE: int = 100000
+    
+    # Per-user recommendation cache and warmer (TTL and windows in seconds, rate in users per second)
+    RECOMMENDATION_CACHE_SIZE: int = 100
+    RECOMMENDATION_CACHE_MAX_ENTRIES: int = 50000
+    RECOMMENDATION_CACHE_TTL: int = 15 * 60
+    RECOMMENDATION_WARM: bool = True
+    RECOMMENDATION_WARM_REGION: str = "US"
+    RECOMMENDATION_WARM_ACTIVE_WINDOW: int = 7 * 24 * 60 * 60
+    RECOMMENDATION_WARM_LIMIT: int = 1000
+    RECOMMENDATION_WARM_INTERVAL: int = 5 * 60
+    RECOMMENDATION_WARM_RATE: float = 20
+    
+    # Offline batch recommendation job (checkpoints and model snapshots; max age of served rows in seconds)
+    BATCH_RECOMMENDATIONS_DIR: str = "var/batch_recommendations"
+    BATCH_RECOMMENDATIONS_MAX_AGE: int = 2 * 24 * 60 * 60
+    
+    # ALS matrix factorization
+    ALS_FACTORS: int = 64
+    ALS_REGULARIZATION: float = 1.0
+    ALS_ALPHA: float = 1.0
+    ALS_ITERATIONS: int = 15
+    
+    # Local catalog search (TTL in seconds); fewer local matches than the minimum go to TMDB
+    SEARCH_LOCAL: bool = True
+    SEARCH_LOCAL_MIN_RESULTS: int = 5
+    SEARCH_INDEX_TTL: int = 60 * 60
+    # Typeahead index snapshot, loaded at startup so suggestions work before the first build (off when unset)
+    SUGGEST_SNAPSHOT_DIR: Optional[str] = None
+    
+    # Content similarity ("more like this"); the index is built at startup, Retry-After (seconds) is sent until then
+    SIMILAR_CONTENT_NEIGHBORS: int = 50
+    SIMILAR_CONTENT_BUILD_AT_STARTUP: bool = True
+    SIMILAR_CONTENT_RETRY_AFTER: int = 15
+    
     # CORS
     FRONTEND_URL: str = "http://localhost:3000"
     
@@ -0,0 +1,270 @@
+"""Offline batch recommendations: train once, score every user across a process pool.
+
+    python -m app.jobs.batch_recommendations --workers 8
+    python -m app.jobs.batch_recommendations --model als
+    python -m app.jobs.batch_recommendations --resume            # continue the last unfinished run
+
+The run directory holds the trained model (memory-mapped by every worker),
+the user ids being scored and progress.json listing finished shards. Each
+shard replaces its users' rows in user_recommendations in one transaction,
+so a shard interrupted half way is simply scored again on resume.
+
+Requests with available_only are answered from these rows (see
+recommendation_service._precomputed_rank) until the user rates something
+or changes platforms, or the rows are BATCH_RECOMMENDATIONS_MAX_AGE old.
+"""
+import argparse
+import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from multiprocessing import get_all_start_methods, get_context
+from typing import Optional
+import numpy as np
+from sqlalchemy import insert
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.jobs.checkpoint import read_json, write_json
+from app.models.user import User
+from app.models.user_content import UserContent
+from app.models.user_platform import UserPlatform
+from app.models.user_recommendation import UserRecommendation
+from app.recommender.als import ALS
+from app.recommender.interactions import interaction_value
+from app.recommender.item_knn import ItemKNN
+from app.services import streaming_service
+from app.services.recommendation_service import load_interactions
+
+PROGRESS_FILE = "progress.json"
+
+# Per-worker state, set up once by _init_worker
+_worker: dict = {}
+
+
+def _new_model(kind: str):
+    if kind == "als":
+        return ALS(
+            factors=settings.ALS_FACTORS,
+            regularization=settings.ALS_REGULARIZATION,
+            alpha=settings.ALS_ALPHA,
+            iterations=settings.ALS_ITERATIONS
+        )
+    return ItemKNN(neighbors=settings.RECOMMENDER_NEIGHBORS, shrinkage=settings.RECOMMENDER_SHRINKAGE)
+
+
+def _load_model(kind: str, directory: str):
+    if kind == "als":
+        return ALS.load(directory, regularization=settings.ALS_REGULARIZATION, alpha=settings.ALS_ALPHA)
+    return ItemKNN.load(directory)
+
+
+def _write_progress(run_dir: str, progress: dict):
+    write_json(os.path.join(run_dir, PROGRESS_FILE), progress)
+
+
+def _read_progress(run_dir: str) -> dict:
+    return read_json(os.path.join(run_dir, PROGRESS_FILE))
+
+
+def _latest_unfinished(checkpoint_dir: str) -> Optional[str]:
+    runs = []
+    for name in os.listdir(checkpoint_dir) if os.path.isdir(checkpoint_dir) else []:
+        run_dir = os.path.join(checkpoint_dir, name)
+        if os.path.exists(os.path.join(run_dir, PROGRESS_FILE)):
+            progress = _read_progress(run_dir)
+            if not progress.get("finished_at"):
+                runs.append((progress["started_at"], run_dir))
+    return max(runs)[1] if runs else None
+
+
+def prepare_run(
+    checkpoint_dir: str,
+    model_kind: str,
+    region: str,
+    top_n: int,
+    shard_size: int,
+    chunk_size: int
+) -> str:
+    """Train the model and snapshot the users to score; returns the run directory"""
+    run_id = uuid.uuid4().hex
+    run_dir = os.path.join(checkpoint_dir, run_id)
+    os.makedirs(run_dir)
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        interactions = load_interactions(db, chunk_size=chunk_size)
+        print(f"loaded {len(interactions[0])} interactions in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        model = _new_model(model_kind)
+        model.fit(*interactions)
+        model.save(os.path.join(run_dir, "model"))
+        print(f"trained {model_kind} on {model.n_items} items in {time.perf_counter() - start:.1f}s")
+
+        user_ids = np.fromiter(
+            (user_id for (user_id,) in db.query(User.id).order_by(User.id).yield_per(chunk_size)),
+            dtype=np.int64
+        )
+        np.save(os.path.join(run_dir, "users.npy"), user_ids)
+    finally:
+        db.close()
+
+    _write_progress(run_dir, {
+        "run_id": run_id,
+        "model": model_kind,
+        "region": region,
+        "top_n": top_n,
+        "shard_size": shard_size,
+        "users": len(user_ids),
+        "shards": -(-len(user_ids) // shard_size),
+        "done": [],
+        "started_at": time.time(),
+        "finished_at": None
+    })
+    return run_dir
+
+
+def _init_worker(run_dir: str, model_kind: str, region: str, top_n: int):
+    # Connections inherited from the parent must not be shared across processes
+    engine.dispose(close=False)
+    db = SessionLocal()
+    try:
+        streaming_service.build_platform_index(db)
+    finally:
+        db.close()
+
+    _worker.update(
+        run_id=os.path.basename(run_dir),
+        model=_load_model(model_kind, os.path.join(run_dir, "model")),
+        users=np.load(os.path.join(run_dir, "users.npy"), mmap_mode="r"),
+        region=region,
+        top_n=top_n
+    )
+
+
+def _score_shard(shard: tuple[int, int, int]) -> tuple[int, int, int, float]:
+    index, start, stop = shard
+    began = time.perf_counter()
+    model, region, top_n = _worker["model"], _worker["region"], _worker["top_n"]
+    user_ids = [int(user_id) for user_id in _worker["users"][start:stop]]
+
+    db = SessionLocal()
+    try:
+        # One range query per shard for interactions and platforms, grouped in memory
+        interactions = defaultdict(list)
+        for user_id, content_id, rating, status in db.query(
+            UserContent.user_id, UserContent.content_id, UserContent.rating, UserContent.status
+        ).filter(UserContent.user_id.between(user_ids[0], user_ids[-1])):
+            interactions[user_id].append((content_id, interaction_value(rating, status)))
+
+        platforms = defaultdict(list)
+        for user_id, platform_id in db.query(UserPlatform.user_id, UserPlatform.platform_id).filter(
+            UserPlatform.user_id.between(user_ids[0], user_ids[-1])
+        ):
+            platforms[user_id].append(platform_id)
+
+        rows = []
+        # Client-side UTC like user_content.updated_at, which _precomputed_rank compares it with
+        generated_at = datetime.utcnow()
+        for user_id in user_ids:
+            history = interactions.get(user_id, [])
+            scored = [(content_id, value) for content_id, value in history if value is not None]
+            allowed = None
+            user_mask = streaming_service.platform_index.mask_for(platforms.get(user_id, []))
+            if user_mask:
+                allowed = streaming_service.platform_index.available(region, model.item_ids, user_mask)
+
+            recommended, scores = model.recommend(
+                [content_id for content_id, _ in scored],
+                [value for _, value in scored],
+                k=top_n,
+                exclude=[content_id for content_id, _ in history],
+                allowed=allowed
+            )
+            rows.extend(
+                {"user_id": user_id, "content_id": content_id, "region": region,
+                 "rank": rank, "score": score, "run_id": _worker["run_id"], "generated_at": generated_at}
+                for rank, (content_id, score) in enumerate(zip(recommended.tolist(), scores.tolist()), start=1)
+            )
+
+        db.query(UserRecommendation).filter(
+            UserRecommendation.user_id.in_(user_ids),
+            UserRecommendation.region == region
+        ).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(UserRecommendation), rows)
+        db.commit()
+    finally:
+        db.close()
+
+    return index, len(user_ids), len(rows), time.perf_counter() - began
+
+
+def run(run_dir: str, workers: int):
+    progress = _read_progress(run_dir)
+    done = set(progress["done"])
+    shard_size = progress["shard_size"]
+    shards = [
+        (index, index * shard_size, min((index + 1) * shard_size, progress["users"]))
+        for index in range(progress["shards"]) if index not in done
+    ]
+    print(f"run {progress['run_id']}: {len(shards)} of {progress['shards']} shards to score with {workers} workers")
+
+    # fork shares the imported modules; the model itself is memory-mapped either way
+    context = get_context("fork" if "fork" in get_all_start_methods() else "spawn")
+    started, users_scored, rows_written = time.perf_counter(), 0, 0
+    with context.Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(run_dir, progress["model"], progress["region"], progress["top_n"])
+    ) as pool:
+        for index, users, rows, seconds in pool.imap_unordered(_score_shard, shards):
+            done.add(index)
+            progress["done"] = sorted(done)
+            _write_progress(run_dir, progress)
+
+            users_scored += users
+            rows_written += rows
+            elapsed = time.perf_counter() - started
+            rate = users_scored / elapsed
+            remaining = progress["users"] - min(len(done) * shard_size, progress["users"])
+            print(
+                f"shard {index}: {users} users in {seconds:.1f}s | {len(done)}/{progress['shards']} shards, "
+                f"{rate:.0f} users/s, {rows_written} rows, eta {remaining / rate if rate else 0:.0f}s"
+            )
+
+    progress["finished_at"] = time.time()
+    _write_progress(run_dir, progress)
+    print(f"run {progress['run_id']} finished: {users_scored} users in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", choices=("item_knn", "als"), default="item_knn")
+    parser.add_argument("--region", default="US")
+    parser.add_argument("--top-n", type=int, default=settings.RECOMMENDATION_CACHE_SIZE)
+    parser.add_argument("--shard-size", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per fetch while streaming user_content")
+    parser.add_argument("--checkpoint-dir", default=settings.BATCH_RECOMMENDATIONS_DIR)
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="RUN_ID",
+                        help="continue a run (the latest unfinished one if no id is given)")
+    args = parser.parse_args()
+
+    if args.resume:
+        if args.resume == "latest":
+            run_dir = _latest_unfinished(args.checkpoint_dir)
+        else:
+            run_dir = os.path.join(args.checkpoint_dir, args.resume)
+        if not run_dir or not os.path.exists(os.path.join(run_dir, PROGRESS_FILE)):
+            parser.error("no run to resume")
+    else:
+        run_dir = prepare_run(args.checkpoint_dir, args.model, args.region, args.top_n, args.shard_size, args.chunk_size)
+
+    run(run_dir, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import json
+import os
+from typing import Any
+
+
+def write_json(path: str, data: Any):
+    """Write JSON through a temporary file and os.replace, so a crash never leaves a half-written checkpoint"""
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
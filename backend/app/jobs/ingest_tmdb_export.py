@@ -0,0 +1,231 @@
+"""Bulk catalog ingestion from TMDB's daily ID exports.
+
+    python -m app.jobs.ingest_tmdb_export --media-type movie --date 10_18_2026
+    python -m app.jobs.ingest_tmdb_export --media-type tv --file mirror/tv_series_ids_10_18_2026.json.gz
+    python -m app.jobs.ingest_tmdb_export --media-type movie --date 10_18_2026 --resume
+
+An export is a gzipped file of JSON lines, one {"id", "adult", "popularity", ...}
+per title. It is streamed line by line; ids are taken in batches, the ones
+not already in content are fetched from TMDB by a bounded number of
+concurrent requests through the TMDB client's governor, and each batch is upserted in one
+statement. After every batch the number of lines consumed is checkpointed,
+so --resume skips straight past work already committed.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+from itertools import islice
+from typing import Iterator, Optional
+import aiohttp
+from app.config import settings
+from app.database import SessionLocal
+from app.jobs.checkpoint import read_json, write_json
+from app.models.content import Content
+from app.services import tmdb_client, tmdb_service
+from app.utils.rate_limit import TokenBucket
+
+EXPORT_NAMES = {"movie": "movie_ids", "tv": "tv_series_ids"}
+
+# Times a fetch waits for an open TMDB circuit to close before counting as failed
+CIRCUIT_WAITS = 3
+
+
+def export_url(media_type: str, date: str) -> str:
+    return f"{settings.TMDB_EXPORT_BASE_URL}/{EXPORT_NAMES[media_type]}_{date}.json.gz"
+
+
+def download_export(url: str, directory: str) -> str:
+    """Stream an export into `directory` unless it is already there; returns the local path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, url.rsplit("/", 1)[-1])
+    if os.path.exists(path):
+        return path
+
+    with tmdb_client.get_session().get(url, stream=True, timeout=tmdb_client.default_timeout()) as response:
+        response.raise_for_status()
+        with open(path + ".tmp", "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def read_export(path: str, skip: int = 0) -> Iterator[tuple[int, Optional[dict]]]:
+    """(line number, entry) for each line after the first `skip`; malformed lines yield None"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for number, line in enumerate(islice(f, skip, None), start=skip + 1):
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+
+async def _fetch_details(
+    media_type: str,
+    tmdb_id: int,
+    semaphore: asyncio.Semaphore,
+    counts: dict
+) -> tuple[str, Optional[dict]]:
+    """("ok", payload), ("missing", None) for titles deleted since the export, or ("failed", None)"""
+    url = f"{tmdb_service.TMDB_BASE_URL}/{media_type}/{tmdb_id}"
+    params = {"api_key": settings.TMDB_API_KEY, "append_to_response": "credits,videos"}
+
+    # The client's governor rate limits and retries; an open circuit pauses this title until it resets
+    async with semaphore:
+        for _ in range(CIRCUIT_WAITS + 1):
+            counts["requests"] += 1
+            try:
+                return "ok", await tmdb_client.aget_json(url, params=params)
+            except tmdb_client.TMDBUnavailableError:
+                await asyncio.sleep(max(tmdb_client.governor.breaker.retry_after(), 1))
+            except aiohttp.ClientResponseError as e:
+                return ("missing" if e.status == 404 else "failed"), None
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return "failed", None
+    return "failed", None
+
+
+def _existing_ids(ids: list[int]) -> set[int]:
+    db = SessionLocal()
+    try:
+        return {content_id for (content_id,) in db.query(Content.id).filter(Content.id.in_(ids))}
+    finally:
+        db.close()
+
+
+def _store(rows: list[dict]):
+    db = SessionLocal()
+    try:
+        tmdb_service.upsert_content(db, rows)
+    finally:
+        db.close()
+
+
+async def ingest(
+    path: str,
+    media_type: str,
+    checkpoint: str,
+    resume: bool,
+    batch_size: int,
+    concurrency: int,
+    rate: float,
+    min_popularity: float,
+    limit: Optional[int]
+) -> dict:
+    progress = read_json(checkpoint) if resume else None
+    if progress is None:
+        progress = {
+            "file": os.path.abspath(path),
+            "media_type": media_type,
+            "lines": 0,
+            "stored": 0,
+            "skipped": 0,
+            "missing": 0,
+            "failed": 0,
+            "failed_ids": [],
+            "started_at": time.time(),
+            "finished_at": None
+        }
+    elif progress["finished_at"]:
+        print(f"{path} was already ingested")
+        return progress
+    else:
+        print(f"resuming {path} after line {progress['lines']}")
+
+    # A bulk run gets its own request rate rather than the API's share
+    tmdb_client.governor.bucket = TokenBucket(rate, capacity=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"requests": 0}
+    started, fetched_this_run = time.perf_counter(), 0
+
+    entries = read_export(path, skip=progress["lines"])
+    try:
+        while limit is None or progress["lines"] < limit:
+            take = batch_size if limit is None else min(batch_size, limit - progress["lines"])
+            batch = list(islice(entries, take))
+            if not batch:
+                progress["finished_at"] = time.time()
+                break
+            batch_started = time.perf_counter()
+
+            wanted = [
+                entry["id"] for _, entry in batch
+                if entry and not entry.get("adult") and (entry.get("popularity") or 0) >= min_popularity
+            ]
+            existing = await asyncio.to_thread(_existing_ids, wanted) if wanted else set()
+            to_fetch = [tmdb_id for tmdb_id in wanted if tmdb_id not in existing]
+
+            results = await asyncio.gather(*(
+                _fetch_details(media_type, tmdb_id, semaphore, counts) for tmdb_id in to_fetch
+            ))
+            rows = [
+                tmdb_service.build_content_values(tmdb_id, media_type, payload)
+                for tmdb_id, (outcome, payload) in zip(to_fetch, results) if outcome == "ok"
+            ]
+            if rows:
+                await asyncio.to_thread(_store, rows)
+
+            # Only checkpoint once the batch is committed, so a crash re-reads it rather than losing it
+            failed = [tmdb_id for tmdb_id, (outcome, _) in zip(to_fetch, results) if outcome == "failed"]
+            progress["lines"] = batch[-1][0]
+            progress["stored"] += len(rows)
+            progress["skipped"] += len(batch) - len(to_fetch)
+            progress["missing"] += sum(outcome == "missing" for outcome, _ in results)
+            progress["failed"] += len(failed)
+            progress["failed_ids"].extend(failed)
+            write_json(checkpoint, progress)
+
+            fetched_this_run += len(rows)
+            elapsed = time.perf_counter() - started
+            print(
+                f"line {progress['lines']}: {len(to_fetch)} fetched, {len(rows)} stored, {len(failed)} failed "
+                f"in {time.perf_counter() - batch_started:.1f}s | {progress['stored']} stored total, "
+                f"{counts['requests'] / elapsed:.1f} req/s, {fetched_this_run / elapsed:.1f} titles/s"
+            )
+    finally:
+        entries.close()
+        await tmdb_client.aclose_session()
+
+    write_json(checkpoint, progress)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--media-type", choices=("movie", "tv"), required=True)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="local export (.json.gz or plain JSON lines)")
+    source.add_argument("--date", help="download the export for this date, MM_DD_YYYY")
+    parser.add_argument("--export-dir", default=settings.TMDB_EXPORT_DIR, help="downloads and checkpoints")
+    parser.add_argument("--batch-size", type=int, default=settings.TMDB_INGEST_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.TMDB_INGEST_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=settings.TMDB_RATE_LIMIT, help="TMDB requests per second")
+    parser.add_argument("--min-popularity", type=float, default=0, help="skip titles less popular than this")
+    parser.add_argument("--limit", type=int, help="stop after this many lines of the export")
+    parser.add_argument("--resume", action="store_true", help="continue from this export's checkpoint")
+    args = parser.parse_args()
+
+    if not settings.TMDB_API_KEY:
+        parser.error("TMDB_API_KEY is not configured")
+
+    path = args.file or download_export(export_url(args.media_type, args.date), args.export_dir)
+    os.makedirs(args.export_dir, exist_ok=True)
+    checkpoint = os.path.join(args.export_dir, os.path.basename(path) + ".progress.json")
+
+    started = time.perf_counter()
+    progress = asyncio.run(ingest(
+        path, args.media_type, checkpoint, args.resume, args.batch_size, args.concurrency,
+        args.rate, args.min_popularity, args.limit
+    ))
+    print(
+        f"{progress['lines']} lines: {progress['stored']} stored, {progress['skipped']} skipped, "
+        f"{progress['missing']} missing, {progress['failed']} failed in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Train the recommender and publish it as a new artifact version for the API workers to swap to.
+
+    RECOMMENDER_ARTIFACT_DIR=/var/lib/recommender python -m app.jobs.publish_model
+
+Workers with the same RECOMMENDER_ARTIFACT_DIR pick the new version up
+within RECOMMENDER_ARTIFACT_POLL seconds. They never train themselves, so
+run this on a schedule (every RECOMMENDER_MODEL_TTL, say) and once before
+the first deploy.
+"""
+import argparse
+from app.config import settings
+from app.database import SessionLocal
+from app.recommender.artifacts import ArtifactStore
+from app.services import recommendation_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--artifact-dir", default=settings.RECOMMENDER_ARTIFACT_DIR)
+    args = parser.parse_args()
+    if not args.artifact_dir:
+        parser.error("set RECOMMENDER_ARTIFACT_DIR or pass --artifact-dir")
+
+    recommendation_service.artifact_store = ArtifactStore(args.artifact_dir, keep=settings.RECOMMENDER_ARTIFACT_KEEP)
+    db = SessionLocal()
+    try:
+        model = recommendation_service.build_model(db)
+    finally:
+        db.close()
+    print(f"published {recommendation_service.stats()['artifact_version']} ({model.n_items} items)")
+
+
+if __name__ == "__main__":
+    main()
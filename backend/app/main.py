@@ -1,13 +1,50 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.routes import auth, user, content
+from app.services import (
+    async_tmdb_service,
+    recommendation_service,
+    search_service,
+    similarity_service,
+    streaming_service,
+    tmdb_client,
+    tmdb_service
+)
+from app.utils import jwt_utils
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.AVAILABILITY_BACKGROUND_REFRESH:
+        streaming_service.availability_refresher.start()
+    if recommendation_service.incremental_updates:
+        recommendation_service.rating_events.start()
+    if settings.RECOMMENDATION_WARM:
+        recommendation_service.recommendation_warmer.start()
+    if settings.SEARCH_LOCAL:
+        search_service.load_suggest_snapshot()
+        search_service.start_build()
+    if settings.SIMILAR_CONTENT_BUILD_AT_STARTUP:
+        similarity_service.start_build()
+    if settings.RECOMMENDER_BUILD_AT_STARTUP:
+        recommendation_service.start_build()
+    yield
+    streaming_service.availability_refresher.stop()
+    recommendation_service.rating_events.stop()
+    recommendation_service.recommendation_warmer.stop()
+    # Release pooled TMDB connections on shutdown
+    tmdb_client.close_session()
+    await tmdb_client.aclose_session()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Streaming Recommender API",
     description="Personalized streaming recommendations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -31,6 +68,23 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "tmdb": tmdb_service.stats(),
+        "tmdb_async": {"content_fetches": async_tmdb_service.content_fetches.stats()},
+        "tmdb_governor": tmdb_client.governor.stats(),
+        "availability_refresher": streaming_service.availability_refresher.stats(),
+        "auth_user_cache": jwt_utils.user_cache.stats(),
+        "recommender": recommendation_service.stats(),
+        "rating_events": recommendation_service.rating_events.stats(),
+        "recommendation_cache": recommendation_service.recommendation_cache.stats(),
+        "recommendation_warmer": recommendation_service.recommendation_warmer.stats(),
+        "content_similarity": similarity_service.stats(),
+        "search_index": search_service.stats()
+    }
+
+
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(user.router, prefix="/api/user", tags=["User"])
 app.include_router(content.router, prefix="/api/content", tags=["Content"])
\ No newline at end of file
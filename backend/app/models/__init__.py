@@ -4,6 +4,7 @@ from app.models.user_platform import UserPlatform
 from app.models.content import Content
 from app.models.user_content import UserContent
 from app.models.streaming_availability import StreamingAvailability
+from app.models.user_recommendation import UserRecommendation
 
 __all__ = [
     "User",
@@ -11,5 +12,6 @@ __all__ = [
     "UserPlatform",
     "Content",
     "UserContent",
-    "StreamingAvailability"
+    "StreamingAvailability",
+    "UserRecommendation"
 ]
\ No newline at end of file
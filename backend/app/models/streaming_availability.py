@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, Date, TIMESTAMP, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, String, Date, TIMESTAMP, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -14,6 +14,11 @@ class StreamingAvailability(Base):
     available_until = Column(Date, nullable=True)
     last_checked = Column(TIMESTAMP, server_default=func.now())
     
+    __table_args__ = (
+        UniqueConstraint('content_id', 'platform_id', 'region', name='_availability_uc'),
+        Index('ix_streaming_availability_content_region', 'content_id', 'region'),
+    )
+    
     # Relationships
     content = relationship("Content", back_populates="availability")
     platform = relationship("Platform", back_populates="streaming_availability")
\ No newline at end of file
@@ -12,7 +12,7 @@ class User(Base):
     username = Column(String(50), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
-    last_login = Column(TIMESTAMP, nullable=True)
+    last_login = Column(TIMESTAMP, nullable=True, index=True)
     
     # Relationships
     platforms = relationship("UserPlatform", back_populates="user", cascade="all, delete-orphan")
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, CheckConstraint, TIMESTAMP, UniqueConstraint, Text
+from sqlalchemy import Column, Integer, ForeignKey, String, CheckConstraint, TIMESTAMP, UniqueConstraint, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from datetime import datetime
 from app.database import Base
 
 
@@ -14,13 +15,18 @@ class UserContent(Base):
     status = Column(String(20), nullable=False)  # 'watched', 'want_to_watch', 'not_interested'
     watched_on_platform_id = Column(Integer, ForeignKey("platforms.id", ondelete="SET NULL"), nullable=True)
     review_text = Column(Text, nullable=True)
-    created_at = Column(TIMESTAMP, server_default=func.now())
-    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    # Set client-side too so timestamps always carry the same precision that
+    # rate_content writes; ratings cursors compare on updated_at
+    created_at = Column(TIMESTAMP, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, server_default=func.now(), onupdate=datetime.utcnow)
     
     # Constraints
     __table_args__ = (
         UniqueConstraint('user_id', 'content_id', name='_user_content_uc'),
         CheckConstraint('rating >= 1 AND rating <= 5', name='rating_range_check'),
+        # Rating lists: by user, optionally by status, newest first (id breaks ties)
+        Index('ix_user_content_user_updated', 'user_id', 'updated_at', 'id'),
+        Index('ix_user_content_user_status_updated', 'user_id', 'status', 'updated_at', 'id'),
     )
     
     # Relationships
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, ForeignKey, String, Float, TIMESTAMP, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class UserRecommendation(Base):
+    """Top-N recommendations per user and region, written by the offline batch job"""
+    __tablename__ = "user_recommendations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    content_id = Column(Integer, ForeignKey("content.id", ondelete="CASCADE"), nullable=False)
+    region = Column(String(10), nullable=False, default='US')
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    run_id = Column(String(32), nullable=False)
+    # Naive UTC from the job, comparable with user_content.updated_at; the default only covers other writers
+    generated_at = Column(TIMESTAMP, server_default=func.now())
+    
+    # Also serves reads of one user's list in rank order
+    __table_args__ = (UniqueConstraint('user_id', 'region', 'rank', name='_user_recommendation_rank_uc'),)
@@ -0,0 +1,263 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+import numpy as np
+import scipy.sparse as sp
+from app.recommender.interactions import NEUTRAL_VALUE
+from app.recommender.topk import top_k
+
+# Upper bound on float32 cells in one batched solve (gathered factors or stacked normal equations, ~32MB)
+BLOCK_ELEMENTS = 8 * 1024 * 1024
+
+# What save() writes, one .npy each
+SAVED_ARRAYS = ("user_ids", "item_ids", "user_factors", "item_factors", "popularity", "popular_order")
+
+
+class ALS:
+    """Matrix factorization by alternating least squares.
+
+    With `implicit=True` (the default) every user_content row is an
+    observation with preference 1 if its value is at least neutral and 0
+    below it, and confidence 1 + alpha * (1 + |value - neutral|), so a
+    5-star and a 1-star are both confident, in opposite directions, and
+    unobserved items count as weak negatives (Hu, Koren & Volinsky). With
+    `implicit=False` it fits the values themselves on observed cells only,
+    with regularization scaled by each row's count.
+
+    Each half-iteration solves one small f x f system per user (or item).
+    Rows are sorted by interaction count and solved in blocks with batched
+    matmul/solve over padded, similar-length rows, blocks spread over
+    `threads` (NumPy releases the GIL in both).
+
+    Factors are float32 and save() writes plain .npy files, which load()
+    memory-maps.
+    """
+
+    def __init__(
+        self,
+        factors: int = 64,
+        regularization: float = 1.0,
+        alpha: float = 1.0,
+        iterations: int = 15,
+        implicit: bool = True,
+        threads: Optional[int] = None,
+        seed: int = 0
+    ):
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.implicit = implicit
+        self.threads = threads or os.cpu_count() or 1
+        self.seed = seed
+
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.item_ids = np.empty(0, dtype=np.int64)
+        self.user_factors = np.empty((0, factors), dtype=np.float32)
+        self.item_factors = np.empty((0, factors), dtype=np.float32)
+        self.popularity = np.empty(0, dtype=np.int32)
+        self.popular_order = np.empty(0, dtype=np.int64)
+        self._gram = np.zeros((factors, factors), dtype=np.float32)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    @staticmethod
+    def _rows(ids: np.ndarray, lookup: Iterable[int]) -> np.ndarray:
+        lookup = np.asarray(lookup, dtype=np.int64)
+        if len(ids) == 0:
+            return np.full(len(lookup), -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(ids, lookup), len(ids) - 1)
+        return np.where(ids[rows] == lookup, rows, -1)
+
+    def rows_for(self, content_ids: Iterable[int]) -> np.ndarray:
+        """Row of each content id, or -1 for ids the model has not seen"""
+        return self._rows(self.item_ids, content_ids)
+
+    # Training
+
+    def _weights(self, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(confidence - 1, target) per observation; explicit mode weighs every observation 1"""
+        if not self.implicit:
+            return np.ones_like(values), values
+        extra = self.alpha * (1 + np.abs(values - NEUTRAL_VALUE))
+        preference = (values >= NEUTRAL_VALUE).astype(np.float32)
+        return extra.astype(np.float32), ((1 + extra) * preference).astype(np.float32)
+
+    def fit(self, user_ids, item_ids, values) -> "ALS":
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+
+        self.user_ids, rows = np.unique(user_ids, return_inverse=True)
+        self.item_ids, cols = np.unique(item_ids, return_inverse=True)
+        matrix = sp.csr_matrix((values, (rows, cols)), shape=(len(self.user_ids), self.n_items), dtype=np.float32)
+        matrix.sum_duplicates()
+        matrix_t = matrix.T.tocsr()
+        self.popularity = np.diff(matrix_t.indptr).astype(np.int32)
+        self.popular_order = np.argsort(-self.popularity, kind="stable")
+
+        rng = np.random.default_rng(self.seed)
+        self.user_factors = (rng.standard_normal((len(self.user_ids), self.factors)) * 0.01).astype(np.float32)
+        self.item_factors = (rng.standard_normal((self.n_items, self.factors)) * 0.01).astype(np.float32)
+
+        with ThreadPoolExecutor(self.threads) as pool:
+            for _ in range(self.iterations):
+                self.user_factors = self._solve(matrix, self.item_factors, pool)
+                self.item_factors = self._solve(matrix_t, self.user_factors, pool)
+
+        self._gram = self.item_factors.T @ self.item_factors
+        return self
+
+    def _solve(self, matrix: sp.csr_matrix, fixed: np.ndarray, pool: ThreadPoolExecutor) -> np.ndarray:
+        """Least-squares factors for every row of `matrix` given the other side's factors"""
+        extra, target = self._weights(matrix.data)
+        base = self.regularization * np.eye(self.factors, dtype=np.float32)
+        if self.implicit:
+            base = base + fixed.T @ fixed
+
+        counts = np.diff(matrix.indptr)
+        order = np.argsort(counts, kind="stable")
+        solved = np.empty((matrix.shape[0], self.factors), dtype=np.float32)
+
+        def solve_block(rows: np.ndarray):
+            # Pad the block's rows to the longest one; they are sorted, so little is wasted
+            lengths = counts[rows]
+            width = int(lengths.max()) if len(rows) else 0
+            offsets = np.arange(width)
+            present = offsets < lengths[:, None]
+            positions = np.where(present, matrix.indptr[rows][:, None] + offsets, 0)
+
+            gathered = fixed[matrix.indices[positions]]
+            weights = np.where(present, extra[positions], 0)
+            targets = np.where(present, target[positions], 0)
+
+            # A = base + Y^T diag(w) Y and b = Y^T t for every row at once
+            systems = np.matmul(gathered.transpose(0, 2, 1) * weights[:, None, :], gathered)
+            if self.implicit:
+                systems += base
+            else:
+                systems += base * np.maximum(lengths, 1)[:, None, None]
+            rhs = np.einsum("blf,bl->bf", gathered, targets)
+            solved[rows] = np.linalg.solve(systems, rhs[..., None])[..., 0]
+
+        # Largest blocks whose (rows, widest row, f) and (rows, f, f) arrays stay within budget;
+        # rows get wider along the order, so the cost of ending a block at each row only grows
+        widths = np.maximum(counts[order], self.factors) * self.factors
+        blocks, start = [], 0
+        while start < len(order):
+            cost = np.arange(1, len(order) - start + 1) * widths[start:]
+            stop = start + max(1, int(np.searchsorted(cost, BLOCK_ELEMENTS, side="right")))
+            blocks.append(order[start:stop])
+            start = stop
+
+        list(pool.map(solve_block, blocks))
+        return solved
+
+    # Scoring
+
+    def user_vector(self, content_ids: Iterable[int], values: Iterable[float]) -> np.ndarray:
+        """Fold a user in from their interactions: one f x f solve against the fixed item factors"""
+        rows = self.rows_for(list(content_ids))
+        values = np.asarray(list(values), dtype=np.float32)
+        known = rows >= 0
+        rows, values = rows[known], values[known]
+
+        extra, target = self._weights(values)
+        gathered = self.item_factors[rows]
+        system = (gathered.T * extra) @ gathered
+        if self.implicit:
+            system += self._gram + self.regularization * np.eye(self.factors, dtype=np.float32)
+        else:
+            system += self.regularization * max(len(rows), 1) * np.eye(self.factors, dtype=np.float32)
+        return np.linalg.solve(system, gathered.T @ target).astype(np.float32)
+
+    def score(self, vector: np.ndarray) -> np.ndarray:
+        return (self.item_factors @ vector).astype(np.float64)
+
+    def recommend(
+        self,
+        content_ids: Iterable[int],
+        values: Iterable[float],
+        k: int = 20,
+        exclude: Iterable[int] = (),
+        allowed: Optional[np.ndarray] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k (content_ids, scores) for one user's interactions, like ItemKNN.recommend.
+
+        A user with interactions gets a score for every item. One with none
+        the model knows would get a zero vector and arbitrary ties, so they
+        get the most popular allowed items instead, scored 0.
+        """
+        content_ids = np.asarray(list(content_ids), dtype=np.int64)
+        values = list(values)
+        if self.n_items == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        excluded = self.rows_for(np.concatenate([content_ids, np.asarray(list(exclude), dtype=np.int64)]))
+        excluded = excluded[excluded >= 0]
+
+        if not (self.rows_for(content_ids) >= 0).any():
+            fillable = np.ones(self.n_items, dtype=bool) if allowed is None else np.array(allowed, dtype=bool)
+            fillable[excluded] = False
+            picked = self.popular_order[fillable[self.popular_order]][:k]
+            return self.item_ids[picked], np.zeros(len(picked), dtype=np.float32)
+
+        scores = self.score(self.user_vector(content_ids, values))
+        scores[excluded] = -np.inf
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+
+        picked = top_k(scores, k)
+        picked = picked[np.isfinite(scores[picked])]
+        return self.item_ids[picked], scores[picked].astype(np.float32)
+
+    def recommend_user(self, user_id: int, k: int = 20, exclude: Iterable[int] = ()) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k from a trained user's stored factors; empty for users the model has not seen"""
+        row = self._rows(self.user_ids, [user_id])[0]
+        if row < 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.score(self.user_factors[row])
+        excluded = self.rows_for(list(exclude))
+        scores[excluded[excluded >= 0]] = -np.inf
+        picked = top_k(scores, k)
+        picked = picked[np.isfinite(scores[picked])]
+        return self.item_ids[picked], scores[picked].astype(np.float32)
+
+    # Persistence
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in SAVED_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True, **params) -> "ALS":
+        """Model from save(); factors are memory-mapped, so processes loading it share the pages.
+
+        Pass the training `implicit`, `alpha` and `regularization` if they were not the defaults,
+        since folding users in depends on them.
+        """
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in SAVED_ARRAYS
+            # Models saved before popularity was kept fall back to item order
+            if os.path.exists(os.path.join(directory, f"{name}.npy"))
+        }
+        model = cls(factors=arrays["item_factors"].shape[1], **params)
+        for name, array in arrays.items():
+            setattr(model, name, array)
+        if "popular_order" not in arrays:
+            model.popularity = np.zeros(model.n_items, dtype=np.int32)
+            model.popular_order = np.arange(model.n_items, dtype=np.int64)
+        model._gram = np.asarray(model.item_factors.T @ model.item_factors)
+        return model
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self.user_ids),
+            "items": self.n_items,
+            "factors": self.factors,
+            "factor_bytes": self.user_factors.nbytes + self.item_factors.nbytes
+        }
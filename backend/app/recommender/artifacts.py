@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Callable, Optional
+
+# Bumped whenever the layout changes in a way older readers would misread
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+
+class ArtifactStore:
+    """Versioned on-disk recommender artifacts shared by every worker process.
+
+    Each version is a directory of plain .npy files (one subdirectory per
+    component, e.g. item_knn/ and platforms/) plus manifest.json describing
+    them. Components are written by their own save() and read back with
+    np.load(mmap_mode="r"), so N workers map the same page-cache copy and a
+    load costs a few syscalls rather than a read of the whole model.
+
+    A version is written under a temporary name and renamed into place, and
+    CURRENT (the name of the serving version) is replaced with os.replace,
+    so readers only ever see complete versions. Old versions are pruned;
+    workers still mapping one keep their pages until they swap.
+    """
+
+    def __init__(self, root: str, keep: int = 3):
+        self.root = root
+        self.keep = keep
+
+    def _path(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def publish(self, components: dict[str, Callable[[str], None]], meta: Optional[dict] = None) -> str:
+        """Write a new version, each component saving into its own subdirectory, and make it current"""
+        os.makedirs(self.root, exist_ok=True)
+        version = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+        staging = self._path(f".{version}.tmp")
+        os.makedirs(staging)
+        try:
+            for name, save in components.items():
+                save(os.path.join(staging, name))
+
+            files = {}
+            for directory, _, names in os.walk(staging):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    files[os.path.relpath(path, staging)] = os.path.getsize(path)
+            manifest = {
+                "format": FORMAT_VERSION,
+                "version": version,
+                "created_at": time.time(),
+                "components": sorted(components),
+                "files": files,
+                "meta": meta or {}
+            }
+            with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f, indent=2)
+
+            os.rename(staging, self._path(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._set_current(version)
+        self.prune()
+        return version
+
+    def _set_current(self, version: str):
+        path = os.path.join(self.root, CURRENT_FILE)
+        with open(f"{path}.{os.getpid()}.tmp", "w") as f:
+            f.write(version)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    def current(self) -> Optional[str]:
+        """Name of the serving version, or None if nothing was published yet"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def open(self, version: Optional[str] = None) -> tuple[str, dict]:
+        """(directory, manifest) of a version, the current one by default"""
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"no recommender artifact published under {self.root}")
+        path = self._path(version)
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"artifact {version} has format {manifest.get('format')}, expected {FORMAT_VERSION}")
+        return path, manifest
+
+    def versions(self) -> list[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.exists(os.path.join(self.root, name, MANIFEST_FILE))
+        )
+
+    def prune(self):
+        """Delete all but the newest `keep` versions, never the current one"""
+        current = self.current()
+        for version in self.versions()[:-self.keep]:
+            if version != current:
+                shutil.rmtree(self._path(version), ignore_errors=True)
@@ -0,0 +1,285 @@
+import re
+import threading
+import zlib
+from typing import Optional
+import numpy as np
+import scipy.sparse as sp
+from app.recommender.topk import insert_neighbour, top_k, top_k_rows
+
+# Feature layout: [genres | cast | director | overview terms], hashed where the vocabulary is open
+GENRE_SLOTS = 128
+CAST_BUCKETS = 1 << 12
+DIRECTOR_BUCKETS = 1 << 10
+OVERVIEW_BUCKETS = 1 << 14
+CAST_OFFSET = GENRE_SLOTS
+DIRECTOR_OFFSET = CAST_OFFSET + CAST_BUCKETS
+OVERVIEW_OFFSET = DIRECTOR_OFFSET + DIRECTOR_BUCKETS
+N_FEATURES = OVERVIEW_OFFSET + OVERVIEW_BUCKETS
+
+# Relative weight of each feature group in the cosine
+GENRE_WEIGHT = 1.0
+CAST_WEIGHT = 0.6
+DIRECTOR_WEIGHT = 0.5
+OVERVIEW_WEIGHT = 0.8
+
+BLOCK_ELEMENTS = 16 * 1024 * 1024
+MAX_PENDING_ROWS = 256
+
+TOKEN_RE = re.compile(r"[a-z][a-z']{2,}")
+STOPWORDS = frozenset(
+    "the and for with that this from his her their they them are was were has have had who whom when where "
+    "what which into while after before about over its not but one two out will can all new him she he "
+    "you your our more most than then there these those such only also just being been must find finds".split()
+)
+
+
+def _bucket(value: str, buckets: int) -> int:
+    # crc32 rather than hash() so buckets are stable across processes
+    return zlib.crc32(value.strip().lower().encode("utf-8")) % buckets
+
+
+def overview_terms(overview: Optional[str]) -> tuple[np.ndarray, np.ndarray]:
+    """(hashed term buckets, counts) for an overview"""
+    tokens = [token for token in TOKEN_RE.findall((overview or "").lower()) if token not in STOPWORDS]
+    if not tokens:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.unique([_bucket(token, OVERVIEW_BUCKETS) for token in tokens], return_counts=True)
+
+
+class ContentSimilarityIndex:
+    """"More like this" over content metadata.
+
+    Each title becomes a sparse vector: one-hot genres, hashed cast (top
+    billing weighted higher) and director, and hashed TF-IDF of the overview,
+    each group L2-normalised and weighted, then the whole vector normalised,
+    so a dot product is a cosine similarity.
+
+    `build` loads a catalog and `precompute` fills the top-K neighbour lists
+    in blocks; rows not precomputed yet are computed on first query with one
+    sparse mat-vec. `add` indexes a new title and inserts it into the lists
+    of existing titles it beats, without a rebuild. IDF weights are frozen
+    per vector at the time it is added; a periodic rebuild refreshes them.
+    """
+
+    def __init__(self, neighbors: int = 20):
+        self.neighbors = neighbors
+        self._lock = threading.RLock()
+        self._genres: dict[str, int] = {}
+        self._doc_freq = np.zeros(OVERVIEW_BUCKETS, dtype=np.int64)
+        self._docs = 0
+
+        self.content_ids: list[int] = []
+        self._rows: dict[int, int] = {}
+        # Feature rows in row order: a compacted matrix (plus its transpose, which acts as an
+        # inverted index from feature to titles) and single rows from add() not yet folded in
+        self._main = self._matrix([])
+        self._main_t = self._main.T.tocsr()
+        self._tail = self._matrix([])
+
+        self._nbr_idx = np.full((0, neighbors), -1, dtype=np.int32)
+        self._nbr_sim = np.zeros((0, neighbors), dtype=np.float32)
+        self._computed = np.zeros(0, dtype=bool)
+        self._generation = 0  # bumped by build() so an older precompute stops writing
+
+    def __len__(self) -> int:
+        return len(self.content_ids)
+
+    def __contains__(self, content_id: int) -> bool:
+        return content_id in self._rows
+
+    # Features
+
+    def _genre_slot(self, genre: str) -> Optional[int]:
+        slot = self._genres.get(genre)
+        if slot is None and len(self._genres) < GENRE_SLOTS:
+            slot = self._genres[genre] = len(self._genres)
+        return slot
+
+    def _vector(self, content: dict, terms: tuple[np.ndarray, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        columns, values = [], []
+
+        def add_group(indices, weights, group_weight):
+            if len(indices) == 0:
+                return
+            weights = np.asarray(weights, dtype=np.float32)
+            columns.append(np.asarray(indices, dtype=np.int64))
+            values.append(weights * (group_weight / np.linalg.norm(weights)))
+
+        genres = [slot for slot in map(self._genre_slot, content.get("genres") or []) if slot is not None]
+        add_group(genres, np.ones(len(genres)), GENRE_WEIGHT)
+
+        cast = content.get("cast") or []
+        add_group(
+            [CAST_OFFSET + _bucket(name, CAST_BUCKETS) for name in cast],
+            [1 / (1 + 0.25 * position) for position in range(len(cast))],
+            CAST_WEIGHT
+        )
+
+        if content.get("director"):
+            add_group([DIRECTOR_OFFSET + _bucket(content["director"], DIRECTOR_BUCKETS)], [1.0], DIRECTOR_WEIGHT)
+
+        buckets, counts = terms
+        if len(buckets):
+            idf = np.log((1 + self._docs) / (1 + self._doc_freq[buckets])) + 1
+            add_group(OVERVIEW_OFFSET + buckets, counts * idf, OVERVIEW_WEIGHT)
+
+        if not columns:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        columns, values = np.concatenate(columns), np.concatenate(values)
+        return columns, values / np.linalg.norm(values)
+
+    @staticmethod
+    def _matrix(vectors: list[tuple[np.ndarray, np.ndarray]]) -> sp.csr_matrix:
+        indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(columns) for columns, _ in vectors])
+        indices = np.concatenate([columns for columns, _ in vectors]) if vectors else np.empty(0, dtype=np.int64)
+        data = np.concatenate([values for _, values in vectors]) if vectors else np.empty(0, dtype=np.float32)
+        matrix = sp.csr_matrix((data.astype(np.float32), indices, indptr), shape=(len(vectors), N_FEATURES))
+        matrix.sum_duplicates()  # hashed buckets can collide
+        return matrix
+
+    def _compact(self):
+        if self._tail.shape[0]:
+            self._main = sp.vstack([self._main, self._tail], format="csr")
+            self._main_t = self._main.T.tocsr()
+            self._tail = self._matrix([])
+
+    # Building
+
+    def build(self, contents: list[dict]):
+        """Replace the index with a catalog of content dicts (id, genres, cast, director, overview)"""
+        terms = [overview_terms(content.get("overview")) for content in contents]
+        with self._lock:
+            self._genres = {}
+            self._doc_freq = np.zeros(OVERVIEW_BUCKETS, dtype=np.int64)
+            for buckets, _ in terms:
+                self._doc_freq[buckets] += 1
+            self._docs = len(contents)
+
+            self.content_ids = [content["id"] for content in contents]
+            self._rows = {content_id: row for row, content_id in enumerate(self.content_ids)}
+            self._main = self._matrix([self._vector(content, t) for content, t in zip(contents, terms)])
+            self._main_t = self._main.T.tocsr()
+            self._tail = self._matrix([])
+            self._nbr_idx = np.full((len(contents), self.neighbors), -1, dtype=np.int32)
+            self._nbr_sim = np.zeros((len(contents), self.neighbors), dtype=np.float32)
+            self._computed = np.zeros(len(contents), dtype=bool)
+            self._generation += 1
+
+    def precompute(self, block_size: Optional[int] = None):
+        """Fill every neighbour list that is not computed yet"""
+        with self._lock:
+            self._compact()
+            features, features_t = self._main, self._main_t
+            n_rows = features.shape[0]
+            generation = self._generation
+        if n_rows < 2:
+            return
+        k = min(self.neighbors, n_rows - 1)
+        block = block_size or max(1, BLOCK_ELEMENTS // n_rows)
+
+        for start in range(0, n_rows, block):
+            stop = min(start + block, n_rows)
+            if self._computed[start:stop].all():
+                continue
+            sims = (features[start:stop] @ features_t).toarray()
+            block_rows = np.arange(stop - start)
+            sims[block_rows, start + block_rows] = 0
+            top, top_sims = top_k_rows(sims, k)
+            with self._lock:
+                if self._generation != generation:
+                    return
+                # add() may have filled some of these rows meanwhile; theirs include newer titles
+                todo = ~self._computed[start:stop]
+                self._nbr_idx[start:stop][todo, :k] = top[todo]
+                self._nbr_sim[start:stop][todo, :k] = top_sims[todo]
+                self._computed[start:stop] = True
+
+    # Incremental updates
+
+    def _grow(self, rows: int):
+        capacity = len(self._computed)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 64)
+        extra = capacity - len(self._computed)
+        self._nbr_idx = np.vstack([self._nbr_idx, np.full((extra, self.neighbors), -1, dtype=np.int32)])
+        self._nbr_sim = np.vstack([self._nbr_sim, np.zeros((extra, self.neighbors), dtype=np.float32)])
+        self._computed = np.concatenate([self._computed, np.zeros(extra, dtype=bool)])
+
+    def add(self, content: dict) -> bool:
+        """Index one new title; returns False if it was already indexed"""
+        terms = overview_terms(content.get("overview"))
+        with self._lock:
+            if content["id"] in self._rows:
+                return False
+            self._doc_freq[terms[0]] += 1
+            self._docs += 1
+
+            row = len(self.content_ids)
+            vector = self._matrix([self._vector(content, terms)])
+            self.content_ids.append(content["id"])
+            self._rows[content["id"]] = row
+            self._tail = sp.vstack([self._tail, vector], format="csr")
+            if self._tail.shape[0] > MAX_PENDING_ROWS:
+                self._compact()
+            self._grow(row + 1)
+
+            sims = self._similarities(vector)
+            sims[row] = 0
+            self._set_row(row, sims)
+
+            # Titles whose lists the newcomer now belongs in
+            others = np.flatnonzero(self._computed[:row] & (sims[:row] > self._nbr_sim[:row, -1]))
+            insert_neighbour(self._nbr_idx, self._nbr_sim, others, row, sims[others])
+            return True
+
+    def _similarities(self, vector: sp.csr_matrix) -> np.ndarray:
+        """Cosine of one feature row against every indexed title"""
+        # Only the posting lists of the vector's own features are touched
+        if vector.nnz:
+            main = vector.data @ self._main_t[vector.indices]
+        else:
+            main = np.zeros(self._main.shape[0])
+        tail = (self._tail @ vector.T).toarray().ravel()
+        return np.concatenate([main, tail])
+
+    def _row(self, row: int) -> sp.csr_matrix:
+        if row < self._main.shape[0]:
+            return self._main[row]
+        return self._tail[row - self._main.shape[0]]
+
+    def _set_row(self, row: int, sims: np.ndarray):
+        top = top_k(sims, self.neighbors)
+        top = top[sims[top] > 0]
+        self._nbr_idx[row] = -1
+        self._nbr_sim[row] = 0
+        self._nbr_idx[row, :len(top)] = top
+        self._nbr_sim[row, :len(top)] = sims[top]
+        self._computed[row] = True
+
+    # Queries
+
+    def similar(self, content_id: int, k: Optional[int] = None) -> Optional[tuple[list[int], list[float]]]:
+        """(content_ids, similarities) of the k nearest titles, or None if the title is not indexed"""
+        k = min(k or self.neighbors, self.neighbors)
+        with self._lock:
+            row = self._rows.get(content_id)
+            if row is None:
+                return None
+            if not self._computed[row]:
+                sims = self._similarities(self._row(row))
+                sims[row] = 0
+                self._set_row(row, sims)
+            neighbours = self._nbr_idx[row, :k]
+            sims = self._nbr_sim[row, :k]
+            valid = neighbours >= 0
+            return [self.content_ids[n] for n in neighbours[valid]], sims[valid].tolist()
+
+    def stats(self) -> dict:
+        return {
+            "titles": len(self.content_ids),
+            "precomputed": int(self._computed[:len(self.content_ids)].sum()),
+            "genres": len(self._genres),
+            "unmerged_rows": self._tail.shape[0]
+        }
@@ -0,0 +1,17 @@
+from typing import Optional
+
+# A rating at or below this pulls neighbours down when scoring
+NEUTRAL_VALUE = 3.0
+
+# Stand-in ratings for rows that only carry a status
+IMPLICIT_VALUES = {
+    "watched": 3.5,
+    "want_to_watch": 4.0,
+}
+
+
+def interaction_value(rating: Optional[int], status: str) -> Optional[float]:
+    """Preference value of one user_content row, or None if it should not feed the model"""
+    if rating is not None:
+        return float(rating)
+    return IMPLICIT_VALUES.get(status)
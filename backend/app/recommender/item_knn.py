@@ -0,0 +1,333 @@
+import os
+import threading
+from typing import Iterable, Optional
+import numpy as np
+import scipy.sparse as sp
+from app.recommender.interactions import NEUTRAL_VALUE
+from app.recommender.topk import insert_neighbour, top_k, top_k_rows
+
+# Upper bound on dense similarity cells held at once while fitting (~64MB of float32)
+BLOCK_ELEMENTS = 16 * 1024 * 1024
+
+# Attributes save() writes as they are, one .npy each
+SAVED_ARRAYS = ("item_ids", "_id_order", "nbr_idx", "nbr_sim", "popularity", "popular_order")
+
+
+class ItemKNN:
+    """Item-item collaborative filtering with precomputed top-K cosine neighbours.
+
+    Similarities come from the sparse user x item matrix, shrunk towards zero
+    for pairs with few co-raters. Only the K best neighbours of each item are
+    kept, as dense `nbr_idx`/`nbr_sim` arrays (padded with -1 / 0), so scoring
+    a user touches K rows per item they rated rather than the whole catalog.
+
+    `update` folds a batch of rating changes into the matrix and recomputes
+    only the similarities of the items that changed, re-ranking them inside
+    every other list, so the model follows writes between full rebuilds.
+    Lists can drift slightly from a fresh fit (a neighbour pushed out of a
+    list by an update is not brought back when it later improves); the
+    periodic rebuild resets that.
+    """
+
+    def __init__(self, neighbors: int = 50, shrinkage: float = 10.0, block_size: Optional[int] = None):
+        self.neighbors = neighbors
+        self.shrinkage = shrinkage
+        self.block_size = block_size
+
+        # Row -> content id; sorted after fit, items first seen by update() are appended
+        self.item_ids = np.empty(0, dtype=np.int64)
+        self._id_order = np.empty(0, dtype=np.int64)
+        self.nbr_idx = np.empty((0, neighbors), dtype=np.int32)
+        self.nbr_sim = np.empty((0, neighbors), dtype=np.float32)
+        self.popularity = np.empty(0, dtype=np.int32)
+        self.popular_order = np.empty(0, dtype=np.int64)
+
+        self._matrix = sp.csr_matrix((0, 0), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float64)
+        self._user_rows: dict[int, int] = {}
+        # Held while neighbour lists are read or swapped
+        self._lock = threading.RLock()
+        self.updates = 0
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    def rows_for(self, content_ids: Iterable[int]) -> np.ndarray:
+        """Row of each content id, or -1 for ids the model has not seen"""
+        content_ids = np.asarray(content_ids, dtype=np.int64)
+        if self.n_items == 0:
+            return np.full(len(content_ids), -1, dtype=np.int64)
+        sorted_ids = self.item_ids[self._id_order]
+        positions = np.minimum(np.searchsorted(sorted_ids, content_ids), self.n_items - 1)
+        return np.where(sorted_ids[positions] == content_ids, self._id_order[positions], -1)
+
+    def fit(self, user_ids, item_ids, values) -> "ItemKNN":
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+
+        self.item_ids, cols = np.unique(item_ids, return_inverse=True)
+        self._id_order = np.arange(self.n_items)
+        users, rows = np.unique(user_ids, return_inverse=True)
+        self._user_rows = {user_id: row for row, user_id in enumerate(users.tolist())}
+        matrix = sp.csr_matrix((values, (rows, cols)), shape=(len(users), self.n_items), dtype=np.float32)
+        matrix.sum_duplicates()
+
+        self._matrix = matrix
+        self._sq_norms = np.asarray(matrix.multiply(matrix).sum(axis=0), dtype=np.float64).ravel()
+        self.popularity = np.bincount(matrix.indices, minlength=self.n_items).astype(np.int32)
+        self.popular_order = np.argsort(-self.popularity, kind="stable")
+        self.nbr_idx, self.nbr_sim = self._neighbours(matrix)
+        return self
+
+    def _neighbours(self, matrix: sp.csr_matrix) -> tuple[np.ndarray, np.ndarray]:
+        n_items = matrix.shape[1]
+        nbr_idx = np.full((n_items, self.neighbors), -1, dtype=np.int32)
+        nbr_sim = np.zeros((n_items, self.neighbors), dtype=np.float32)
+        k = min(self.neighbors, n_items - 1)
+        if k <= 0:
+            return nbr_idx, nbr_sim
+
+        norms = np.sqrt(self._sq_norms)
+        norms[norms == 0] = 1
+        normalized = (matrix @ sp.diags((1 / norms).astype(np.float32))).tocsr()
+        normalized_t = normalized.T.tocsr()
+        if self.shrinkage:
+            binary = matrix.copy()
+            binary.data[:] = 1
+            binary_t = binary.T.tocsr()
+
+        block = self.block_size or max(1, BLOCK_ELEMENTS // n_items)
+        for start in range(0, n_items, block):
+            stop = min(start + block, n_items)
+            # Similarity of each item in the block to every item: (block, n_items)
+            sims = (normalized_t[start:stop] @ normalized).toarray()
+            if self.shrinkage:
+                co_raters = (binary_t[start:stop] @ binary).toarray()
+                sims *= co_raters / (co_raters + self.shrinkage)
+            block_rows = np.arange(stop - start)
+            sims[block_rows, start + block_rows] = 0  # an item is not its own neighbour
+
+            nbr_idx[start:stop, :k], nbr_sim[start:stop, :k] = top_k_rows(sims, k)
+
+        return nbr_idx, nbr_sim
+
+    def _similarities(
+        self,
+        matrix: sp.csr_matrix,
+        matrix_t: sp.csr_matrix,
+        sq_norms: np.ndarray,
+        items: np.ndarray
+    ) -> np.ndarray:
+        """Shrunk cosine of each of `items` against every item: dense (len(items), n_items)"""
+        rated = matrix_t[items]
+        sims = (rated @ matrix).toarray()
+        norms = np.sqrt(np.maximum(sq_norms, 0))
+        norms[norms == 0] = 1
+        sims /= norms[items, None] * norms[None, :]
+        if self.shrinkage:
+            rated.data[:] = 1
+            binary = matrix.copy()
+            binary.data[:] = 1
+            co_raters = (rated @ binary).toarray()
+            sims *= co_raters / (co_raters + self.shrinkage)
+        sims[np.arange(len(items)), items] = 0  # an item is not its own neighbour
+        return sims.astype(np.float32)
+
+    def update(self, changes: Iterable[tuple[int, int, Optional[float]]]) -> int:
+        """Apply (user_id, content_id, value) changes, value None meaning the interaction was removed.
+
+        The last change per (user, item) wins. Everything is computed on
+        copies and swapped in under the lock, so readers keep scoring against
+        the previous lists meanwhile. Returns the number of items refreshed.
+        On a model from load() the copies are private to this process, so the
+        pages it shared with other processes are no longer shared.
+        """
+        latest = {}
+        for user_id, content_id, value in changes:
+            latest[(user_id, content_id)] = 0.0 if value is None else float(value)
+        if not latest:
+            return 0
+
+        # Grow for users and items the model has not seen
+        user_rows = dict(self._user_rows)
+        for user_id, _ in latest:
+            user_rows.setdefault(user_id, len(user_rows))
+        content_ids = np.unique([content_id for _, content_id in latest])
+        new_items = content_ids[self.rows_for(content_ids) < 0]
+        item_ids = np.concatenate([self.item_ids, new_items])
+        id_order = np.argsort(item_ids, kind="stable")
+        n_items = len(item_ids)
+        item_rows = dict(zip(item_ids[id_order].tolist(), id_order.tolist()))
+
+        matrix = self._matrix.copy()
+        matrix.resize((len(user_rows), n_items))
+        sq_norms = np.concatenate([self._sq_norms, np.zeros(len(new_items))])
+        popularity = np.concatenate([self.popularity, np.zeros(len(new_items), dtype=np.int32)])
+
+        rows, cols, deltas = [], [], []
+        for (user_id, content_id), value in latest.items():
+            row, col = user_rows[user_id], item_rows[content_id]
+            old = float(matrix[row, col])
+            if value == old:
+                continue
+            rows.append(row)
+            cols.append(col)
+            deltas.append(value - old)
+            sq_norms[col] += value * value - old * old
+            popularity[col] += int(value != 0) - int(old != 0)
+        if not deltas:
+            return 0
+
+        matrix = (matrix + sp.csr_matrix((deltas, (rows, cols)), shape=matrix.shape, dtype=np.float32)).tocsr()
+        matrix.eliminate_zeros()
+        matrix_t = matrix.T.tocsr()
+        changed = np.unique(cols)
+
+        nbr_idx = np.vstack([self.nbr_idx, np.full((len(new_items), self.neighbors), -1, dtype=np.int32)])
+        nbr_sim = np.vstack([self.nbr_sim, np.zeros((len(new_items), self.neighbors), dtype=np.float32)])
+        k = min(self.neighbors, n_items - 1)
+        if k > 0:
+            block = self.block_size or max(1, BLOCK_ELEMENTS // n_items)
+            for start in range(0, len(changed), block):
+                items = changed[start:start + block]
+                self._patch(nbr_idx, nbr_sim, items, self._similarities(matrix, matrix_t, sq_norms, items), k)
+
+        with self._lock:
+            self.item_ids, self._id_order = item_ids, id_order
+            self.nbr_idx, self.nbr_sim = nbr_idx, nbr_sim
+            self._matrix, self._sq_norms, self._user_rows = matrix, sq_norms, user_rows
+            self.popularity = popularity
+            self.popular_order = np.argsort(-popularity, kind="stable")
+            self.updates += 1
+        return len(changed)
+
+    @staticmethod
+    def _patch(nbr_idx: np.ndarray, nbr_sim: np.ndarray, items: np.ndarray, sims: np.ndarray, k: int):
+        """Rewrite the lists of `items` from their fresh similarities and re-rank them in everyone else's"""
+        nbr_idx[items, :k], nbr_sim[items, :k] = top_k_rows(sims, k)
+
+        # Lists that already hold a changed item: refresh its similarity and re-sort
+        position = np.full(len(nbr_idx), -1, dtype=np.int64)
+        position[items] = np.arange(len(items))
+        holders, slots = np.nonzero(np.isin(nbr_idx, items))
+        if len(holders):
+            nbr_sim[holders, slots] = sims[position[nbr_idx[holders, slots]], holders]
+            touched = np.unique(holders)
+            order = np.argsort(-nbr_sim[touched], axis=1, kind="stable")
+            nbr_idx[touched] = np.take_along_axis(nbr_idx[touched], order, axis=1)
+            nbr_sim[touched] = np.take_along_axis(nbr_sim[touched], order, axis=1)
+            dropped = (nbr_idx >= 0) & (nbr_sim <= 0)
+            nbr_idx[dropped] = -1
+            nbr_sim[dropped] = 0
+
+        # Lists a changed item now makes it into
+        for item, column in zip(items.tolist(), sims):
+            beats = np.flatnonzero((column > nbr_sim[:, -1]) & ~(nbr_idx == item).any(axis=1))
+            insert_neighbour(nbr_idx, nbr_sim, beats, item, column[beats])
+
+    def score(self, rows: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Score every item for a user who interacted with `rows` with the given weights"""
+        neighbours = self.nbr_idx[rows]
+        contributions = self.nbr_sim[rows] * weights[:, None]
+        valid = neighbours >= 0
+        scores = np.bincount(neighbours[valid], weights=contributions[valid], minlength=self.n_items)
+        return scores.astype(np.float64, copy=False)  # bincount of nothing comes back as ints
+
+    def recommend(
+        self,
+        content_ids: Iterable[int],
+        values: Iterable[float],
+        k: int = 20,
+        exclude: Iterable[int] = (),
+        allowed: Optional[np.ndarray] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k (content_ids, scores) for one user's interactions.
+
+        Items the user already interacted with (and anything in `exclude`)
+        are never returned, nor are rows where the boolean `allowed` mask is
+        False. If fewer than k items score above zero the rest are filled
+        with the most popular allowed items, scored 0.
+        """
+        content_ids = np.asarray(list(content_ids), dtype=np.int64)
+        values = np.asarray(list(values), dtype=np.float32)
+        exclude = np.asarray(list(exclude), dtype=np.int64)
+        with self._lock:
+            if self.n_items == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            if allowed is not None and len(allowed) < self.n_items:
+                # Items added by an update since the caller built the mask
+                allowed = np.concatenate([allowed, np.zeros(self.n_items - len(allowed), dtype=bool)])
+
+            rows = self.rows_for(content_ids)
+            known = rows >= 0
+            scores = self.score(rows[known], values[known] - NEUTRAL_VALUE)
+
+            excluded = self.rows_for(np.concatenate([content_ids, exclude]))
+            excluded = excluded[excluded >= 0]
+            scores[excluded] = -np.inf
+            if allowed is not None:
+                scores[~allowed] = -np.inf
+
+            picked = top_k(scores, k)
+            picked = picked[scores[picked] > 0]
+            picked_scores = scores[picked]
+
+            if len(picked) < k:
+                fillable = np.ones(self.n_items, dtype=bool) if allowed is None else allowed.copy()
+                fillable[excluded] = False
+                fillable[picked] = False
+                filler = self.popular_order[fillable[self.popular_order]][:k - len(picked)]
+                picked = np.concatenate([picked, filler])
+                picked_scores = np.concatenate([picked_scores, np.zeros(len(filler))])
+
+            return self.item_ids[picked], picked_scores.astype(np.float32)
+
+    def save(self, directory: str):
+        """Write the neighbour lists, content id <-> row index and interaction matrix as .npy files"""
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            arrays = {name.lstrip("_"): getattr(self, name) for name in SAVED_ARRAYS}
+            users = np.empty(len(self._user_rows), dtype=np.int64)
+            users[list(self._user_rows.values())] = list(self._user_rows.keys())
+            arrays.update(
+                user_ids=users,
+                sq_norms=self._sq_norms,
+                matrix_data=self._matrix.data,
+                matrix_indices=self._matrix.indices,
+                matrix_indptr=self._matrix.indptr
+            )
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True, **params) -> "ItemKNN":
+        """Model from save(), memory-mapped so processes loading it share the pages.
+
+        The arrays stay read-only; update() builds private copies rather than writing to them,
+        so processes serving a shared model should not call it.
+        """
+        def read(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+
+        model = cls(neighbors=read("nbr_idx").shape[1], **params)
+        for name in SAVED_ARRAYS:
+            setattr(model, name, read(name.lstrip("_")))
+        users = read("user_ids")
+        model._user_rows = dict(zip(users.tolist(), range(len(users))))
+        model._sq_norms = read("sq_norms")
+        model._matrix = sp.csr_matrix(
+            (read("matrix_data"), read("matrix_indices"), read("matrix_indptr")),
+            shape=(len(users), model.n_items)
+        )
+        return model
+
+    def stats(self) -> dict:
+        return {
+            "items": self.n_items,
+            "users": len(self._user_rows),
+            "neighbors": self.neighbors,
+            "neighbor_bytes": self.nbr_idx.nbytes + self.nbr_sim.nbytes,
+            "incremental_updates": self.updates
+        }
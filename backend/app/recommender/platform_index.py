@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import threading
+from typing import Iterable, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_PLATFORMS = 64
+
+
+class PlatformIndex:
+    """content_id -> bitmask of tracked platforms it streams on, per region.
+
+    Each region is a sorted array of content ids with a parallel uint64 mask
+    array, so checking thousands of candidates is one searchsorted plus a
+    bitwise AND. Writes land in a small pending dict and are merged into the
+    arrays on the next read of that region; readers never see arrays being
+    mutated.
+    """
+
+    def __init__(self):
+        self._regions: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._pending: dict[str, dict[int, int]] = {}
+        self._bits: dict[int, int] = {}  # platform id -> bit position
+        self._lock = threading.Lock()
+        self.built = False
+
+    def _bit(self, platform_id: int) -> Optional[int]:
+        bit = self._bits.get(platform_id)
+        if bit is None:
+            if len(self._bits) >= MAX_PLATFORMS:
+                logger.warning("platform index: no bit left for platform %s", platform_id)
+                return None
+            bit = self._bits[platform_id] = len(self._bits)
+        return bit
+
+    def mask_for(self, platform_ids: Iterable[Optional[int]]) -> int:
+        """Bitmask covering the given platform ids"""
+        with self._lock:
+            return self._mask(platform_ids)
+
+    def _mask(self, platform_ids: Iterable[Optional[int]]) -> int:
+        mask = 0
+        for platform_id in platform_ids:
+            if platform_id is None:
+                continue
+            bit = self._bit(platform_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def build(self, rows: Iterable[tuple[int, str, Optional[int]]]):
+        """Replace the index with (content_id, region, platform_id) rows; platform_id None marks 'checked, none'"""
+        by_region: dict[str, dict[int, int]] = {}
+        with self._lock:
+            for content_id, region, platform_id in rows:
+                masks = by_region.setdefault(region, {})
+                masks[content_id] = masks.get(content_id, 0) | self._mask([platform_id])
+
+        regions = {region: self._arrays(masks) for region, masks in by_region.items()}
+        with self._lock:
+            self._regions = regions
+            self.built = True
+
+    def set(self, content_id: int, region: str, platform_ids: Iterable[int]) -> bool:
+        """Record the platforms a title is on in a region, replacing what was there; True if that changed it"""
+        with self._lock:
+            mask = self._mask(platform_ids)
+            pending = self._pending.setdefault(region, {})
+            previous = pending.get(content_id)
+            if previous is None:
+                previous = self._stored(region, content_id)
+            pending[content_id] = mask
+            return mask != previous
+
+    def _stored(self, region: str, content_id: int) -> Optional[int]:
+        ids, masks = self._regions.get(region, (None, None))
+        if ids is None or len(ids) == 0:
+            return None
+        row = min(int(np.searchsorted(ids, content_id)), len(ids) - 1)
+        return int(masks[row]) if ids[row] == content_id else None
+
+    @staticmethod
+    def _arrays(masks: dict[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        ids = np.fromiter(masks.keys(), dtype=np.int64, count=len(masks))
+        values = np.fromiter(masks.values(), dtype=np.uint64, count=len(masks))
+        order = np.argsort(ids)
+        return ids[order], values[order]
+
+    def _merge(self, region: str):
+        with self._lock:
+            pending = self._pending.pop(region, None)
+            if not pending:
+                return
+            new_ids, new_masks = self._arrays(pending)
+            ids, masks = self._regions.get(region, (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)))
+
+            rows = np.minimum(np.searchsorted(ids, new_ids), max(len(ids) - 1, 0))
+            found = ids[rows] == new_ids if len(ids) else np.zeros(len(new_ids), dtype=bool)
+            masks = masks.copy()
+            masks[rows[found]] = new_masks[found]
+            if not found.all():
+                ids = np.concatenate([ids, new_ids[~found]])
+                masks = np.concatenate([masks, new_masks[~found]])
+                order = np.argsort(ids, kind="stable")
+                ids, masks = ids[order], masks[order]
+            self._regions[region] = (ids, masks)
+
+    def masks(self, region: str, content_ids: np.ndarray) -> np.ndarray:
+        """Platform mask of each content id in a region (0 when unknown or on no tracked platform)"""
+        if region in self._pending:
+            self._merge(region)
+        content_ids = np.asarray(content_ids, dtype=np.int64)
+        ids, masks = self._regions.get(region, (None, None))
+        if ids is None or len(ids) == 0:
+            return np.zeros(len(content_ids), dtype=np.uint64)
+        rows = np.minimum(np.searchsorted(ids, content_ids), len(ids) - 1)
+        return np.where(ids[rows] == content_ids, masks[rows], np.uint64(0))
+
+    def available(self, region: str, content_ids: np.ndarray, user_mask: int) -> np.ndarray:
+        """Boolean array: is each title on at least one of the platforms in user_mask"""
+        return (self.masks(region, content_ids) & np.uint64(user_mask)) != 0
+
+    def save(self, directory: str):
+        """Write every region's ids and masks as .npy files, plus the platform -> bit assignment"""
+        os.makedirs(directory, exist_ok=True)
+        for region in list(self._pending):
+            self._merge(region)
+        with self._lock:
+            regions = dict(self._regions)
+            bits = dict(self._bits)
+        for position, (ids, masks) in enumerate(regions.values()):
+            np.save(os.path.join(directory, f"ids_{position}.npy"), ids)
+            np.save(os.path.join(directory, f"masks_{position}.npy"), masks)
+        with open(os.path.join(directory, "index.json"), "w") as f:
+            json.dump({"regions": list(regions), "bits": {str(p): bit for p, bit in bits.items()}}, f)
+
+    def load(self, directory: str, mmap: bool = True):
+        """Replace the index with one written by save(); writes not merged yet are kept on top"""
+        with open(os.path.join(directory, "index.json")) as f:
+            index = json.load(f)
+        mode = "r" if mmap else None
+        regions = {
+            region: (
+                np.load(os.path.join(directory, f"ids_{position}.npy"), mmap_mode=mode),
+                np.load(os.path.join(directory, f"masks_{position}.npy"), mmap_mode=mode)
+            )
+            for position, region in enumerate(index["regions"])
+        }
+        with self._lock:
+            # Pending masks were computed with our bit assignment; re-express them in the loaded one
+            platforms = {bit: platform_id for platform_id, bit in self._bits.items()}
+            pending = {
+                region: {
+                    content_id: [platforms[bit] for bit in range(MAX_PLATFORMS) if mask >> bit & 1]
+                    for content_id, mask in writes.items()
+                }
+                for region, writes in self._pending.items()
+            }
+            self._bits = {int(platform_id): bit for platform_id, bit in index["bits"].items()}
+            self._pending = {
+                region: {content_id: self._mask(platform_ids) for content_id, platform_ids in writes.items()}
+                for region, writes in pending.items()
+            }
+            self._regions = regions
+            self.built = True
+
+    def stats(self) -> dict:
+        return {
+            "built": self.built,
+            "platforms": len(self._bits),
+            "regions": {region: len(ids) for region, (ids, _) in self._regions.items()},
+            "pending": sum(len(p) for p in self._pending.values())
+        }
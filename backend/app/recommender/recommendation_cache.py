@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional
+
+
+class RecommendationCache:
+    """Bounded LRU of ranked recommendations; keys are tuples starting with (user_id, region).
+
+    Besides expiring after a TTL, entries are dropped when their user changes
+    (`invalidate_user`) or when one of the titles they list changes
+    availability (`invalidate_content`), found through reverse indexes from
+    user and (content, region) to keys.
+
+    A result computed while an invalidation was happening could be stale, so
+    `set` takes the `token()` read before computing and discards the result
+    if the user, or any title, was invalidated since. Per-user generations
+    are kept for the `max_entries` most recently invalidated users; a user
+    pushed out reads as the newest generation pushed out, so a token from
+    before their invalidation still fails to match.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, content_ids, scores)
+        self._data: OrderedDict[tuple, tuple[float, list[int], list[float]]] = OrderedDict()
+        self._by_user: dict[int, set[tuple]] = {}
+        self._by_content: dict[tuple[int, str], set[tuple]] = {}
+        # Values come from one counter, so the evicted floor is above every older token
+        self._user_generations: OrderedDict[int, int] = OrderedDict()
+        self._user_generation_floor = 0
+        self._generation_counter = 0
+        self._content_generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.discarded = 0
+
+    def get(self, key: tuple) -> Optional[tuple[list[int], list[float]]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def __contains__(self, key: tuple) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def _user_generation(self, user_id: int) -> int:
+        return self._user_generations.get(user_id, self._user_generation_floor)
+
+    def token(self, user_id: int) -> tuple[int, int]:
+        with self._lock:
+            return self._user_generation(user_id), self._content_generation
+
+    def set(self, key: tuple, content_ids: list[int], scores: list[float], token: tuple[int, int]):
+        user_id, region = key[0], key[1]
+        with self._lock:
+            if token != (self._user_generation(user_id), self._content_generation):
+                self.discarded += 1
+                return
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, content_ids, scores)
+            self._by_user.setdefault(user_id, set()).add(key)
+            for content_id in content_ids:
+                self._by_content.setdefault((content_id, region), set()).add(key)
+
+            while len(self._data) > self.max_entries:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._generation_counter += 1
+            self._user_generations[user_id] = self._generation_counter
+            self._user_generations.move_to_end(user_id)
+            while len(self._user_generations) > self.max_entries:
+                _, generation = self._user_generations.popitem(last=False)
+                self._user_generation_floor = max(self._user_generation_floor, generation)
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_content(self, items: Iterable[tuple[int, str]]):
+        """Drop every entry listing one of the (content_id, region) pairs"""
+        with self._lock:
+            self._content_generation += 1
+            for item in items:
+                for key in list(self._by_content.get(item, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_user.clear()
+            self._by_content.clear()
+            self._content_generation += 1
+
+    def _remove(self, key: tuple):
+        _, content_ids, _ = self._data.pop(key)
+        user_id, region = key[0], key[1]
+        self._discard(self._by_user, user_id, key)
+        for content_id in content_ids:
+            self._discard(self._by_content, (content_id, region), key)
+
+    @staticmethod
+    def _discard(index: dict, item: Hashable, key: tuple):
+        keys = index.get(item)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[item]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "indexed_titles": len(self._by_content),
+                "tracked_users": len(self._user_generations),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "discarded": self.discarded
+            }
@@ -0,0 +1,242 @@
+import bisect
+import re
+import threading
+import unicodedata
+from typing import Iterable, Optional
+import numpy as np
+import scipy.sparse as sp
+from app.recommender.content_similarity import STOPWORDS
+from app.recommender.topk import top_k
+
+# Weight of a term by the field it appears in; a term in several fields keeps the highest
+TITLE_WEIGHT = 3.0
+CAST_WEIGHT = 1.5
+DIRECTOR_WEIGHT = 1.5
+OVERVIEW_WEIGHT = 0.5
+
+# A query token matching a longer term counts for less than an exact match
+PREFIX_FACTOR = 0.7
+# Terms a prefix may expand to: the most frequent MAX_EXPANSIONS of the first MAX_PREFIX_SCAN in order
+MAX_EXPANSIONS = 64
+MAX_PREFIX_SCAN = 4096
+MAX_QUERY_TOKENS = 8
+# Extra score for titles that start with the whole query, so "star w" ranks "Star Wars" first
+TITLE_PREFIX_BOOST = 2.0
+
+MAX_PENDING_ROWS = 256
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase with accents stripped, so "Amélie" and "amelie" index the same"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    return TOKEN_RE.findall(normalize(text))
+
+
+class SearchIndex:
+    """Prefix search over content titles, cast, director and overview.
+
+    An inverted index: a vocabulary of normalized terms kept sorted for
+    prefix lookups, and a sparse term x title matrix holding each title's
+    field weight for the term. A query matches titles that contain every
+    query token as a term or a term prefix (so it works while typing), and
+    scores them by the sum over tokens of the best matching term's weight
+    times its IDF.
+
+    Titles indexed with add() go into a small pending matrix that is merged
+    in once it grows past MAX_PENDING_ROWS, like ContentSimilarityIndex.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.content_ids: list[int] = []
+        self._rows: dict[int, int] = {}
+        self._titles: list[str] = []
+
+        self._term_ids: dict[str, int] = {}
+        self._sorted_terms: list[str] = []
+        self._sorted_ids: list[int] = []
+        self._doc_freq = np.zeros(0, dtype=np.int64)
+
+        # Postings as title x term rows: merged (with its transpose for lookups) and pending
+        self._main = sp.csr_matrix((0, 0), dtype=np.float32)
+        self._main_t = self._main.T.tocsr()
+        self._tail = sp.csr_matrix((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.content_ids)
+
+    def __contains__(self, content_id: int) -> bool:
+        return content_id in self._rows
+
+    # Indexing
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = self._term_ids[term] = len(self._term_ids)
+            position = bisect.bisect_left(self._sorted_terms, term)
+            self._sorted_terms.insert(position, term)
+            self._sorted_ids.insert(position, term_id)
+        return term_id
+
+    def _terms(self, content: dict) -> dict[int, float]:
+        weights: dict[int, float] = {}
+
+        def add(tokens: Iterable[str], weight: float):
+            for token in tokens:
+                term_id = self._term_id(token)
+                if weights.get(term_id, 0) < weight:
+                    weights[term_id] = weight
+
+        add(tokenize(content.get("title")), TITLE_WEIGHT)
+        for name in content.get("cast") or []:
+            add(tokenize(name), CAST_WEIGHT)
+        add(tokenize(content.get("director")), DIRECTOR_WEIGHT)
+        add((token for token in tokenize(content.get("overview")) if token not in STOPWORDS), OVERVIEW_WEIGHT)
+        return weights
+
+    def _matrix(self, rows: list[dict[int, float]]) -> sp.csr_matrix:
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        indices = np.fromiter((term_id for row in rows for term_id in row), dtype=np.int64, count=indptr[-1])
+        data = np.fromiter((weight for row in rows for weight in row.values()), dtype=np.float32, count=indptr[-1])
+        return sp.csr_matrix((data, indices, indptr), shape=(len(rows), len(self._term_ids)))
+
+    def _count_terms(self, rows: list[dict[int, float]]):
+        if len(self._doc_freq) < len(self._term_ids):
+            self._doc_freq = np.concatenate(
+                [self._doc_freq, np.zeros(len(self._term_ids) - len(self._doc_freq), dtype=np.int64)]
+            )
+        for row in rows:
+            self._doc_freq[list(row)] += 1
+
+    @staticmethod
+    def _widen(matrix: sp.csr_matrix, columns: int) -> sp.csr_matrix:
+        return sp.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], columns))
+
+    def _compact(self):
+        if self._tail.shape[0]:
+            columns = len(self._term_ids)
+            self._main = sp.vstack([self._widen(self._main, columns), self._widen(self._tail, columns)], format="csr")
+            self._main_t = self._main.T.tocsr()
+            self._tail = sp.csr_matrix((0, columns), dtype=np.float32)
+
+    def build(self, contents: Iterable[dict]):
+        """Replace the index with a catalog of content dicts (id, title, cast, director, overview)"""
+        with self._lock:
+            self._reset()
+            rows = []
+            for content in contents:
+                if content["id"] in self._rows:
+                    continue
+                self._rows[content["id"]] = len(self.content_ids)
+                self.content_ids.append(content["id"])
+                self._titles.append(" ".join(tokenize(content.get("title"))))
+                rows.append(self._terms(content))
+            self._count_terms(rows)
+            self._main = self._matrix(rows)
+            self._main_t = self._main.T.tocsr()
+            self._tail = sp.csr_matrix((0, len(self._term_ids)), dtype=np.float32)
+
+    def add(self, content: dict) -> bool:
+        """Index one new title; returns False if it was already indexed"""
+        with self._lock:
+            if content["id"] in self._rows:
+                return False
+            row = self._terms(content)
+            self._count_terms([row])
+            self._rows[content["id"]] = len(self.content_ids)
+            self.content_ids.append(content["id"])
+            self._titles.append(" ".join(tokenize(content.get("title"))))
+
+            columns = len(self._term_ids)
+            self._tail = sp.vstack([self._widen(self._tail, columns), self._matrix([row])], format="csr")
+            if self._tail.shape[0] > MAX_PENDING_ROWS:
+                self._compact()
+            return True
+
+    # Queries
+
+    def _expand(self, token: str) -> tuple[np.ndarray, np.ndarray]:
+        """(term ids, factor) of the terms a query token matches: itself and the most common extensions"""
+        start = bisect.bisect_left(self._sorted_terms, token)
+        stop = bisect.bisect_left(
+            self._sorted_terms, token + "\U0010ffff", start,
+            min(start + MAX_PREFIX_SCAN, len(self._sorted_terms))
+        )
+        term_ids = np.asarray(self._sorted_ids[start:stop], dtype=np.int64)
+        if len(term_ids) > MAX_EXPANSIONS:
+            # The exact term sorts first; keep it whatever its frequency
+            exact = 1 if self._sorted_terms[start] == token else 0
+            rest = term_ids[exact:]
+            rest = rest[top_k(self._doc_freq[rest].astype(np.float64), MAX_EXPANSIONS)]
+            term_ids = np.concatenate([term_ids[:exact], rest])
+        factors = np.full(len(term_ids), PREFIX_FACTOR, dtype=np.float32)
+        factors[term_ids == self._term_ids.get(token, -1)] = 1.0
+        return term_ids, factors
+
+    def _token_scores(self, term_ids: np.ndarray, factors: np.ndarray) -> np.ndarray:
+        """Best weighted match of any of the terms, per title"""
+        idf = np.log((1 + len(self.content_ids)) / (1 + self._doc_freq[term_ids])) + 1
+        weights = (idf * factors).astype(np.float32)
+
+        main = np.zeros(self._main.shape[0], dtype=np.float32)
+        merged = term_ids < self._main_t.shape[0]
+        if merged.any() and self._main.shape[0]:
+            postings = sp.diags(weights[merged]) @ self._main_t[term_ids[merged]]
+            main = postings.max(axis=0).toarray().ravel()
+
+        tail = np.zeros(self._tail.shape[0], dtype=np.float32)
+        if self._tail.shape[0]:
+            postings = self._widen(self._tail, len(self._term_ids))[:, term_ids] @ sp.diags(weights)
+            tail = postings.max(axis=1).toarray().ravel()
+        return np.concatenate([main, tail])
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> tuple[list[int], int]:
+        """(content ids of one page of matches, best first; total matches)"""
+        tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            scores = None
+            for token in tokens:
+                term_ids, factors = self._expand(token)
+                if not len(term_ids):
+                    return [], 0
+                token_scores = self._token_scores(term_ids, factors)
+                # Every token must match: a title drops out at the first token it lacks
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = np.where((scores > 0) & (token_scores > 0), scores + token_scores, 0)
+
+            matches = np.flatnonzero(scores > 0)
+            if not len(matches) or offset >= len(matches):
+                return [], len(matches)
+
+            # Rank a generous head of candidates, then lift titles that start with the query
+            candidates = matches[top_k(scores[matches], min(len(matches), max(4 * (offset + limit), 100)))]
+            phrase = " ".join(tokens)
+            ranked = scores[candidates] + TITLE_PREFIX_BOOST * np.fromiter(
+                (self._titles[row].startswith(phrase) for row in candidates), dtype=np.float32, count=len(candidates)
+            )
+            candidates = candidates[np.argsort(-ranked, kind="stable")][offset:offset + limit]
+            return [self.content_ids[row] for row in candidates], len(matches)
+
+    def stats(self) -> dict:
+        return {
+            "titles": len(self.content_ids),
+            "terms": len(self._term_ids),
+            "postings": self._main.nnz + self._tail.nnz,
+            "unmerged_rows": self._tail.shape[0]
+        }
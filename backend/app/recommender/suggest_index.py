@@ -0,0 +1,245 @@
+import bisect
+import math
+import os
+import threading
+from typing import Iterable, Optional
+import numpy as np
+from app.recommender.search_index import tokenize
+from app.recommender.topk import top_k
+
+MAX_SUGGESTIONS = 20
+# Key ranges up to this long are ranked on the fly; longer ones (short prefixes) are precomputed
+SCAN_LIMIT = 1024
+# Matches at the start of a title rank above any match on a later word
+TITLE_START_BONUS = 100.0
+
+# What save() writes: display fields per title, and per key its text and title row
+SNAPSHOT_FILE = "suggest.npz"
+SEPARATOR = "\x00"
+_END = "\U0010ffff"
+
+
+def suggestion_score(tmdb_rating: Optional[float], interactions: int) -> float:
+    """Rank of a title among suggestions: TMDB's rating, then how many of our users touched it"""
+    return (tmdb_rating or 0) / 10 + math.log1p(interactions)
+
+
+class SuggestIndex:
+    """Typeahead over content titles: a sorted array of keys searched by binary search.
+
+    Every title contributes one key per word it could be found by, "star
+    wars" and "wars", so "war" suggests it too. A prefix maps to a
+    contiguous range of the sorted keys; ranges longer than SCAN_LIMIT (the
+    first letter or two of a big catalog) have their top MAX_SUGGESTIONS
+    precomputed at build time, shorter ones are ranked with one
+    argpartition, so a lookup is a couple of bisects plus a bounded scan.
+
+    add() puts new titles in a small sorted side list that every query also
+    searches; a rebuild folds it in.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.content_ids: list[int] = []
+        self._rows: dict[int, int] = {}
+        self._titles: list[str] = []
+        self._types: list[str] = []
+        self._years: list[Optional[int]] = []
+        self._posters: list[Optional[str]] = []
+        self._scores = np.empty(0, dtype=np.float32)
+
+        self._keys: list[str] = []
+        self._key_rows = np.empty(0, dtype=np.int64)
+        self._key_scores = np.empty(0, dtype=np.float32)
+        self._top: dict[str, list[tuple[float, int]]] = {}
+
+        # (key, score, row) for titles added since the build, kept sorted by key
+        self._pending: list[tuple[str, float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.content_ids)
+
+    def __contains__(self, content_id: int) -> bool:
+        return content_id in self._rows
+
+    # Building
+
+    @staticmethod
+    def _keys_for(title: Optional[str]) -> list[tuple[str, bool]]:
+        """(key, starts the title) for the title and each of its later words"""
+        words = tokenize(title)
+        return [(" ".join(words[i:]), i == 0) for i in range(len(words))]
+
+    def _append_title(self, content: dict) -> int:
+        row = len(self.content_ids)
+        self.content_ids.append(content["id"])
+        self._rows[content["id"]] = row
+        self._titles.append(content.get("title") or "")
+        self._types.append(content.get("type") or "movie")
+        self._years.append(content.get("release_year"))
+        self._posters.append(content.get("poster_path"))
+        return row
+
+    def build(self, contents: Iterable[dict], interactions: Optional[dict[int, int]] = None):
+        """Replace the index with a catalog of content dicts (id, title, type, release_year, poster_path,
+        tmdb_rating); `interactions` counts user_content rows per content id"""
+        interactions = interactions or {}
+        with self._lock:
+            self._reset()
+            keys, key_rows, key_scores, scores = [], [], [], []
+            for content in contents:
+                if content["id"] in self._rows:
+                    continue
+                score = suggestion_score(content.get("tmdb_rating"), interactions.get(content["id"], 0))
+                row = self._append_title(content)
+                scores.append(score)
+                for key, starts in self._keys_for(content.get("title")):
+                    keys.append(key)
+                    key_rows.append(row)
+                    key_scores.append(score + TITLE_START_BONUS * starts)
+            self._scores = np.asarray(scores, dtype=np.float32)
+            self._set_keys(keys, np.asarray(key_rows, dtype=np.int64), np.asarray(key_scores, dtype=np.float32))
+
+    def _set_keys(self, keys: list[str], key_rows: np.ndarray, key_scores: np.ndarray):
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[i] for i in order]
+        self._key_rows = key_rows[order]
+        self._key_scores = key_scores[order]
+        self._top = {}
+        self._precompute("", 0, len(self._keys))
+
+    def _best(self, lo: int, hi: int, k: int) -> list[tuple[float, int]]:
+        """(score, row) of the k best distinct titles among the keys in [lo, hi)"""
+        # A title can hold several keys in a range ("star star"), so over-fetch before deduplicating
+        picked = lo + top_k(self._key_scores[lo:hi], 2 * k)
+        seen, best = set(), []
+        for score, row in zip(self._key_scores[picked].tolist(), self._key_rows[picked].tolist()):
+            if row not in seen:
+                seen.add(row)
+                best.append((score, row))
+                if len(best) == k:
+                    break
+        return best
+
+    def _precompute(self, prefix: str, lo: int, hi: int):
+        """Store the top rows of every prefix whose range is too long to scan per query"""
+        stack = [(prefix, lo, hi)]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            if hi - lo <= SCAN_LIMIT:
+                continue
+            self._top[prefix] = self._best(lo, hi, MAX_SUGGESTIONS)
+            # Keys equal to the prefix sort first; the rest split by their next character
+            position = bisect.bisect_right(self._keys, prefix, lo, hi)
+            while position < hi:
+                child = self._keys[position][:len(prefix) + 1]
+                child_hi = bisect.bisect_left(self._keys, child + _END, position, hi)
+                stack.append((child, position, child_hi))
+                position = child_hi
+
+    def add(self, content: dict, interactions: int = 0) -> bool:
+        """Make a new title suggestible; returns False if it was already indexed"""
+        with self._lock:
+            if content["id"] in self._rows:
+                return False
+            score = suggestion_score(content.get("tmdb_rating"), interactions)
+            row = self._append_title(content)
+            self._scores = np.append(self._scores, np.float32(score))
+            for key, starts in self._keys_for(content.get("title")):
+                bisect.insort(self._pending, (key, score + TITLE_START_BONUS * starts, row))
+            return True
+
+    # Queries
+
+    def suggest(self, query: str, k: int = 10) -> list[dict]:
+        """Up to k titles with a title word starting with the query, best first"""
+        prefix = " ".join(tokenize(query))
+        if not prefix:
+            return []
+        k = min(k, MAX_SUGGESTIONS)
+
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, prefix + _END, lo)
+            candidates = self._top.get(prefix) if hi - lo > SCAN_LIMIT else None
+            if candidates is None:
+                candidates = self._best(lo, hi, k)
+            candidates = candidates[:k]
+            if self._pending:
+                start = bisect.bisect_left(self._pending, (prefix,))
+                stop = bisect.bisect_left(self._pending, (prefix + _END,), start)
+                candidates = candidates + [(score, row) for _, score, row in self._pending[start:stop][:SCAN_LIMIT]]
+
+            seen, picked = set(), []
+            for _, row in sorted(candidates, reverse=True):
+                if row not in seen:
+                    seen.add(row)
+                    picked.append(row)
+                    if len(picked) == k:
+                        break
+
+            return [
+                {
+                    "id": self.content_ids[row],
+                    "title": self._titles[row],
+                    "media_type": self._types[row],
+                    "release_year": self._years[row],
+                    "poster_path": self._posters[row]
+                }
+                for row in picked
+            ]
+
+    # Snapshots
+
+    def save(self, directory: str):
+        """Write the built index (pending titles included) so a process can start without reading the catalog"""
+        with self._lock:
+            keys = list(self._keys) + [key for key, _, _ in self._pending]
+            key_rows = np.concatenate([self._key_rows, [row for _, _, row in self._pending]]).astype(np.int64)
+            key_scores = np.concatenate([self._key_scores, [score for _, score, _ in self._pending]]).astype(np.float32)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, SNAPSHOT_FILE)
+            with open(path + ".tmp", "wb") as f:
+                np.savez(
+                    f,
+                    content_ids=np.asarray(self.content_ids, dtype=np.int64),
+                    titles=np.frombuffer(SEPARATOR.join(self._titles).encode("utf-8"), dtype=np.uint8),
+                    types=np.frombuffer(SEPARATOR.join(self._types).encode("utf-8"), dtype=np.uint8),
+                    years=np.asarray([year or 0 for year in self._years], dtype=np.int32),
+                    posters=np.frombuffer(SEPARATOR.join(p or "" for p in self._posters).encode("utf-8"), dtype=np.uint8),
+                    scores=self._scores,
+                    keys=np.frombuffer(SEPARATOR.join(keys).encode("utf-8"), dtype=np.uint8),
+                    key_rows=key_rows,
+                    key_scores=key_scores
+                )
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str) -> "SuggestIndex":
+        def strings(array: np.ndarray, count: int) -> list[str]:
+            return array.tobytes().decode("utf-8").split(SEPARATOR) if count else []
+
+        with np.load(os.path.join(directory, SNAPSHOT_FILE)) as data:
+            index = cls()
+            index.content_ids = data["content_ids"].tolist()
+            count = len(index.content_ids)
+            index._rows = {content_id: row for row, content_id in enumerate(index.content_ids)}
+            index._titles = strings(data["titles"], count)
+            index._types = strings(data["types"], count)
+            index._years = [year or None for year in data["years"].tolist()]
+            index._posters = [poster or None for poster in strings(data["posters"], count)]
+            index._scores = data["scores"]
+            key_rows = data["key_rows"]
+            index._set_keys(strings(data["keys"], len(key_rows)), key_rows, data["key_scores"])
+        return index
+
+    def stats(self) -> dict:
+        return {
+            "titles": len(self.content_ids),
+            "keys": len(self._keys),
+            "precomputed_prefixes": len(self._top),
+            "pending_keys": len(self._pending)
+        }
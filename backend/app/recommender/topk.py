@@ -0,0 +1,40 @@
+import numpy as np
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without sorting the whole array"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def top_k_rows(sims: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row top-k of a dense (rows, n) similarity block, best first.
+
+    Returns (indices, similarities), both (rows, k); slots without a positive
+    similarity are -1 / 0.
+    """
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_sims, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+    keep = top_sims > 0
+    return np.where(keep, top, -1), np.where(keep, top_sims, 0)
+
+
+def insert_neighbour(nbr_idx: np.ndarray, nbr_sim: np.ndarray, rows: np.ndarray, neighbour: int, similarities: np.ndarray):
+    """Put `neighbour` into the top-k lists of `rows` in place, dropping each list's weakest entry"""
+    if len(rows) == 0:
+        return
+    idx = np.hstack([nbr_idx[rows], np.full((len(rows), 1), neighbour, dtype=nbr_idx.dtype)])
+    sims = np.hstack([nbr_sim[rows], similarities[:, None].astype(nbr_sim.dtype)])
+    order = np.argsort(-sims, axis=1, kind="stable")[:, :nbr_idx.shape[1]]
+    nbr_idx[rows] = np.take_along_axis(idx, order, axis=1)
+    nbr_sim[rows] = np.take_along_axis(sims, order, axis=1)
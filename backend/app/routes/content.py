@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from app.config import settings
 from app.database import get_db
-from app.services.tmdb_service import (
+from app.services.async_tmdb_service import (
     search_content,
     get_trending,
     get_or_create_content
 )
-from app.services.streaming_service import get_content_availability
+from app.services import search_service, tmdb_service
+from app.services.similarity_service import ensure_similarity_index, get_similar_content
+from app.services.streaming_service import get_content_availability_async, get_bulk_availability
+from app.utils.json_response import FastJSONResponse
 from app.utils.jwt_utils import get_current_user
 from app.models.user import User
 from app.services.rating_service import (
@@ -40,6 +44,19 @@ class ContentSearchResponse(BaseModel):
     page: int
     total_pages: int
     total_results: int
+    source: Optional[str] = None
+
+
+class SuggestionResult(BaseModel):
+    id: int
+    title: str
+    media_type: str
+    release_year: Optional[int] = None
+    poster_path: Optional[str] = None
+
+
+class SuggestResponse(BaseModel):
+    suggestions: list[SuggestionResult]
 
 
 class ContentDetailResponse(BaseModel):
@@ -77,6 +94,44 @@ class AvailabilityResponse(BaseModel):
     stale: Optional[bool] = None
     platforms: list[PlatformResponse]
 
+class AvailabilityBatchItem(BaseModel):
+    content_id: int
+    region: str = "US"
+
+
+class AvailabilityBatchRequest(BaseModel):
+    items: list[AvailabilityBatchItem] = Field(..., min_length=1, max_length=settings.AVAILABILITY_BATCH_MAX_ITEMS)
+
+
+class AvailabilityBatchEntry(AvailabilityResponse):
+    region: str
+
+
+class AvailabilityBatchResponse(BaseModel):
+    results: list[AvailabilityBatchEntry]
+
+
+class SimilarContentInfo(BaseModel):
+    id: int
+    title: str
+    type: str
+    release_year: Optional[int] = None
+    poster_path: Optional[str] = None
+    genres: Optional[list[str]] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class SimilarContentItem(BaseModel):
+    content: SimilarContentInfo
+    similarity: float
+
+
+class SimilarContentResponse(BaseModel):
+    content_id: int
+    results: list[SimilarContentItem]
+
 class RateContentRequest(BaseModel):
     rating: Optional[int] = None
     status: Optional[str] = None
@@ -107,43 +162,100 @@ class UserRatingsResponse(BaseModel):
 
 # Routes
 @router.get("/search", response_model=ContentSearchResponse)
-def search_content_route(
+async def search_content_route(
     query: str = Query(..., min_length=1, description="Search query"),
-    page: int = Query(1, ge=1, description="Page number")
+    page: int = Query(1, ge=1, description="Page number"),
+    db: Session = Depends(get_db)
 ):
-    results = search_content(query, page)
+    # The local catalog answers when it has enough matches; TMDB only otherwise
+    results = await search_service.search_local_async(db, query, page)
+    if results is None:
+        try:
+            results = {**await search_content(query, page), "source": "tmdb"}
+        except HTTPException as e:
+            # TMDB is down: a few local matches beat an error
+            if e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                raise
+            results = await search_service.search_local_async(db, query, page, min_results=1)
+            if results is None:
+                raise
     return results
 
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest_content_route(
+    q: str = Query(..., min_length=1, description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=20)
+):
+    # In-memory only, so it is answered on the event loop
+    return {"suggestions": search_service.suggest(q, limit)}
+
 @router.get("/trending")
-def get_trending_content(
+async def get_trending_content(
     media_type: str = Query("all", regex="^(all|movie|tv)$"),
     time_window: str = Query("week", regex="^(day|week)$")
 ):
-    results = get_trending(media_type, time_window)
-    return results
+    results = await get_trending(media_type, time_window)
+    # Already-parsed TMDB dicts: encode them directly rather than walking them with jsonable_encoder
+    return FastJSONResponse(results)
+
+@router.post("/availability:batch", response_model=AvailabilityBatchResponse)
+def get_bulk_availability_route(
+    request: AvailabilityBatchRequest,
+    db: Session = Depends(get_db)
+):
+    keys = [(item.content_id, item.region) for item in request.items]
+    results = get_bulk_availability(db, keys)
+    
+    return {
+        "results": [
+            {
+                "content_id": content_id,
+                "region": region,
+                "cached": results[(content_id, region)].get("cached", False),
+                "cache_age_days": results[(content_id, region)].get("cache_age_days"),
+                "stale": results[(content_id, region)].get("stale"),
+                "platforms": results[(content_id, region)].get("platforms", [])
+            }
+            for content_id, region in keys
+        ]
+    }
 
 @router.get("/{content_id}", response_model=ContentDetailResponse)
-def get_content_details(
+async def get_content_details(
     content_id: int,
     media_type: str = Query(..., regex="^(movie|tv)$"),
     db: Session = Depends(get_db)
 ):
-    content = get_or_create_content(db, content_id, media_type)
+    content = await get_or_create_content(db, content_id, media_type)
     return content
 
+@router.get("/{content_id}/similar", response_model=SimilarContentResponse)
+def get_similar_content_route(
+    content_id: int,
+    media_type: str = Query(..., pattern="^(movie|tv)$"),
+    limit: int = Query(20, ge=1, le=settings.SIMILAR_CONTENT_NEIGHBORS),
+    db: Session = Depends(get_db)
+):
+    # 503 before any TMDB work while the index is still building
+    ensure_similarity_index()
+    # Fetches the title from TMDB first if we have never seen it
+    tmdb_service.get_or_create_content(db, content_id, media_type)
+    results = get_similar_content(db, content_id, limit=limit)
+    return {"content_id": content_id, "results": results}
+
 @router.get("/{content_id}/availability", response_model=AvailabilityResponse)
-def get_content_availability_route(
+async def get_content_availability_route(
     content_id: int,
     region: str = Query("US", description="Region code (US, GB, CA, ...)"),
-    refresh: bool = Query(False, description="Force refresh even if cached"),
+    refresh: bool = Query(False, description="Refresh stale data before responding instead of in the background"),
     db: Session = Depends(get_db)
 ):
    
-    result = get_content_availability(
+    result = await get_content_availability_async(
         db, 
         content_id, 
         region, 
-        refresh_if_old=not refresh  # If refresh=True, don't use stale cache
+        refresh_if_old=refresh  # Otherwise stale data is served and refreshed in the background
     )
     
     return {
@@ -12,6 +12,8 @@ from app.services.user_service import (
     get_all_platforms
 )
 from app.services.rating_service import get_user_ratings as get_ratings_service
+from app.services.recommendation_service import get_recommendations
+from app.utils.json_response import json_list_response
 from datetime import datetime
 
 router = APIRouter()
@@ -63,9 +65,41 @@ class UserContentItem(BaseModel):
 
 class UserRatingsListResponse(BaseModel):
     ratings: list[UserContentItem]
-    total: int
+    total: Optional[int] = None
+    total_exact: bool = True
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+
+
+class RecommendationItem(BaseModel):
+    content: ContentBasicInfo
+    score: float
+
+
+class RecommendationsResponse(BaseModel):
+    recommendations: list[RecommendationItem]
+
+def _rating_item(user_content) -> dict:
+    """UserContentItem's fields, read straight off a loaded row"""
+    content = user_content.content
+    return {
+        "id": user_content.id,
+        "content_id": user_content.content_id,
+        "rating": user_content.rating,
+        "status": user_content.status,
+        "review_text": user_content.review_text,
+        "created_at": user_content.created_at,
+        "updated_at": user_content.updated_at,
+        "content": {
+            "id": content.id,
+            "title": content.title,
+            "type": content.type,
+            "poster_path": content.poster_path,
+            "release_year": content.release_year
+        }
+    }
+
 
 @router.get("/platforms", response_model=UserPlatformsResponse)
 def get_user_platforms_route(
@@ -95,6 +129,8 @@ def get_user_ratings_route(
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; replaces offset"),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$", description="How to compute total"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -103,6 +139,29 @@ def get_user_ratings_route(
         user_id=current_user.id,
         status_filter=status,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        count_mode=count
+    )
+    # Rows come from our own tables with the content columns loaded; build the
+    # items directly instead of validating up to 500 of them against UserContentItem
+    ratings = [_rating_item(user_content) for user_content in result.pop("ratings")]
+    return json_list_response(result, "ratings", ratings)
+
+
+@router.get("/recommendations", response_model=RecommendationsResponse)
+def get_recommendations_route(
+    limit: int = Query(20, ge=1, le=100),
+    region: str = Query("US", description="Region used for availability"),
+    available_only: bool = Query(True, description="Only titles streaming on one of your platforms"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    recommendations = get_recommendations(
+        db,
+        current_user.id,
+        limit=limit,
+        region=region,
+        available_only=available_only
     )
-    return result
\ No newline at end of file
+    return {"recommendations": recommendations}
@@ -0,0 +1,190 @@
+import asyncio
+import aiohttp
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.models.content import Content
+from app.services import tmdb_client, tmdb_service
+from app.services.tmdb_service import (
+    build_content_values,
+    parse_search_results,
+    parse_watch_providers,
+    providers_cache,
+    search_cache,
+    trending_cache,
+    upsert_content,
+    _normalize_query
+)
+from app.utils.shared_cache import SharedCache
+from app.utils.single_flight import AsyncSingleFlight
+
+# Async mirrors of tmdb_service: the TMDB wait is awaited on the event loop
+# instead of holding a threadpool worker. Caches are shared with the sync path.
+
+# Coalesces concurrent get_or_create_content misses on this event loop; a sync
+# tmdb_service.get_or_create_content (e.g. /similar) for the same title is not
+# coalesced with these and fetches on its own, and the upsert makes that harmless
+content_fetches = AsyncSingleFlight()
+
+
+async def _cache_call(cache, method: str, *args):
+    """Call a cache method; a shared cache does network or disk I/O, so it runs off the event loop"""
+    if isinstance(cache, SharedCache):
+        return await run_in_threadpool(getattr(cache, method), *args)
+    return getattr(cache, method)(*args)
+
+
+def _check_api_key():
+    if not settings.TMDB_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="TMDB API key not configured"
+        )
+
+
+async def _get_json(url: str, params: dict) -> dict:
+    try:
+        return await tmdb_client.aget_json(url, params=params)
+    except (aiohttp.ClientError, asyncio.TimeoutError, tmdb_client.TMDBUnavailableError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"TMDB API error: {str(e)}"
+        )
+
+
+async def search_content(query: str, page: int = 1) -> dict:
+    _check_api_key()
+
+    cache_key = (_normalize_query(query), page)
+    cached = await _cache_call(search_cache, "get", cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        data = await _get_json(f"{tmdb_service.TMDB_BASE_URL}/search/multi", {
+            "api_key": settings.TMDB_API_KEY,
+            "query": query,
+            "page": page,
+            "include_adult": "false"
+        })
+    except HTTPException:
+        stale = await _cache_call(search_cache, "get_stale", cache_key)
+        if stale is not None:
+            return stale
+        raise
+    result = parse_search_results(data)
+    await _cache_call(search_cache, "set", cache_key, result)
+    return result
+
+
+async def get_movie_details(movie_id: int) -> dict:
+    _check_api_key()
+    return await _get_json(f"{tmdb_service.TMDB_BASE_URL}/movie/{movie_id}", {
+        "api_key": settings.TMDB_API_KEY,
+        "append_to_response": "credits,videos"
+    })
+
+
+async def get_tv_details(tv_id: int) -> dict:
+    _check_api_key()
+    return await _get_json(f"{tmdb_service.TMDB_BASE_URL}/tv/{tv_id}", {
+        "api_key": settings.TMDB_API_KEY,
+        "append_to_response": "credits,videos"
+    })
+
+
+async def get_trending(media_type: str = "all", time_window: str = "week") -> dict:
+    _check_api_key()
+
+    cache_key = (media_type, time_window)
+    cached = await _cache_call(trending_cache, "get", cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        data = await _get_json(
+            f"{tmdb_service.TMDB_BASE_URL}/trending/{media_type}/{time_window}",
+            {"api_key": settings.TMDB_API_KEY}
+        )
+    except HTTPException:
+        stale = await _cache_call(trending_cache, "get_stale", cache_key)
+        if stale is not None:
+            return stale
+        raise
+    await _cache_call(trending_cache, "set", cache_key, data)
+    return data
+
+
+async def get_watch_providers(tmdb_id: int, media_type: str, region: str = "US") -> dict:
+    _check_api_key()
+
+    if media_type not in ("movie", "tv"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid media type"
+        )
+
+    cache_key = (media_type, tmdb_id, region)
+    cached = await _cache_call(providers_cache, "get", cache_key)
+    if cached is not None:
+        return cached
+
+    data = await _get_json(
+        f"{tmdb_service.TMDB_BASE_URL}/{media_type}/{tmdb_id}/watch/providers",
+        {"api_key": settings.TMDB_API_KEY}
+    )
+    result = parse_watch_providers(data, region)
+    await _cache_call(providers_cache, "set", cache_key, result)
+    return result
+
+
+def _get_content(db: Session, tmdb_id: int):
+    return db.query(Content).filter(Content.id == tmdb_id).first()
+
+
+def _store_content(values: dict):
+    db = SessionLocal()
+    try:
+        upsert_content(db, [values])
+    finally:
+        db.close()
+
+
+async def _fetch_and_store_content(tmdb_id: int, media_type: str):
+    if media_type == "movie":
+        tmdb_data = await get_movie_details(tmdb_id)
+    else:
+        tmdb_data = await get_tv_details(tmdb_id)
+
+    # Its own session: the fetch outlives the request that started it if that client goes away
+    await run_in_threadpool(_store_content, build_content_values(tmdb_id, media_type, tmdb_data))
+
+
+async def get_or_create_content(db: Session, tmdb_id: int, media_type: str) -> Content:
+    # Database work stays synchronous and runs in the threadpool
+    content = await run_in_threadpool(_get_content, db, tmdb_id)
+
+    if content:
+        return content
+
+    if media_type not in ("movie", "tv"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid media type"
+        )
+
+    await content_fetches.do(
+        (tmdb_id, media_type),
+        lambda: _fetch_and_store_content(tmdb_id, media_type)
+    )
+
+    content = await run_in_threadpool(_get_content, db, tmdb_id)
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Content not found"
+        )
+
+    return content
@@ -2,6 +2,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from app.models.user import User
+from app.config import settings
+from app.services.recommendation_service import recommendation_warmer
+from app.utils.jwt_utils import invalidate_user
 from app.utils.password_utils import hash_password, verify_password
 from datetime import datetime
 
@@ -64,6 +67,10 @@ def authenticate_user(db: Session, email: str, password: str) -> User:
     # Update last login timestamp
     user.last_login = datetime.utcnow()
     db.commit()
+    invalidate_user(user.id)
+    # Have recommendations ready by the time the client asks for them
+    if settings.RECOMMENDATION_WARM:
+        recommendation_warmer.enqueue((user.id, settings.RECOMMENDATION_WARM_REGION))
     
     # Return authenticated user
     return user
@@ -1,9 +1,16 @@
-from sqlalchemy.orm import Session
+import base64
+from typing import Optional
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
+from app.config import settings
 from fastapi import HTTPException, status
 from app.models.user_content import UserContent
 from app.models.content import Content
 from app.models.platform import Platform
+from app.services.recommendation_service import (
+    discard_precomputed, invalidate_user_recommendations, publish_rating_change
+)
 
 
 def rate_content(
@@ -82,9 +89,27 @@ def rate_content(
         db.add(user_content)
     
     db.commit()
-    db.refresh(user_content)
+    publish_rating_change(user_id, content_id, user_content.rating, user_content.status)
+    invalidate_user_recommendations(user_id)
     
-    return user_content
+    # Reload with its content in one query for the response
+    return _get_rating_with_content(db, user_id, content_id)
+
+
+def encode_ratings_cursor(user_content: UserContent) -> str:
+    raw = f"{user_content.updated_at.isoformat()}|{user_content.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_ratings_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        updated_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(updated_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
 
 
 def get_user_ratings(
@@ -92,8 +117,17 @@ def get_user_ratings(
     user_id: int,
     status_filter: str = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    cursor: str = None,
+    count_mode: str = "exact"
 ):
+    """List a user's ratings, most recently updated first.
+
+    Passing `cursor` (the `next_cursor` of the previous page) switches to
+    keyset pagination on (updated_at, id) and ignores `offset`. `count_mode`
+    is "exact", "estimate" (count capped at RATINGS_COUNT_ESTIMATE_CAP) or
+    "none".
+    """
     
     query = db.query(UserContent).filter(UserContent.user_id == user_id)
     
@@ -107,27 +141,67 @@ def get_user_ratings(
             )
         query = query.filter(UserContent.status == status_filter)
     
-    # Order by most recently updated
-    query = query.order_by(UserContent.updated_at.desc())
+    # Count before the keyset filter so the total covers every page
+    total, total_exact = _count_ratings(query, count_mode)
+    
+    # Order by most recently updated, id breaks ties so cursors are stable
+    query = query.order_by(UserContent.updated_at.desc(), UserContent.id.desc())
+    
+    # The list response only needs a few content columns; load them in the same query
+    query = query.options(
+        joinedload(UserContent.content).load_only(
+            Content.id, Content.title, Content.type, Content.poster_path, Content.release_year
+        )
+    )
     
     # Paginate
-    total = query.count()
-    ratings = query.limit(limit).offset(offset).all()
+    if cursor:
+        updated_at, last_id = decode_ratings_cursor(cursor)
+        query = query.filter(tuple_(UserContent.updated_at, UserContent.id) < tuple_(updated_at, last_id))
+        offset = 0
+    
+    # One extra row tells us whether there is a next page
+    rows = query.limit(limit + 1).offset(offset).all()
+    ratings = rows[:limit]
+    next_cursor = encode_ratings_cursor(ratings[-1]) if len(rows) > limit else None
     
     return {
         "ratings": ratings,
         "total": total,
+        "total_exact": total_exact,
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "next_cursor": next_cursor
     }
 
 
+def _count_ratings(query, count_mode: str) -> tuple[Optional[int], bool]:
+    if count_mode == "none":
+        return None, False
+    if count_mode == "estimate":
+        # Stop counting at the cap instead of scanning every row
+        cap = settings.RATINGS_COUNT_ESTIMATE_CAP
+        capped = query.with_entities(UserContent.id).limit(cap + 1).subquery()
+        total = query.session.query(func.count()).select_from(capped).scalar()
+        return min(total, cap), total <= cap
+    return query.count(), True
+
+
+def _get_rating_with_content(db: Session, user_id: int, content_id: int):
+    return (
+        db.query(UserContent)
+        .options(joinedload(UserContent.content))
+        .filter(
+            UserContent.user_id == user_id,
+            UserContent.content_id == content_id
+        )
+        .first()
+    )
+
+
 def get_content_rating(db: Session, user_id: int, content_id: int):
     
-    user_content = db.query(UserContent).filter(
-        UserContent.user_id == user_id,
-        UserContent.content_id == content_id
-    ).first()
+    user_content = _get_rating_with_content(db, user_id, content_id)
     
     return user_content
 
@@ -146,6 +220,9 @@ def delete_rating(db: Session, user_id: int, content_id: int):
         )
     
     db.delete(user_content)
+    discard_precomputed(db, user_id)
     db.commit()
+    publish_rating_change(user_id, content_id)
+    invalidate_user_recommendations(user_id)
     
     return {"message": "Rating deleted successfully"}
\ No newline at end of file
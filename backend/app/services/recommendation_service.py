@@ -0,0 +1,415 @@
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+from fastapi import HTTPException
+from app.config import settings
+from app.database import SessionLocal
+from app.models.content import Content
+from app.models.user import User
+from app.models.user_content import UserContent
+from app.models.user_platform import UserPlatform
+from app.models.user_recommendation import UserRecommendation
+from app.recommender.artifacts import ArtifactStore
+from app.recommender.interactions import interaction_value
+from app.recommender.item_knn import ItemKNN
+from app.recommender.recommendation_cache import RecommendationCache
+from app.services import streaming_service
+from app.utils.background_refresher import BackgroundRefresher
+from app.utils.batch_consumer import BatchConsumer
+
+logger = logging.getLogger(__name__)
+
+# The serving model is swapped as a whole; requests keep using whichever one they picked up
+_model: Optional[ItemKNN] = None
+_model_built_at: Optional[float] = None
+_build_seconds: Optional[float] = None
+_build_lock = threading.Lock()
+
+# Serialises model.update() calls and model swaps
+_update_lock = threading.Lock()
+# (applied_at, event) for rating changes applied here, replayed onto models trained or published since
+_recent_events: deque = deque(maxlen=settings.RATING_EVENTS_MAX_QUEUE)
+
+# Shared on-disk models: jobs/publish_model trains and publishes, the API workers only memory-map the
+# current version, so a deployment trains once per publish rather than once per worker per TTL
+artifact_store = (
+    ArtifactStore(settings.RECOMMENDER_ARTIFACT_DIR, keep=settings.RECOMMENDER_ARTIFACT_KEEP)
+    if settings.RECOMMENDER_ARTIFACT_DIR else None
+)
+_artifact_version: Optional[str] = None
+_artifact_checked_at = 0.0
+
+# update() copies a model's whole matrix and neighbour lists, which would turn every worker's
+# shared memory-mapped pages into private copies; with artifacts, ratings wait for the next version
+incremental_updates = settings.RECOMMENDER_INCREMENTAL_UPDATES and artifact_store is None
+
+# Ranked content ids per (user_id, region, available_only), RECOMMENDATION_CACHE_SIZE deep
+recommendation_cache = RecommendationCache(
+    max_entries=settings.RECOMMENDATION_CACHE_MAX_ENTRIES,
+    ttl=settings.RECOMMENDATION_CACHE_TTL
+)
+streaming_service.add_availability_listener(recommendation_cache.invalidate_content)
+
+
+def load_interactions(db: Session, chunk_size: int = 50000) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stream user_content into (user_ids, content_ids, values) training arrays"""
+    user_ids, content_ids, values = array("q"), array("q"), array("f")
+    rows = db.query(
+        UserContent.user_id,
+        UserContent.content_id,
+        UserContent.rating,
+        UserContent.status
+    ).yield_per(chunk_size)
+
+    for user_id, content_id, rating, status in rows:
+        value = interaction_value(rating, status)
+        if value is None:
+            continue
+        user_ids.append(user_id)
+        content_ids.append(content_id)
+        values.append(value)
+
+    return (
+        np.frombuffer(user_ids, dtype=np.int64),
+        np.frombuffer(content_ids, dtype=np.int64),
+        np.frombuffer(values, dtype=np.float32)
+    )
+
+
+def _catch_up(model: ItemKNN, since: float):
+    # Updates carry absolute values, so replaying ones the model already saw is harmless
+    missed = [event for applied_at, event in _recent_events if applied_at >= since]
+    if missed:
+        model.update(missed)
+
+
+def build_model(db: Session) -> ItemKNN:
+    """Train a fresh item-item model from user_content, start serving it and publish it if artifacts are on"""
+    global _model, _model_built_at, _build_seconds, _artifact_version
+
+    start, started_at = time.perf_counter(), time.time()
+    model = ItemKNN(neighbors=settings.RECOMMENDER_NEIGHBORS, shrinkage=settings.RECOMMENDER_SHRINKAGE)
+    model.fit(*load_interactions(db))
+
+    # Reload the platform index too, picking up availability written by other workers
+    streaming_service.build_platform_index(db)
+
+    with _update_lock:
+        # Changes applied since we started reading may be missing from what we read
+        _catch_up(model, started_at)
+        _model, _model_built_at, _build_seconds = model, time.time(), time.perf_counter() - start
+    logger.info("recommender: trained on %d items in %.2fs", model.n_items, _build_seconds)
+
+    if artifact_store is not None:
+        _artifact_version = artifact_store.publish(
+            {"item_knn": model.save, "platforms": streaming_service.platform_index.save},
+            meta={"trained_from": started_at, "items": model.n_items}
+        )
+        logger.info("recommender: published artifact %s", _artifact_version)
+    return model
+
+
+def load_artifact(version: Optional[str] = None) -> ItemKNN:
+    """Serve a published model version (the current one by default) and its platform index"""
+    global _model, _model_built_at, _build_seconds, _artifact_version
+
+    start = time.perf_counter()
+    path, manifest = artifact_store.open(version)
+    model = ItemKNN.load(os.path.join(path, "item_knn"), shrinkage=settings.RECOMMENDER_SHRINKAGE)
+    streaming_service.platform_index.load(os.path.join(path, "platforms"))
+
+    with _update_lock:
+        _catch_up(model, manifest["meta"]["trained_from"])
+        _model, _model_built_at, _build_seconds = model, manifest["created_at"], time.perf_counter() - start
+        _artifact_version = manifest["version"]
+    logger.info("recommender: loaded artifact %s in %.3fs", _artifact_version, _build_seconds)
+    return model
+
+
+def _follow_artifacts():
+    """Swap to a version another process published, checking CURRENT at most every poll interval"""
+    global _artifact_checked_at
+
+    now = time.monotonic()
+    if now - _artifact_checked_at < settings.RECOMMENDER_ARTIFACT_POLL:
+        return
+    _artifact_checked_at = now
+    version = artifact_store.current()
+    if version is not None and version != _artifact_version:
+        try:
+            load_artifact(version)
+        except Exception:
+            logger.exception("recommender: could not load artifact %s", version)
+
+
+def _rebuild_in_background():
+    db = SessionLocal()
+    try:
+        if artifact_store is not None:
+            # Nothing to load until jobs/publish_model has published a version
+            if artifact_store.current() not in (None, _artifact_version):
+                load_artifact()
+            return
+        build_model(db)
+    except Exception:
+        logger.exception("recommender: rebuild failed")
+    finally:
+        db.close()
+        _build_lock.release()
+
+
+def start_build() -> bool:
+    """Train a model (or load the published one) on a background thread unless one is already being built"""
+    if not _build_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_rebuild_in_background, name="recommender-rebuild", daemon=True).start()
+    return True
+
+
+def get_model() -> ItemKNN:
+    """The serving model, rebuilt in the background once it is older than the TTL.
+
+    With RECOMMENDER_ARTIFACT_DIR set this only follows the published
+    version and never trains. Until a first model is ready (the lifespan
+    starts building or loading one) this raises 503 with Retry-After rather
+    than training inside the request.
+    """
+    if artifact_store is not None:
+        _follow_artifacts()
+
+    if _model is None:
+        start_build()
+        raise HTTPException(
+            status_code=503,  # `status` is a user_content column name throughout this module
+            detail="Recommendations are still being prepared",
+            headers={"Retry-After": str(settings.RECOMMENDER_RETRY_AFTER)}
+        )
+
+    if artifact_store is None and time.time() - _model_built_at > settings.RECOMMENDER_MODEL_TTL:
+        start_build()
+    return _model
+
+
+def _apply_rating_events(events: list[tuple[int, int, Optional[float]]]):
+    with _update_lock:
+        applied_at = time.time()
+        _recent_events.extend((applied_at, event) for event in events)
+        # Before the first build there is nothing to update; the build reads these rows from the table
+        if _model is not None:
+            _model.update(events)
+
+
+rating_events = BatchConsumer(
+    _apply_rating_events,
+    max_batch=settings.RATING_EVENTS_MAX_BATCH,
+    max_queue=settings.RATING_EVENTS_MAX_QUEUE,
+    name="rating-events"
+)
+
+
+def publish_rating_change(user_id: int, content_id: int, rating: Optional[int] = None, status: Optional[str] = None):
+    """Queue a committed user_content change for the serving model (a missing row means removed)"""
+    if incremental_updates:
+        rating_events.publish((user_id, content_id, interaction_value(rating, status)))
+
+
+def _user_interactions(db: Session, user_id: int) -> tuple[list[int], list[float], list[int]]:
+    """(content_ids, values) that feed scoring, plus every content id the user has touched"""
+    rows = db.query(UserContent.content_id, UserContent.rating, UserContent.status).filter(
+        UserContent.user_id == user_id
+    ).all()
+
+    content_ids, values, seen = [], [], []
+    for content_id, rating, status in rows:
+        seen.append(content_id)
+        value = interaction_value(rating, status)
+        if value is not None:
+            content_ids.append(content_id)
+            values.append(value)
+    return content_ids, values, seen
+
+
+def _with_content(db: Session, content_ids: list[int], scores: list[float]) -> list[dict]:
+    contents = db.query(Content).options(
+        load_only(Content.id, Content.title, Content.type, Content.poster_path, Content.release_year)
+    ).filter(Content.id.in_(content_ids)).all()
+    by_id = {content.id: content for content in contents}
+
+    return [
+        {"content": by_id[content_id], "score": score}
+        for content_id, score in zip(content_ids, scores)
+        if content_id in by_id
+    ]
+
+
+def _user_platform_mask(db: Session, user_id: int) -> int:
+    platform_ids = [
+        platform_id for (platform_id,) in
+        db.query(UserPlatform.platform_id).filter(UserPlatform.user_id == user_id)
+    ]
+    return streaming_service.platform_index.mask_for(platform_ids)
+
+
+def _rank(db: Session, user_id: int, k: int, region: str, available_only: bool) -> tuple[list[int], list[float]]:
+
+    content_ids, values, seen = _user_interactions(db, user_id)
+
+    model = get_model()
+
+    # Keep only titles on one of the user's platforms; users without platforms see everything
+    allowed = None
+    if available_only:
+        user_mask = _user_platform_mask(db, user_id)
+        if user_mask:
+            allowed = streaming_service.platform_index.available(region, model.item_ids, user_mask)
+
+    recommended, scores = model.recommend(content_ids, values, k=k, exclude=seen, allowed=allowed)
+    return recommended.tolist(), scores.tolist()
+
+
+def _precomputed_rank(db: Session, user_id: int, region: str) -> Optional[tuple[list[int], list[float]]]:
+    """The batch job's list for the user, if it was generated after their last rating or platform change.
+
+    Rows older than BATCH_RECOMMENDATIONS_MAX_AGE are ignored, so a job that
+    stopped running falls back to live scoring rather than serving old lists.
+    """
+    rows = db.query(
+        UserRecommendation.content_id, UserRecommendation.score, UserRecommendation.generated_at
+    ).filter(
+        UserRecommendation.user_id == user_id,
+        UserRecommendation.region == region
+    ).order_by(UserRecommendation.rank).all()
+    if not rows:
+        return None
+
+    generated_at = min(row.generated_at for row in rows)
+    if generated_at < datetime.utcnow() - timedelta(seconds=settings.BATCH_RECOMMENDATIONS_MAX_AGE):
+        return None
+    # Changing platforms replaces every row, so the newest added_at is the last change
+    rated_at, platforms_at = db.query(
+        db.query(func.max(UserContent.updated_at)).filter(UserContent.user_id == user_id).scalar_subquery(),
+        db.query(func.max(UserPlatform.added_at)).filter(UserPlatform.user_id == user_id).scalar_subquery()
+    ).one()
+    if any(changed_at is not None and changed_at >= generated_at for changed_at in (rated_at, platforms_at)):
+        return None
+
+    content_ids = [row.content_id for row in rows]
+    scores = [row.score for row in rows]
+    # Titles may have left the user's platforms since the job ran
+    user_mask = _user_platform_mask(db, user_id)
+    if user_mask and streaming_service.platform_index.built:
+        keep = streaming_service.platform_index.available(region, np.array(content_ids, dtype=np.int64), user_mask)
+        content_ids = [content_id for content_id, kept in zip(content_ids, keep) if kept]
+        scores = [score for score, kept in zip(scores, keep) if kept]
+    return content_ids, scores
+
+
+def _cached_rank(db: Session, user_id: int, region: str, available_only: bool) -> tuple[list[int], list[float]]:
+    key = (user_id, region, available_only)
+    cached = recommendation_cache.get(key)
+    if cached is None:
+        token = recommendation_cache.token(user_id)
+        # The batch job ranks for the user's platforms, as available_only does; otherwise score live
+        if available_only:
+            cached = _precomputed_rank(db, user_id, region)
+        if cached is None:
+            cached = _rank(db, user_id, settings.RECOMMENDATION_CACHE_SIZE, region, available_only)
+        recommendation_cache.set(key, *cached, token=token)
+    return cached
+
+
+def get_recommendations(
+    db: Session,
+    user_id: int,
+    limit: int = 20,
+    region: str = "US",
+    available_only: bool = True
+) -> list[dict]:
+
+    if limit <= settings.RECOMMENDATION_CACHE_SIZE:
+        content_ids, scores = _cached_rank(db, user_id, region, available_only)
+    else:
+        content_ids, scores = _rank(db, user_id, limit, region, available_only)
+
+    return _with_content(db, content_ids[:limit], scores[:limit])
+
+
+def discard_precomputed(db: Session, user_id: int):
+    """Drop the batch job's rows for a user, in the caller's transaction.
+
+    For changes that leave no timestamp for _precomputed_rank to compare:
+    a deleted rating, or a user left with no platforms.
+    """
+    db.query(UserRecommendation).filter(UserRecommendation.user_id == user_id).delete(synchronize_session=False)
+
+
+def invalidate_user_recommendations(user_id: int):
+    """Drop a user's cached recommendations after their ratings or platforms changed"""
+    recommendation_cache.invalidate_user(user_id)
+
+
+def _warm(key: tuple[int, str]):
+    user_id, region = key
+    if (user_id, region, True) in recommendation_cache:
+        return
+    db = SessionLocal()
+    try:
+        _cached_rank(db, user_id, region, available_only=True)
+    except HTTPException:
+        # No model yet; the next scan queues the user again
+        return
+    finally:
+        db.close()
+
+
+def find_recently_active_users(limit: int = None) -> list[tuple[int, str]]:
+    """(user_id, region) for users who logged in recently and have nothing cached, most recent first"""
+    limit = limit or settings.RECOMMENDATION_WARM_LIMIT
+    region = settings.RECOMMENDATION_WARM_REGION
+    active_since = datetime.utcnow() - timedelta(seconds=settings.RECOMMENDATION_WARM_ACTIVE_WINDOW)
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(User.id)
+            .filter(User.last_login >= active_since)
+            .order_by(User.last_login.desc())
+            .limit(limit)
+            .all()
+        )
+        return [(user_id, region) for (user_id,) in rows if (user_id, region, True) not in recommendation_cache]
+    finally:
+        db.close()
+
+
+# Keeps recently active users' recommendations cached so requests are usually a cache read
+recommendation_warmer = BackgroundRefresher(
+    refresh=_warm,
+    rate=settings.RECOMMENDATION_WARM_RATE,
+    burst=settings.RECOMMENDATION_WARM_RATE,
+    scan=find_recently_active_users,
+    scan_interval=settings.RECOMMENDATION_WARM_INTERVAL,
+    name="recommendation-warmer"
+)
+
+
+def stats() -> dict:
+    if _model is None:
+        return {"trained": False, "building": _build_lock.locked()}
+    return {
+        "trained": True,
+        "building": _build_lock.locked(),
+        "built_at": _model_built_at,
+        "build_seconds": round(_build_seconds, 3),
+        "artifact_version": _artifact_version,
+        **_model.stats(),
+        "platform_index": streaming_service.platform_index.stats()
+    }
@@ -0,0 +1,193 @@
+import logging
+import math
+import threading
+import time
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.models.content import Content
+from app.models.user_content import UserContent
+from app.recommender.search_index import SearchIndex
+from app.recommender.suggest_index import SuggestIndex
+from app.services import tmdb_service
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = (Content.id, Content.title, Content.cast, Content.director, Content.overview)
+SUGGEST_COLUMNS = (Content.id, Content.title, Content.type, Content.release_year, Content.poster_path, Content.tmdb_rating)
+PAGE_SIZE = 20  # TMDB's page size, so local and TMDB pages line up
+
+search_index = SearchIndex()
+suggest_index = SuggestIndex()
+_built_at = 0.0
+_build_lock = threading.Lock()
+_update_lock = threading.Lock()
+# Rows stored while a build reads the table, replayed into the new index before it is swapped in
+_stored_during_build: Optional[list[dict]] = None
+
+
+def build_search_index(db: Session, chunk_size: int = 5000):
+    """Index the whole catalog for search and suggestions and swap both in"""
+    global search_index, suggest_index, _built_at, _stored_during_build
+
+    with _update_lock:
+        _stored_during_build = []
+    index, suggestions = SearchIndex(), SuggestIndex()
+    try:
+        index.build(dict(row._mapping) for row in db.query(*SEARCH_COLUMNS).yield_per(chunk_size))
+        interactions = dict(
+            db.query(UserContent.content_id, func.count(UserContent.id)).group_by(UserContent.content_id).all()
+        )
+        suggestions.build(
+            (dict(row._mapping) for row in db.query(*SUGGEST_COLUMNS).yield_per(chunk_size)),
+            interactions=interactions
+        )
+    finally:
+        with _update_lock:
+            stored, _stored_during_build = _stored_during_build, None
+    with _update_lock:
+        for row in stored:
+            index.add(row)
+            suggestions.add(row)
+        search_index, suggest_index = index, suggestions
+        _built_at = time.time()
+    logger.info("search index: %d titles, %d terms", len(index), index.stats()["terms"])
+
+    if settings.SUGGEST_SNAPSHOT_DIR:
+        try:
+            suggestions.save(settings.SUGGEST_SNAPSHOT_DIR)
+        except OSError:
+            logger.exception("suggest index: writing the snapshot failed")
+
+
+def load_suggest_snapshot() -> bool:
+    """Serve suggestions from the last snapshot until the first build finishes"""
+    global suggest_index
+    if not settings.SUGGEST_SNAPSHOT_DIR:
+        return False
+    try:
+        snapshot = SuggestIndex.load(settings.SUGGEST_SNAPSHOT_DIR)
+    except FileNotFoundError:
+        return False
+    with _update_lock:
+        if not _built_at:
+            suggest_index = snapshot
+    logger.info("suggest index: loaded %d titles from snapshot", len(snapshot))
+    return True
+
+
+def _build_in_background():
+    db = SessionLocal()
+    try:
+        build_search_index(db)
+    except Exception:
+        logger.exception("search index: build failed")
+    finally:
+        db.close()
+        _build_lock.release()
+
+
+def start_build() -> bool:
+    """Build (or rebuild) the index on a background thread unless one is already running"""
+    if not _build_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_build_in_background, name="search-index-build", daemon=True).start()
+    return True
+
+
+def _on_content_stored(rows: list[dict]):
+    with _update_lock:
+        if _stored_during_build is not None:
+            _stored_during_build.extend(rows)
+        # The live index only; a build in progress replays _stored_during_build instead
+        if _built_at:
+            for row in rows:
+                search_index.add(row)
+        # A snapshot may be serving suggestions before the first build
+        for row in rows:
+            suggest_index.add(row)
+
+
+tmdb_service.add_content_listener(_on_content_stored)
+
+
+def search_local(db: Session, query: str, page: int = 1, min_results: Optional[int] = None) -> Optional[dict]:
+    """A page of search results from the local catalog, or None when TMDB should answer instead.
+
+    That is when the index is not built yet (the first call starts the
+    build), fewer titles than SEARCH_LOCAL_MIN_RESULTS match, or `page`
+    is past the last local match, so deep pages come from TMDB. The index
+    is rebuilt in the background once older than SEARCH_INDEX_TTL, which
+    picks up titles other processes stored, e.g. the export ingestion job.
+    `min_results` overrides the minimum, e.g. 1 when TMDB is unavailable.
+    """
+    if not settings.SEARCH_LOCAL:
+        return None
+    if not _built_at or time.time() - _built_at > settings.SEARCH_INDEX_TTL:
+        start_build()
+        if not _built_at:
+            return None
+
+    content_ids, total = search_index.search(query, limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE)
+    if total < (settings.SEARCH_LOCAL_MIN_RESULTS if min_results is None else min_results) or not content_ids:
+        return None
+
+    contents = db.query(Content).options(
+        load_only(
+            Content.id, Content.title, Content.type, Content.overview,
+            Content.poster_path, Content.release_year, Content.tmdb_rating
+        )
+    ).filter(Content.id.in_(content_ids)).all()
+    by_id = {content.id: content for content in contents}
+
+    results = []
+    for content_id in content_ids:
+        content = by_id.get(content_id)
+        if content is None:
+            continue
+        # Same shape as a TMDB search/multi result; only the release year is stored
+        year = str(content.release_year) if content.release_year else None
+        result = {
+            "id": content.id,
+            "media_type": content.type,
+            "overview": content.overview,
+            "poster_path": content.poster_path,
+            "vote_average": content.tmdb_rating
+        }
+        if content.type == "movie":
+            result.update(title=content.title, release_date=year)
+        else:
+            result.update(name=content.title, first_air_date=year)
+        results.append(result)
+
+    return {
+        "results": results,
+        "page": page,
+        "total_pages": max(1, math.ceil(total / PAGE_SIZE)),
+        "total_results": total,
+        "source": "local"
+    }
+
+
+async def search_local_async(db: Session, query: str, page: int = 1, min_results: Optional[int] = None) -> Optional[dict]:
+    """search_local off the event loop; the index lookup and the row fetch both block"""
+    return await run_in_threadpool(search_local, db, query, page, min_results)
+
+
+def suggest(query: str, limit: int = 10) -> list[dict]:
+    """Typeahead suggestions from memory; never touches the database or TMDB"""
+    if not _built_at:
+        start_build()
+    return suggest_index.suggest(query, limit)
+
+
+def stats() -> dict:
+    return {
+        "built_at": _built_at or None,
+        "building": _build_lock.locked(),
+        **search_index.stats(),
+        "suggest": suggest_index.stats()
+    }
@@ -0,0 +1,109 @@
+import logging
+import threading
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, load_only
+from app.config import settings
+from app.database import SessionLocal
+from app.models.content import Content
+from app.recommender.content_similarity import ContentSimilarityIndex
+from app.services import tmdb_service
+
+logger = logging.getLogger(__name__)
+
+similarity_index = ContentSimilarityIndex(neighbors=settings.SIMILAR_CONTENT_NEIGHBORS)
+_built = False
+_build_lock = threading.Lock()
+
+FEATURE_COLUMNS = (Content.id, Content.genres, Content.cast, Content.director, Content.overview)
+
+
+def _precompute_in_background():
+    try:
+        similarity_index.precompute()
+    except Exception:
+        logger.exception("similarity index: precompute failed")
+
+
+def build_similarity_index(db: Session, chunk_size: int = 5000):
+    """Load the whole catalog into the index; neighbour lists are filled in on a background thread"""
+    global _built
+
+    rows = db.query(*FEATURE_COLUMNS).yield_per(chunk_size)
+    similarity_index.build([dict(row._mapping) for row in rows])
+    _built = True
+    threading.Thread(target=_precompute_in_background, name="similarity-precompute", daemon=True).start()
+
+
+def _build_in_background():
+    db = SessionLocal()
+    try:
+        build_similarity_index(db)
+    except Exception:
+        logger.exception("similarity index: build failed")
+    finally:
+        db.close()
+        _build_lock.release()
+
+
+def start_build() -> bool:
+    """Build the index on a background thread unless it is built or already being built"""
+    if _built or not _build_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_build_in_background, name="similarity-index-build", daemon=True).start()
+    return True
+
+
+def ensure_similarity_index():
+    """Raise 503 with Retry-After until the index is built, starting the build if nothing has"""
+    if _built:
+        return
+    start_build()
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Similar titles are still being indexed",
+        headers={"Retry-After": str(settings.SIMILAR_CONTENT_RETRY_AFTER)}
+    )
+
+
+def _on_content_stored(rows: list[dict]):
+    # No index yet; a row the build reads too early is added by get_similar_content when asked for
+    if not _built:
+        return
+    for row in rows:
+        similarity_index.add(row)
+
+
+tmdb_service.add_content_listener(_on_content_stored)
+
+
+def get_similar_content(db: Session, content_id: int, limit: int = 20) -> list[dict]:
+
+    ensure_similarity_index()
+
+    result = similarity_index.similar(content_id, limit)
+    if result is None:
+        # Stored by another worker since our build
+        row = db.query(*FEATURE_COLUMNS).filter(Content.id == content_id).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Content not found"
+            )
+        similarity_index.add(dict(row._mapping))
+        result = similarity_index.similar(content_id, limit)
+
+    content_ids, similarities = result
+    contents = db.query(Content).options(
+        load_only(Content.id, Content.title, Content.type, Content.poster_path, Content.release_year, Content.genres)
+    ).filter(Content.id.in_(content_ids)).all()
+    by_id = {content.id: content for content in contents}
+
+    return [
+        {"content": by_id[similar_id], "similarity": similarity}
+        for similar_id, similarity in zip(content_ids, similarities)
+        if similar_id in by_id
+    ]
+
+
+def stats() -> dict:
+    return {"built": _built, "building": _build_lock.locked(), **similarity_index.stats()}
@@ -1,64 +1,143 @@
-from sqlalchemy.orm import Session
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException
 from datetime import datetime, timedelta
+from app.config import settings
 from app.models.streaming_availability import StreamingAvailability
 from app.models.platform import Platform
 from app.models.content import Content
-from app.services.tmdb_service import get_watch_providers
+from app.services import async_tmdb_service
+from app.services.tmdb_service import fetch_watch_providers, get_watch_providers, providers_cache
+from app.database import SessionLocal
+from app.models.user_content import UserContent
+from app.recommender.platform_index import PlatformIndex
+from app.utils.background_refresher import BackgroundRefresher
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_MAX_AGE = timedelta(days=7)
+
+# Content ids per DELETE ... IN when replacing availability in bulk
+AVAILABILITY_WRITE_CHUNK = 500
+
+# In-memory content -> platform bitmask per region, for filtering recommendation candidates
+platform_index = PlatformIndex()
+
+# Called with the (content_id, region) pairs whose tracked platforms changed
+_availability_listeners: list[Callable[[list[tuple[int, str]]], None]] = []
+
+
+def add_availability_listener(listener: Callable[[list[tuple[int, str]]], None]):
+    _availability_listeners.append(listener)
+
+
+def _index_availability(written: dict[tuple[int, str], list[int]]):
+    changed = [
+        (content_id, region) for (content_id, region), platform_ids in written.items()
+        if platform_index.set(content_id, region, platform_ids)
+    ]
+    if not changed:
+        return
+    for listener in _availability_listeners:
+        try:
+            listener(changed)
+        except Exception:
+            logger.exception("availability listener %r failed", listener)
 
 
 def update_content_availability(db: Session, content_id: int, media_type: str, region: str = "US"):
     
     # Get watch providers from TMDB
     provider_data = get_watch_providers(content_id, media_type, region)
-    tmdb_providers = provider_data.get("providers", [])
+    return save_content_availability(db, content_id, region, provider_data.get("providers", []))
+
+
+def save_content_availability(db: Session, content_id: int, region: str, tmdb_providers: list[dict]):
+    
+    return save_availability_batch(db, {(content_id, region): tmdb_providers})[(content_id, region)]
+
+
+def save_availability_batch(db: Session, results: dict[tuple[int, str], list[dict]]) -> dict[tuple[int, str], list[int]]:
+    """Replace the availability rows of many (content_id, region) pairs in one transaction.
+
+    `results` maps each pair to its TMDB providers; returns the tracked
+    platform ids written for each pair.
+    """
+    written = _replace_availability_batch(db, results, _tracked_platform_map(db))
+    db.commit()
+    _index_availability(written)
     
+    return written
+
+
+def _tracked_platform_map(db: Session) -> dict[int, int]:
     # Get platforms with their TMDB provider IDs
     platforms = db.query(Platform).filter(Platform.tmdb_provider_id.isnot(None)).all()
-    platform_map = {p.tmdb_provider_id: p.id for p in platforms}
+    return {p.tmdb_provider_id: p.id for p in platforms}
+
+
+def _replace_availability_batch(
+    db: Session,
+    results: dict[tuple[int, str], list[dict]],
+    platform_map: dict[int, int]
+) -> dict[tuple[int, str], list[int]]:
+    """Swap in new availability rows for many content/region pairs; the caller commits.
+
+    Old rows go in one DELETE ... WHERE content_id IN per region (and
+    chunk of ids) and new ones in a single executemany INSERT. The table is
+    unique on (content_id, platform_id, region), but an upsert on it would
+    still need a delete: a title's platform set can shrink, and the
+    platform-less row that marks a title checked has a NULL platform_id,
+    which the unique key never matches. If either statement fails the
+    session is rolled back, so the deleted rows are not committed without
+    their replacements.
+    """
+    content_ids_by_region = defaultdict(list)
+    for content_id, region in results:
+        content_ids_by_region[region].append(content_id)
     
-    # Delete old availability data for content
-    db.query(StreamingAvailability).filter(
-        StreamingAvailability.content_id == content_id,
-        StreamingAvailability.region == region
-    ).delete()
-    
-    # Add new availability data
-    available_platform_ids = []
-    
-    if tmdb_providers:
-        # Content is available on some platforms
-        for provider in tmdb_providers:
-            tmdb_provider_id = provider.get("provider_id")
-            
-            # Check if this provider is one we track
-            if tmdb_provider_id in platform_map:
-                platform_id = platform_map[tmdb_provider_id]
-                availability = StreamingAvailability(
-                    content_id=content_id,
-                    platform_id=platform_id,
-                    region=region,
-                    last_checked=datetime.utcnow()
-                )
-                db.add(availability)
-                available_platform_ids.append(platform_id)
-    
-    # create entry to mark content checked
-    if not available_platform_ids:
-        # No platforms available
-        availability = StreamingAvailability(
-            content_id=content_id,
-            platform_id=None,  # not available on any tracked platform
-            region=region,
-            last_checked=datetime.utcnow()
+    # Add new availability data, only for providers we track
+    checked_at = datetime.utcnow()
+    rows = []
+    written = {}
+    for (content_id, region), tmdb_providers in results.items():
+        # dict.fromkeys keeps order and drops repeats, which the unique key would reject
+        available_platform_ids = written[(content_id, region)] = list(dict.fromkeys(
+            platform_map[provider.get("provider_id")]
+            for provider in tmdb_providers or []
+            if provider.get("provider_id") in platform_map
+        ))
+        # A row with no platform still marks the content checked
+        rows.extend(
+            {"content_id": content_id, "platform_id": platform_id, "region": region, "last_checked": checked_at}
+            for platform_id in available_platform_ids or [None]
         )
-        db.add(availability)
     
-    db.commit()
+    try:
+        # Delete old availability data for content
+        for region, content_ids in content_ids_by_region.items():
+            for start in range(0, len(content_ids), AVAILABILITY_WRITE_CHUNK):
+                db.query(StreamingAvailability).filter(
+                    StreamingAvailability.region == region,
+                    StreamingAvailability.content_id.in_(content_ids[start:start + AVAILABILITY_WRITE_CHUNK])
+                ).delete(synchronize_session=False)
+        
+        if rows:
+            db.execute(insert(StreamingAvailability), rows)
+    except Exception:
+        db.rollback()
+        raise
     
-    return available_platform_ids
+    return written
 
 
-def get_content_availability(db: Session, content_id: int, region: str = "US", refresh_if_old: bool = True):
+def _cached_availability(db: Session, content_id: int, region: str, refresh_if_old: bool):
+    """Return the cached availability result, or None when it must be fetched"""
     
     # Check cache
     availability_records = db.query(StreamingAvailability).filter(
@@ -66,13 +145,23 @@ def get_content_availability(db: Session, content_id: int, region: str = "US", r
         StreamingAvailability.region == region
     ).all()
     
+    result = _availability_from_records(availability_records, refresh_if_old)
+    if result is not None and result.get("stale"):
+        # Serve the stale rows now and refresh them off the request path
+        availability_refresher.enqueue((content_id, region))
+    
+    return result
+
+
+def _availability_from_records(availability_records: list[StreamingAvailability], refresh_if_old: bool):
+    
     # check records they're fresh
     if availability_records:
         # Check if oldest entry is less than 7 days old
         oldest = min(a.last_checked for a in availability_records)
         cache_age = datetime.utcnow() - oldest
         
-        if cache_age < timedelta(days=7):
+        if cache_age < AVAILABILITY_MAX_AGE:
             # Cache is fresh, return it
             platforms = [a.platform for a in availability_records if a.platform_id is not None]
             return {
@@ -89,6 +178,19 @@ def get_content_availability(db: Session, content_id: int, region: str = "US", r
                 "platforms": platforms
             }
     
+    return None
+
+
+def _platforms_by_id(db: Session, platform_ids: list[int]) -> list[Platform]:
+    return db.query(Platform).filter(Platform.id.in_(platform_ids)).all() if platform_ids else []
+
+
+def get_content_availability(db: Session, content_id: int, region: str = "US", refresh_if_old: bool = True):
+    
+    cached = _cached_availability(db, content_id, region, refresh_if_old)
+    if cached is not None:
+        return cached
+    
     # fetch fresh data
     content = db.query(Content).filter(Content.id == content_id).first()
     
@@ -102,9 +204,217 @@ def get_content_availability(db: Session, content_id: int, region: str = "US", r
     platform_ids = update_content_availability(db, content_id, content.type, region)
     
     # Get platform objects
-    platforms = db.query(Platform).filter(Platform.id.in_(platform_ids)).all() if platform_ids else []
+    platforms = _platforms_by_id(db, platform_ids)
+    
+    return {
+        "cached": False,
+        "platforms": platforms
+    }
+
+
+def _content_type(db: Session, content_id: int):
+    row = db.query(Content.type).filter(Content.id == content_id).first()
+    return row[0] if row else None
+
+
+def _save_and_load_platforms(db: Session, content_id: int, region: str, tmdb_providers: list[dict]):
+    platform_ids = save_content_availability(db, content_id, region, tmdb_providers)
+    return _platforms_by_id(db, platform_ids)
+
+
+async def get_content_availability_async(db: Session, content_id: int, region: str = "US", refresh_if_old: bool = True):
+    """Same as get_content_availability, but awaits the TMDB lookup"""
+    
+    cached = await run_in_threadpool(_cached_availability, db, content_id, region, refresh_if_old)
+    if cached is not None:
+        return cached
+    
+    media_type = await run_in_threadpool(_content_type, db, content_id)
+    
+    if not media_type:
+        return {
+            "cached": False,
+            "platforms": []
+        }
+    
+    provider_data = await async_tmdb_service.get_watch_providers(content_id, media_type, region)
+    platforms = await run_in_threadpool(
+        _save_and_load_platforms, db, content_id, region, provider_data.get("providers", [])
+    )
     
     return {
         "cached": False,
         "platforms": platforms
-    }
\ No newline at end of file
+    }
+
+
+def get_bulk_availability(db: Session, items: list[tuple[int, str]]) -> dict[tuple[int, str], dict]:
+    """Availability for many (content_id, region) pairs.
+
+    Cached rows for every pair are read with one IN query. Stale or missing
+    pairs are fetched from TMDB concurrently and written back in a single
+    transaction.
+    """
+    keys = list(dict.fromkeys(items))
+    content_ids = {content_id for content_id, _ in keys}
+    regions = {region for _, region in keys}
+    
+    records = (
+        db.query(StreamingAvailability)
+        .options(joinedload(StreamingAvailability.platform))
+        .filter(
+            StreamingAvailability.content_id.in_(content_ids),
+            StreamingAvailability.region.in_(regions)
+        )
+        .all()
+    )
+    records_by_key = defaultdict(list)
+    for record in records:
+        records_by_key[(record.content_id, record.region)].append(record)
+    
+    results = {}
+    to_refresh = []
+    for key in keys:
+        cached = _availability_from_records(records_by_key.get(key, []), refresh_if_old=True)
+        if cached is not None:
+            results[key] = cached
+        else:
+            to_refresh.append(key)
+    
+    if not to_refresh:
+        return results
+    
+    # Unknown content can't be looked up on TMDB
+    content_types = dict(
+        db.query(Content.id, Content.type)
+        .filter(Content.id.in_({content_id for content_id, _ in to_refresh}))
+        .all()
+    )
+    for key in to_refresh:
+        if key[0] not in content_types:
+            results[key] = {"cached": False, "platforms": []}
+    to_refresh = [key for key in to_refresh if key[0] in content_types]
+    
+    fetched = _fetch_watch_providers(
+        [(content_id, content_types[content_id], region) for content_id, region in to_refresh]
+    )
+    
+    platform_map = _tracked_platform_map(db)
+    platforms_by_id = {p.id: p for p in db.query(Platform).filter(Platform.id.in_(platform_map.values())).all()}
+    
+    for key in to_refresh:
+        if key not in fetched:
+            # TMDB failed for this one: fall back to whatever we had
+            stale = _availability_from_records(records_by_key.get(key, []), refresh_if_old=False)
+            results[key] = stale or {"cached": False, "platforms": []}
+    
+    written = _replace_availability_batch(db, fetched, platform_map)
+    for key in written:
+        results[key] = {
+            "cached": False,
+            "platforms": [platforms_by_id[platform_id] for platform_id in written[key]]
+        }
+    
+    db.commit()
+    _index_availability(written)
+    
+    return results
+
+
+def _fetch_watch_providers(lookups: list[tuple[int, str, str]]) -> dict[tuple[int, str], list[dict]]:
+    """Fetch providers for (content_id, media_type, region) triples on a bounded thread pool.
+
+    Lookups that fail are left out of the result.
+    """
+    if not lookups:
+        return {}
+    
+    # One batched read of the provider cache; only the misses go to TMDB
+    cached = providers_cache.get_many([(media_type, content_id, region) for content_id, media_type, region in lookups])
+    missing = [lookup for lookup in lookups if (lookup[1], lookup[0], lookup[2]) not in cached]
+    
+    def fetch(lookup):
+        content_id, media_type, region = lookup
+        try:
+            return fetch_watch_providers(content_id, media_type, region)
+        except HTTPException:
+            return None
+    
+    fetched = {}
+    if missing:
+        workers = min(settings.AVAILABILITY_REFRESH_WORKERS, len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fetched = {
+                (media_type, content_id, region): result
+                for (content_id, media_type, region), result in zip(missing, pool.map(fetch, missing))
+                if result is not None
+            }
+        providers_cache.set_many(fetched)
+    
+    found = {**cached, **fetched}
+    return {
+        (content_id, region): found[(media_type, content_id, region)].get("providers", [])
+        for content_id, media_type, region in lookups
+        if (media_type, content_id, region) in found
+    }
+
+
+
+def build_platform_index(db: Session):
+    """(Re)load platform_index from streaming_availability"""
+    rows = db.query(
+        StreamingAvailability.content_id,
+        StreamingAvailability.region,
+        StreamingAvailability.platform_id
+    ).all()
+    platform_index.build(rows)
+
+
+def _refresh_in_background(key: tuple[int, str]):
+    content_id, region = key
+    db = SessionLocal()
+    try:
+        media_type = _content_type(db, content_id)
+        if media_type:
+            update_content_availability(db, content_id, media_type, region)
+    finally:
+        db.close()
+
+
+def find_expiring_availability(limit: int = None) -> list[tuple[int, str]]:
+    """(content_id, region) pairs that are stale or about to be, most-rated content first"""
+    limit = limit or settings.AVAILABILITY_SCAN_LIMIT
+    expires_before = datetime.utcnow() - AVAILABILITY_MAX_AGE + timedelta(seconds=settings.AVAILABILITY_REFRESH_AHEAD)
+    
+    db = SessionLocal()
+    try:
+        popularity = (
+            db.query(UserContent.content_id, func.count(UserContent.id).label("interactions"))
+            .group_by(UserContent.content_id)
+            .subquery()
+        )
+        oldest = func.min(StreamingAvailability.last_checked)
+        rows = (
+            db.query(StreamingAvailability.content_id, StreamingAvailability.region)
+            .join(popularity, popularity.c.content_id == StreamingAvailability.content_id)
+            .group_by(StreamingAvailability.content_id, StreamingAvailability.region, popularity.c.interactions)
+            .having(oldest < expires_before)
+            .order_by(popularity.c.interactions.desc())
+            .limit(limit)
+            .all()
+        )
+        return [(content_id, region) for content_id, region in rows]
+    finally:
+        db.close()
+
+
+# Stale-while-revalidate worker: requests serve stale rows and queue them here
+availability_refresher = BackgroundRefresher(
+    refresh=_refresh_in_background,
+    rate=settings.AVAILABILITY_REFRESH_RATE,
+    burst=settings.AVAILABILITY_REFRESH_BURST,
+    workers=settings.AVAILABILITY_BACKGROUND_WORKERS,
+    scan=find_expiring_availability,
+    scan_interval=settings.AVAILABILITY_SCAN_INTERVAL,
+    name="availability-refresher"
+)
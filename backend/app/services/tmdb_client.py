@@ -0,0 +1,332 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+from urllib.parse import urlparse
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from app.config import settings
+from app.utils.circuit_breaker import OPEN, CircuitBreaker
+from app.utils.rate_limit import TokenBucket
+
+# One pooled session per process so TMDB calls reuse keep-alive connections
+# instead of paying DNS + TCP + TLS setup on every request
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# Async counterpart; an aiohttp session is bound to the event loop that created it
+_async_session: Optional[aiohttp.ClientSession] = None
+_async_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Worth another attempt: rate limited, or TMDB itself failing
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+_ID_RE = re.compile(r"/\d+(?=/|$)")
+
+
+class TMDBUnavailableError(Exception):
+    """A call was refused before it went out: the circuit is open or the rate limit queue is full"""
+
+
+class TMDBGovernor:
+    """Every TMDB call in the process goes through this.
+
+    A token bucket keeps us under TMDB's rate limit; a call that would have
+    to queue longer than `max_wait` is refused rather than holding a
+    worker. 429s, 5xx and connection errors are retried with full-jitter
+    exponential backoff, honouring Retry-After up to `max_delay` and giving
+    up at once past it. Those failures and timeouts feed a circuit breaker,
+    which refuses calls outright while TMDB is unhealthy, so a brownout
+    costs a fast 503 (or a stale cached answer) instead of a 10 s wait per
+    request.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_wait: float,
+        retries: int,
+        base_delay: float,
+        max_delay: float,
+        failure_threshold: int,
+        reset_timeout: float
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_wait = max_wait
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, dict] = defaultdict(lambda: {
+            "requests": 0, "ok": 0, "client_errors": 0, "rate_limited": 0, "server_errors": 0,
+            "network_errors": 0, "retries": 0, "rejected": 0, "throttle_wait_s": 0.0, "latency_s": 0.0
+        })
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        """Metrics label for a URL: its path with ids folded, e.g. /movie/{id}/watch/providers"""
+        path = urlparse(url).path
+        base = urlparse(settings.TMDB_BASE_URL).path
+        if base and path.startswith(base):
+            path = path[len(base):]
+        return _ID_RE.sub("/{id}", path) or "/"
+
+    def _count(self, endpoint: str, **increments):
+        with self._lock:
+            counters = self._endpoints[endpoint]
+            for name, value in increments.items():
+                counters[name] += value
+
+    def admit(self, endpoint: str) -> float:
+        """Seconds to wait before sending, or TMDBUnavailableError if the call must not go out.
+
+        An admitted call holds the breaker's trial slot when it is half-open,
+        so the caller must end every attempt with record() or release().
+        """
+        # The breaker first, so a refused call never takes a token; half-open lets a single trial through
+        if not self.breaker.allow():
+            self._count(endpoint, rejected=1)
+            if self.breaker.state == OPEN:
+                raise TMDBUnavailableError(f"TMDB circuit open, retry in {self.breaker.retry_after():.0f}s")
+            raise TMDBUnavailableError("TMDB circuit half-open, trial call in flight")
+        wait = self.bucket.reserve(max_wait=self.max_wait)
+        if wait is None:
+            self.breaker.release()
+            self._count(endpoint, rejected=1)
+            raise TMDBUnavailableError("TMDB rate limit queue is full")
+        self._count(endpoint, throttle_wait_s=wait)
+        return wait
+
+    def release(self, endpoint: str):
+        """End an admitted attempt that was abandoned before it was sent"""
+        self.breaker.release()
+
+    def record(self, endpoint: str, status: Optional[int], seconds: float):
+        """Count one finished attempt; `status` is None for a network error or timeout"""
+        if status is None:
+            self._count(endpoint, requests=1, network_errors=1, latency_s=seconds)
+        elif status == 429:
+            self._count(endpoint, requests=1, rate_limited=1, latency_s=seconds)
+        elif status >= 500:
+            self._count(endpoint, requests=1, server_errors=1, latency_s=seconds)
+        elif status >= 400:
+            self._count(endpoint, requests=1, client_errors=1, latency_s=seconds)
+        else:
+            self._count(endpoint, requests=1, ok=1, latency_s=seconds)
+
+        if status is None or status in RETRY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            # A 404 is TMDB answering correctly
+            self.breaker.record_success()
+
+    def retry_delay(self, endpoint: str, attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """Backoff before the next attempt, or None when out of retries.
+
+        Also None when TMDB's Retry-After is longer than `max_delay`: retrying
+        sooner would land inside its rate-limit window again, so the caller
+        gets the error now and can serve a stale answer or a 503.
+        """
+        if attempt >= self.retries:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after and retry_after.isdigit():
+            if float(retry_after) > self.max_delay:
+                return None
+            delay = max(delay, float(retry_after))
+        self._count(endpoint, retries=1)
+        return delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint, counters in self._endpoints.items():
+                counters = dict(counters)
+                counters["avg_latency_ms"] = (
+                    round(counters.pop("latency_s") / counters["requests"] * 1000, 1) if counters["requests"] else None
+                )
+                counters["throttle_wait_s"] = round(counters["throttle_wait_s"], 3)
+                endpoints[endpoint] = counters
+        return {
+            "circuit": self.breaker.stats(),
+            "rate_limit": {"rate": self.bucket.rate, "available": round(self.bucket.available(), 2)},
+            "endpoints": endpoints
+        }
+
+
+governor = TMDBGovernor(
+    rate=settings.TMDB_RATE_LIMIT,
+    burst=settings.TMDB_RATE_BURST,
+    max_wait=settings.TMDB_RATE_LIMIT_MAX_WAIT,
+    retries=settings.TMDB_RETRIES,
+    base_delay=settings.TMDB_RETRY_BASE_DELAY,
+    max_delay=settings.TMDB_RETRY_MAX_DELAY,
+    failure_threshold=settings.TMDB_BREAKER_FAILURES,
+    reset_timeout=settings.TMDB_BREAKER_RESET
+)
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,  # all traffic goes to a single host
+        pool_maxsize=settings.TMDB_POOL_SIZE,
+        pool_block=settings.TMDB_POOL_BLOCK
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept": "application/json",
+        "Connection": "keep-alive"
+    })
+    return session
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def default_timeout() -> tuple[float, float]:
+    return (settings.TMDB_CONNECT_TIMEOUT, settings.TMDB_READ_TIMEOUT)
+
+
+def get(url: str, params: Optional[dict] = None, timeout: Optional[float | tuple] = None) -> requests.Response:
+    """GET a TMDB URL through the shared pooled session and the governor.
+
+    Returns the last response, which the caller still checks with
+    raise_for_status; raises TMDBUnavailableError if the call was refused.
+    """
+    endpoint = governor.endpoint(url)
+    attempt = 0
+    while True:
+        wait = governor.admit(endpoint)
+        started = None
+        recorded = False
+        try:
+            if wait > 0:
+                time.sleep(wait)
+            started = time.perf_counter()
+            try:
+                response = get_session().get(url, params=params, timeout=timeout or default_timeout())
+            except requests.Timeout:
+                # Waiting out another full timeout is what the breaker is there to avoid
+                recorded = True
+                governor.record(endpoint, None, time.perf_counter() - started)
+                raise
+            except requests.ConnectionError:
+                recorded = True
+                governor.record(endpoint, None, time.perf_counter() - started)
+                delay = governor.retry_delay(endpoint, attempt)
+                if delay is None:
+                    raise
+            else:
+                recorded = True
+                governor.record(endpoint, response.status_code, time.perf_counter() - started)
+                delay = None
+                if response.status_code in RETRY_STATUSES:
+                    delay = governor.retry_delay(endpoint, attempt, response.headers.get("Retry-After"))
+                if delay is None:
+                    return response
+                response.close()
+        finally:
+            # Anything else (a broken body, an interrupt) still ends the attempt, or a half-open
+            # breaker would wait on its trial forever
+            if not recorded:
+                _end_attempt(endpoint, started)
+        time.sleep(delay)
+        attempt += 1
+
+
+def _end_attempt(endpoint: str, started: Optional[float]):
+    if started is None:
+        governor.release(endpoint)
+    else:
+        governor.record(endpoint, None, time.perf_counter() - started)
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_async_session() -> aiohttp.ClientSession:
+    global _async_session, _async_session_loop
+    loop = asyncio.get_running_loop()
+    if _async_session is None or _async_session_loop is not loop:
+        _async_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.TMDB_ASYNC_MAX_CONNECTIONS,
+                ttl_dns_cache=300
+            ),
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=settings.TMDB_CONNECT_TIMEOUT,
+                sock_read=settings.TMDB_READ_TIMEOUT
+            ),
+            headers={"Accept": "application/json"}
+        )
+        _async_session_loop = loop
+    return _async_session
+
+
+async def aget_json(url: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+    """Async GET of a TMDB URL through the shared aiohttp session and the governor, returning the decoded body"""
+    request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+    endpoint = governor.endpoint(url)
+    attempt = 0
+    while True:
+        wait = governor.admit(endpoint)
+        started = None
+        recorded = False
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            started = time.perf_counter()
+            try:
+                async with get_async_session().get(url, params=params, timeout=request_timeout) as response:
+                    recorded = True
+                    governor.record(endpoint, response.status, time.perf_counter() - started)
+                    delay = None
+                    if response.status in RETRY_STATUSES:
+                        delay = governor.retry_delay(endpoint, attempt, response.headers.get("Retry-After"))
+                    if delay is None:
+                        response.raise_for_status()
+                        return await response.json()
+            except asyncio.TimeoutError:
+                if not recorded:
+                    recorded = True
+                    governor.record(endpoint, None, time.perf_counter() - started)
+                raise
+            except aiohttp.ClientConnectionError:
+                if not recorded:
+                    recorded = True
+                    governor.record(endpoint, None, time.perf_counter() - started)
+                delay = governor.retry_delay(endpoint, attempt)
+                if delay is None:
+                    raise
+        finally:
+            # Cancellation (a client that went away) and decoding errors end the attempt too
+            if not recorded:
+                _end_attempt(endpoint, started)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def aclose_session():
+    global _async_session, _async_session_loop
+    if _async_session is not None:
+        await _async_session.close()
+        _async_session = None
+        _async_session_loop = None
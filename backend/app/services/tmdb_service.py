@@ -1,13 +1,103 @@
+import logging
 import requests
-from typing import Optional
+from typing import Callable, Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from app.config import settings
 from app.models.content import Content
+from app.services import tmdb_client
+from app.utils.single_flight import SingleFlight
+from app.utils.shared_cache import make_cache
 
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+logger = logging.getLogger(__name__)
+
+TMDB_BASE_URL = settings.TMDB_BASE_URL
 TMDB_IMAGE_BASE_URL = "https://image.tmdb.org/t/p/w500"
 
+# Response caches for the endpoints whose results are shared across users (and, with CACHE_URL, workers)
+search_cache = make_cache(
+    "tmdb:search",
+    max_entries=settings.TMDB_CACHE_MAX_ENTRIES,
+    ttl=settings.TMDB_SEARCH_CACHE_TTL,
+    max_bytes=settings.TMDB_CACHE_MAX_BYTES,
+    stale_ttl=settings.TMDB_CACHE_STALE_TTL
+)
+trending_cache = make_cache(
+    "tmdb:trending",
+    max_entries=16,  # only six valid media_type/time_window combinations
+    ttl=settings.TMDB_TRENDING_CACHE_TTL,
+    max_bytes=settings.TMDB_CACHE_MAX_BYTES,
+    stale_ttl=settings.TMDB_CACHE_STALE_TTL
+)
+# Parsed watch providers per (media_type, tmdb_id, region)
+providers_cache = make_cache(
+    "tmdb:providers",
+    max_entries=settings.TMDB_CACHE_MAX_ENTRIES,
+    ttl=settings.TMDB_PROVIDERS_CACHE_TTL,
+    max_bytes=settings.TMDB_CACHE_MAX_BYTES
+)
+
+# Coalesces concurrent get_or_create_content misses per (tmdb_id, media_type) among threads;
+# async_tmdb_service.content_fetches coalesces the async route's misses separately
+content_fetches = SingleFlight()
+
+# Called with the row dicts given to upsert_content once they are committed.
+# Rows that already existed are included, so listeners must be idempotent.
+_content_listeners: list[Callable[[list[dict]], None]] = []
+
+
+def add_content_listener(listener: Callable[[list[dict]], None]):
+    _content_listeners.append(listener)
+
+
+def _notify_content_stored(rows: list[dict]):
+    for listener in _content_listeners:
+        try:
+            listener(rows)
+        except Exception:
+            logger.exception("content listener %r failed", listener)
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def stats() -> dict:
+    return {
+        "search": search_cache.stats(),
+        "trending": trending_cache.stats(),
+        "providers": providers_cache.stats(),
+        "content_fetches": content_fetches.stats()
+    }
+
+
+def parse_search_results(data: dict) -> dict:
+    results = [
+        item for item in data.get("results", [])
+        if item.get("media_type") in ["movie", "tv"]
+    ]
+    
+    return {
+        "results": results,
+        "page": data.get("page", 1),
+        "total_pages": data.get("total_pages", 1),
+        "total_results": len(results)
+    }
+
+
+def parse_watch_providers(data: dict, region: str) -> dict:
+    # Get providers for specified region
+    region_data = data.get("results", {}).get(region, {})
+    
+    # We only care about 'flatrate' (subscription streaming)
+    providers = region_data.get("flatrate", [])
+    
+    return {
+        "region": region,
+        "providers": providers
+    }
+
 
 def search_content(query: str, page: int = 1) -> dict:
     if not settings.TMDB_API_KEY:
@@ -16,6 +106,11 @@ def search_content(query: str, page: int = 1) -> dict:
             detail="TMDB API key not configured"
         )
     
+    cache_key = (_normalize_query(query), page)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     url = f"{TMDB_BASE_URL}/search/multi"
     params = {
         "api_key": settings.TMDB_API_KEY,
@@ -25,22 +120,15 @@ def search_content(query: str, page: int = 1) -> dict:
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = tmdb_client.get(url, params=params)
         response.raise_for_status()
-        data = response.json()
-        
-        results = [
-            item for item in data.get("results", [])
-            if item.get("media_type") in ["movie", "tv"]
-        ]
-        
-        return {
-            "results": results,
-            "page": data.get("page", 1),
-            "total_pages": data.get("total_pages", 1),
-            "total_results": len(results)
-        }
-    except requests.RequestException as e:
+        result = parse_search_results(response.json())
+        search_cache.set(cache_key, result)
+        return result
+    except (requests.RequestException, tmdb_client.TMDBUnavailableError) as e:
+        stale = search_cache.get_stale(cache_key)
+        if stale is not None:
+            return stale
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"TMDB API error: {str(e)}"
@@ -62,10 +150,10 @@ def get_movie_details(movie_id: int) -> dict:
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = tmdb_client.get(url, params=params)
         response.raise_for_status()
         return response.json()
-    except requests.RequestException as e:
+    except (requests.RequestException, tmdb_client.TMDBUnavailableError) as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"TMDB API error: {str(e)}"
@@ -86,32 +174,18 @@ def get_tv_details(tv_id: int) -> dict:
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = tmdb_client.get(url, params=params)
         response.raise_for_status()
         return response.json()
-    except requests.RequestException as e:
+    except (requests.RequestException, tmdb_client.TMDBUnavailableError) as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"TMDB API error: {str(e)}"
         )
 
 
-def get_or_create_content(db: Session, tmdb_id: int, media_type: str) -> Content:
-    content = db.query(Content).filter(Content.id == tmdb_id).first()
-    
-    if content:
-        return content
-    
-    if media_type == "movie":
-        tmdb_data = get_movie_details(tmdb_id)
-    elif media_type == "tv":
-        tmdb_data = get_tv_details(tmdb_id)
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid media type"
-        )
-    
+def build_content_values(tmdb_id: int, media_type: str, tmdb_data: dict) -> dict:
+    """Map a TMDB details payload onto Content column values"""
     if media_type == "movie":
         title = tmdb_data.get("title")
         release_year = tmdb_data.get("release_date", "")[:4] if tmdb_data.get("release_date") else None
@@ -140,25 +214,86 @@ def get_or_create_content(db: Session, tmdb_id: int, media_type: str) -> Content
             trailer_url = f"https://www.youtube.com/watch?v={video.get('key')}"
             break
     
-    content = Content(
-        id=tmdb_id,
-        title=title,
-        type=media_type,
-        release_year=int(release_year) if release_year and release_year.isdigit() else None,
-        genres=genres,
-        overview=tmdb_data.get("overview"),
-        poster_path=tmdb_data.get("poster_path"),
-        backdrop_path=tmdb_data.get("backdrop_path"),
-        tmdb_rating=tmdb_data.get("vote_average"),
-        runtime=runtime,
-        director=director,
-        cast=cast,
-        trailer_url=trailer_url
+    return {
+        "id": tmdb_id,
+        "title": title,
+        "type": media_type,
+        "release_year": int(release_year) if release_year and release_year.isdigit() else None,
+        "genres": genres,
+        "overview": tmdb_data.get("overview"),
+        "poster_path": tmdb_data.get("poster_path"),
+        "backdrop_path": tmdb_data.get("backdrop_path"),
+        "tmdb_rating": tmdb_data.get("vote_average"),
+        "runtime": runtime,
+        "director": director,
+        "cast": cast,
+        "trailer_url": trailer_url
+    }
+
+
+def upsert_content(db: Session, rows: list[dict]):
+    """Insert Content rows, leaving any row whose id already exists untouched"""
+    if not rows:
+        return
+    
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+    
+    if insert is not None:
+        db.execute(insert(Content).values(rows).on_conflict_do_nothing(index_elements=["id"]))
+        db.commit()
+        _notify_content_stored(rows)
+        return
+    
+    # No native upsert: insert row by row and skip ids another writer already added
+    for row in rows:
+        try:
+            db.add(Content(**row))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+    _notify_content_stored(rows)
+
+
+def _fetch_and_store_content(db: Session, tmdb_id: int, media_type: str):
+    if media_type == "movie":
+        tmdb_data = get_movie_details(tmdb_id)
+    else:
+        tmdb_data = get_tv_details(tmdb_id)
+    
+    upsert_content(db, [build_content_values(tmdb_id, media_type, tmdb_data)])
+
+
+def get_or_create_content(db: Session, tmdb_id: int, media_type: str) -> Content:
+    content = db.query(Content).filter(Content.id == tmdb_id).first()
+    
+    if content:
+        return content
+    
+    if media_type not in ("movie", "tv"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid media type"
+        )
+    
+    # Concurrent misses for the same title share one TMDB fetch and insert;
+    # everyone then reads the committed row through their own session
+    content_fetches.do(
+        (tmdb_id, media_type),
+        lambda: _fetch_and_store_content(db, tmdb_id, media_type)
     )
     
-    db.add(content)
-    db.commit()
-    db.refresh(content)
+    content = db.query(Content).filter(Content.id == tmdb_id).first()
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Content not found"
+        )
     
     return content
 
@@ -170,16 +305,26 @@ def get_trending(media_type: str = "all", time_window: str = "week") -> dict:
             detail="TMDB API key not configured"
         )
     
+    cache_key = (media_type, time_window)
+    cached = trending_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     url = f"{TMDB_BASE_URL}/trending/{media_type}/{time_window}"
     params = {
         "api_key": settings.TMDB_API_KEY
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = tmdb_client.get(url, params=params)
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        data = response.json()
+        trending_cache.set(cache_key, data)
+        return data
+    except (requests.RequestException, tmdb_client.TMDBUnavailableError) as e:
+        stale = trending_cache.get_stale(cache_key)
+        if stale is not None:
+            return stale
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"TMDB API error: {str(e)}"
@@ -187,6 +332,18 @@ def get_trending(media_type: str = "all", time_window: str = "week") -> dict:
 
 
 def get_watch_providers(tmdb_id: int, media_type: str, region: str = "US") -> dict:
+    cache_key = (media_type, tmdb_id, region)
+    cached = providers_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    result = fetch_watch_providers(tmdb_id, media_type, region)
+    providers_cache.set(cache_key, result)
+    return result
+
+
+def fetch_watch_providers(tmdb_id: int, media_type: str, region: str = "US") -> dict:
+    """get_watch_providers without the cache, for callers that read and fill it in batches"""
     if not settings.TMDB_API_KEY:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -208,21 +365,10 @@ def get_watch_providers(tmdb_id: int, media_type: str, region: str = "US") -> di
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = tmdb_client.get(url, params=params)
         response.raise_for_status()
-        data = response.json()
-        
-        # Get providers for specified region
-        region_data = data.get("results", {}).get(region, {})
-        
-        # We only care about 'flatrate' (subscription streaming)
-        providers = region_data.get("flatrate", [])
-        
-        return {
-            "region": region,
-            "providers": providers
-        }
-    except requests.RequestException as e:
+        return parse_watch_providers(response.json(), region)
+    except (requests.RequestException, tmdb_client.TMDBUnavailableError) as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"TMDB API error: {str(e)}"
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.models.user_platform import UserPlatform
 from app.models.platform import Platform
+from app.services.recommendation_service import discard_precomputed, invalidate_user_recommendations
 
 
 def get_user_platforms(db: Session, user_id: int) -> list[Platform]:
@@ -32,8 +33,12 @@ def update_user_platforms(db: Session, user_id: int, platform_ids: list[int]) ->
     for platform_id in platform_ids:
         user_platform = UserPlatform(user_id=user_id, platform_id=platform_id)
         db.add(user_platform)
+    # With no platforms left there is no added_at to show the batch rows are out of date
+    if not platform_ids:
+        discard_precomputed(db, user_id)
     
     db.commit()
+    invalidate_user_recommendations(user_id)
     
     # Return updated platforms
     return get_user_platforms(db, user_id)
@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """Deduplicating work queue drained by daemon threads at a bounded rate.
+
+    `refresh(key)` is called once per queued key, no faster than the token
+    bucket allows. If `scan` is given it is called every `scan_interval`
+    seconds and the keys it returns are queued as well.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[Hashable], None],
+        rate: float,
+        burst: float,
+        workers: int = 1,
+        max_queue: int = 10000,
+        scan: Optional[Callable[[], Iterable[Hashable]]] = None,
+        scan_interval: float = 300,
+        name: str = "refresher"
+    ):
+        self.refresh = refresh
+        self.scan = scan
+        self.scan_interval = scan_interval
+        self.workers = workers
+        self.max_queue = max_queue
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+
+        # key -> time it was queued; insertion order is processing order
+        self._queue: OrderedDict[Hashable, float] = OrderedDict()
+        self._in_progress: set[Hashable] = set()
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self._lag_total = 0.0
+        self.last_scan_at = None
+
+    def enqueue(self, key: Hashable) -> bool:
+        """Queue a key for refresh; returns False if it was already queued or the queue is full"""
+        with self._cond:
+            if key in self._queue or key in self._in_progress:
+                return False
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._queue[key] = time.monotonic()
+            self.enqueued += 1
+            self._cond.notify()
+            return True
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.scan is not None:
+            thread = threading.Thread(target=self._scan_loop, name=f"{self.name}-scan", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_pending(self):
+        """Refresh every queued item on the calling thread, paced by the same rate limit as the workers"""
+        while True:
+            item = self._next(block=False)
+            if item is None:
+                return
+            self._run(item)
+
+    def _next(self, block: bool = True):
+        with self._cond:
+            while not self._queue:
+                if not block or self._stopping.is_set():
+                    return None
+                self._cond.wait(timeout=1.0)
+            key, queued_at = self._queue.popitem(last=False)
+            self._in_progress.add(key)
+            return key, queued_at
+
+    def _run(self, item):
+        key, queued_at = item
+        self.bucket.acquire()
+        succeeded = False
+        try:
+            self.refresh(key)
+            succeeded = True
+        except Exception:
+            logger.exception("%s: refresh of %r failed", self.name, key)
+        finally:
+            lag = time.monotonic() - queued_at
+            with self._cond:
+                if succeeded:
+                    self.refreshed += 1
+                else:
+                    self.failed += 1
+                self._in_progress.discard(key)
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                self._lag_total += lag
+
+    def _work(self):
+        while not self._stopping.is_set():
+            item = self._next()
+            if item is not None:
+                self._run(item)
+
+    def _scan_loop(self):
+        while not self._stopping.wait(self.scan_interval):
+            try:
+                for key in self.scan():
+                    self.enqueue(key)
+                self.last_scan_at = time.time()
+            except Exception:
+                logger.exception("%s: scan failed", self.name)
+
+    def stats(self) -> dict:
+        with self._cond:
+            completed = self.refreshed + self.failed
+            return {
+                "running": bool(self._threads),
+                "queue_depth": len(self._queue),
+                "in_progress": len(self._in_progress),
+                "oldest_queued_seconds": round(time.monotonic() - next(iter(self._queue.values())), 3) if self._queue else 0.0,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "refreshed": self.refreshed,
+                "failed": self.failed,
+                "last_lag_seconds": round(self.last_lag, 3) if self.last_lag is not None else None,
+                "avg_lag_seconds": round(self._lag_total / completed, 3) if completed else None,
+                "max_lag_seconds": round(self.max_lag, 3),
+                "last_scan_at": self.last_scan_at
+            }
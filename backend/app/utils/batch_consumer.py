@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BatchConsumer:
+    """In-process event queue drained in batches by one daemon thread.
+
+    `publish` never blocks the caller: when the queue is full the event is
+    dropped and counted. The worker hands `handle` every event queued at the
+    time (up to `max_batch`), in publish order, so it can coalesce work.
+    Lag is measured from publish to the end of the batch that handled it.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[list[Any]], None],
+        max_batch: int = 500,
+        max_queue: int = 100000,
+        name: str = "consumer"
+    ):
+        self.handle = handle
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.name = name
+
+        self._queue: deque[tuple[float, Any]] = deque()
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._busy = False
+
+        self.published = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self._lag_total = 0.0
+
+    def publish(self, event: Any) -> bool:
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._queue.append((time.monotonic(), event))
+            self.published += 1
+            self._cond.notify()
+            return True
+
+    def start(self):
+        if self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._work, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def run_pending(self):
+        """Apply everything queued so far, max_batch at a time, without starting the consumer thread"""
+        while True:
+            batch = self._next(block=False)
+            if not batch:
+                return
+            self._run(batch)
+
+    def _next(self, block: bool = True) -> list[tuple[float, Any]]:
+        with self._cond:
+            while not self._queue:
+                if not block or self._stopping.is_set():
+                    return []
+                self._cond.wait(timeout=1.0)
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            self._busy = True
+            return batch
+
+    def _run(self, batch: list[tuple[float, Any]]):
+        succeeded = False
+        try:
+            self.handle([event for _, event in batch])
+            succeeded = True
+        except Exception:
+            logger.exception("%s: batch of %d events failed", self.name, len(batch))
+        finally:
+            now = time.monotonic()
+            with self._cond:
+                self._busy = False
+                self.batches += 1
+                if succeeded:
+                    self.processed += len(batch)
+                else:
+                    self.failed += len(batch)
+                for published_at, _ in batch:
+                    lag = now - published_at
+                    self.max_lag = max(self.max_lag, lag)
+                    self._lag_total += lag
+                self.last_lag = now - batch[-1][0]
+
+    def _work(self):
+        while not self._stopping.is_set():
+            batch = self._next()
+            if batch:
+                self._run(batch)
+
+    def stats(self) -> dict:
+        with self._cond:
+            completed = self.processed + self.failed
+            return {
+                "running": self._thread is not None,
+                "queue_depth": len(self._queue),
+                "busy": self._busy,
+                "oldest_queued_seconds": round(time.monotonic() - self._queue[0][0], 3) if self._queue else 0.0,
+                "published": self.published,
+                "dropped": self.dropped,
+                "processed": self.processed,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_lag_seconds": round(self.last_lag, 3) if self.last_lag is not None else None,
+                "avg_lag_seconds": round(self._lag_total / completed, 3) if completed else None,
+                "max_lag_seconds": round(self.max_lag, 3)
+            }
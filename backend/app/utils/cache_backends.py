@@ -0,0 +1,275 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+from urllib.parse import unquote, urlparse
+
+# Keys per SELECT ... IN, under SQLite's default bound-parameter limit
+SQLITE_CHUNK = 500
+# Writes between sweeps of expired (and over-budget) SQLite entries
+SQLITE_SWEEP_EVERY = 1000
+
+
+class CacheBackendError(Exception):
+    """The shared store could not be reached or answered with an error"""
+
+
+@contextmanager
+def _sqlite_errors():
+    try:
+        yield
+    except sqlite3.Error as e:
+        raise CacheBackendError(f"sqlite cache: {e}") from e
+
+
+class SQLiteBackend:
+    """Shared cache in one SQLite file, for the workers of a single host.
+
+    WAL mode lets every worker read while one writes, and the file is
+    memory-mapped, so a hit is a B-tree lookup in the page cache the
+    workers share. Expired entries are swept every SQLITE_SWEEP_EVERY
+    writes, along with the soonest-expiring ones beyond `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200000, timeout: float = 0.05, mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with _sqlite_errors():
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+                " WITHOUT ROWID"
+            )
+            self._connection().execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections may not cross threads (or a fork); each thread keeps its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        found = {}
+        now = time.time()
+        with _sqlite_errors():
+            connection = self._connection()
+            for start in range(0, len(keys), SQLITE_CHUNK):
+                chunk = keys[start:start + SQLITE_CHUNK]
+                found.update(connection.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                    (*chunk, now)
+                ).fetchall())
+        return found
+
+    def set_many(self, items: dict[str, bytes], ttl: float):
+        if not items:
+            return
+        expires_at = time.time() + ttl
+        with _sqlite_errors():
+            connection = self._connection()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    [(key, value, expires_at) for key, value in items.items()]
+                )
+        with self._writes_lock:
+            self._writes += len(items)
+            sweep = self._writes >= SQLITE_SWEEP_EVERY
+            if sweep:
+                self._writes = 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self):
+        """Drop expired entries, then the soonest-expiring ones beyond max_entries"""
+        with _sqlite_errors():
+            connection = self._connection()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+                excess = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    connection.execute(
+                        "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)", (excess,)
+                    )
+
+    def delete_many(self, keys: list[str]):
+        with _sqlite_errors():
+            connection = self._connection()
+            for start in range(0, len(keys), SQLITE_CHUNK):
+                chunk = keys[start:start + SQLITE_CHUNK]
+                connection.execute(f"DELETE FROM cache WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+
+    def clear(self, prefix: str):
+        with _sqlite_errors():
+            # Keys are text, so everything with the prefix sorts between it and prefix + U+10FFFF
+            self._connection().execute(
+                "DELETE FROM cache WHERE key >= ? AND key < ?", (prefix, prefix + "\U0010ffff")
+            )
+
+    def stats(self) -> dict:
+        try:
+            with _sqlite_errors():
+                entries = self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except CacheBackendError:
+            entries = None
+        return {"backend": "sqlite", "path": self.path, "entries": entries}
+
+
+class RedisBackend:
+    """Shared cache on a Redis (or protocol-compatible) server.
+
+    Speaks just enough RESP for GET/MGET/SET PX/DEL/SCAN over a small pool
+    of sockets, so it needs no client library. Batched operations are one
+    MGET, or SETs pipelined in a single round trip.
+    """
+
+    def __init__(self, url: str, timeout: float = 0.05, pool_size: int = 8):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool: LifoQueue = LifoQueue(maxsize=pool_size)
+        self._pid = os.getpid()
+
+    # Protocol
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    @classmethod
+    def _read_reply(cls, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise CacheBackendError("redis cache: connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise CacheBackendError(f"redis cache: {rest.decode(errors='replace')}")
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise CacheBackendError("redis cache: connection closed")
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [cls._read_reply(reader) for _ in range(count)]
+        raise CacheBackendError(f"redis cache: unexpected reply {line[:20]!r}")
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._send(connection, setup)
+        return connection
+
+    def _send(self, connection, commands: list[tuple]) -> list:
+        sock, reader = connection
+        sock.sendall(b"".join(self._encode(*command) for command in commands))
+        return [self._read_reply(reader) for _ in commands]
+
+    def _execute(self, commands: list[tuple]) -> list:
+        """Send commands in one pipeline and return their replies in order"""
+        if self._pid != os.getpid():
+            # Sockets inherited from before a fork belong to the parent
+            self._pool, self._pid = LifoQueue(maxsize=self.pool_size), os.getpid()
+        try:
+            connection = self._pool.get_nowait()
+        except Empty:
+            connection = None
+        try:
+            if connection is None:
+                connection = self._connect()
+            replies = self._send(connection, commands)
+        except (OSError, ValueError, CacheBackendError) as e:
+            # The connection may hold half a reply; never reuse it
+            if connection is not None:
+                connection[0].close()
+            if isinstance(e, CacheBackendError):
+                raise
+            raise CacheBackendError(f"redis cache: {e}") from e
+        try:
+            self._pool.put_nowait(connection)
+        except Exception:
+            connection[0].close()
+        return replies
+
+    # Operations
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+        values = self._execute([("MGET", *keys)])[0]
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, items: dict[str, bytes], ttl: float):
+        if items:
+            milliseconds = max(1, int(ttl * 1000))
+            self._execute([("SET", key, value, "PX", milliseconds) for key, value in items.items()])
+
+    def delete_many(self, keys: list[str]):
+        if keys:
+            self._execute([("DEL", *keys)])
+
+    def clear(self, prefix: str):
+        cursor = b"0"
+        while True:
+            cursor, keys = self._execute([("SCAN", cursor, "MATCH", _glob_escape(prefix) + "*", "COUNT", 1000)])[0]
+            if keys:
+                self._execute([("DEL", *keys)])
+            if cursor == b"0":
+                return
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "host": self.host, "port": self.port, "db": self.db}
+
+
+def _glob_escape(text: str) -> str:
+    return "".join("\\" + c if c in "*?[]\\" else c for c in text)
+
+
+def create_backend(url: str, timeout: float = 0.05, max_entries: int = 200000):
+    """A backend for sqlite:///path/to/cache.db or redis://[:password@]host:port/db"""
+    scheme = urlparse(url).scheme
+    if scheme == "sqlite":
+        return SQLiteBackend(url[len("sqlite:///"):], max_entries=max_entries, timeout=timeout)
+    if scheme == "redis":
+        return RedisBackend(url, timeout=timeout)
+    raise ValueError(f"unsupported cache URL {url!r}; expected sqlite:/// or redis://")
@@ -0,0 +1,47 @@
+from typing import Any, AsyncIterator
+import orjson
+from fastapi.responses import Response, StreamingResponse
+
+# Lists at least this long are streamed in chunks instead of encoded in one piece
+STREAM_MIN_ITEMS = 200
+STREAM_CHUNK_ITEMS = 100
+
+
+class FastJSONResponse(Response):
+    """JSON encoded with orjson, for routes that return plain dicts without a response model.
+
+    Returning one of these (or json_list_response) from a route skips
+    FastAPI's jsonable_encoder walk and, when the route declares a
+    response_model, its validation too: only return data that already has
+    the documented shape, e.g. built from ORM rows or TMDB payloads we
+    parsed ourselves. Naive datetimes encode as ISO 8601 without an offset,
+    the same as Pydantic.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+async def _list_chunks(head: dict, key: str, items: list) -> AsyncIterator[bytes]:
+    # Async so Starlette sends it from the event loop rather than hopping to the threadpool per chunk.
+    # Encoding the envelope with an empty list ends it in `"key":[]}`; items go between the brackets
+    envelope = orjson.dumps({**head, key: []}, option=orjson.OPT_NON_STR_KEYS)
+    yield envelope[:-2]
+    for start in range(0, len(items), STREAM_CHUNK_ITEMS):
+        chunk = orjson.dumps(items[start:start + STREAM_CHUNK_ITEMS], option=orjson.OPT_NON_STR_KEYS)[1:-1]
+        yield chunk if start == 0 else b"," + chunk
+    yield b"]}"
+
+
+def json_list_response(head: dict, key: str, items: list) -> Response:
+    """`{**head, key: items}` as JSON; long lists are streamed STREAM_CHUNK_ITEMS at a time.
+
+    Streaming bounds the encoded copy held at once and gets the first
+    bytes out before the last item is encoded. `items` must already be
+    plain dicts: nothing is read from the database while streaming.
+    """
+    if len(items) < STREAM_MIN_ITEMS:
+        return FastJSONResponse({**head, key: items})
+    return StreamingResponse(_list_chunks(head, key, items), media_type="application/json")
@@ -7,9 +7,34 @@ from sqlalchemy.orm import Session
 from app.config import settings
 from app.database import get_db
 from app.models.user import User
+from app.utils.ttl_cache import TTLCache
 
 security = HTTPBearer()
 
+# Authenticated users by id, so most requests skip the users lookup. The token is still verified
+# on every request; the cached row is the same whichever of the user's tokens is presented.
+user_cache = TTLCache(
+    max_entries=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_USER_CACHE_TTL
+)
+
+
+def invalidate_user(user_id: int):
+    """Drop this worker's cached row for a user; other workers keep theirs for up to AUTH_USER_CACHE_TTL"""
+    user_cache.delete(user_id)
+
+
+def _user_snapshot(user: User) -> User:
+    # Detached copy of the columns routes read; never carries the password hash
+    return User(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+        created_at=user.created_at,
+        last_login=user.last_login
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     
@@ -64,6 +89,10 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise HTTPException(
@@ -72,4 +101,6 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
\ No newline at end of file
+    snapshot = _user_snapshot(user)
+    user_cache.set(user_id, snapshot)
+    return snapshot
@@ -0,0 +1,170 @@
+import logging
+import struct
+import threading
+import time
+from typing import Any, Hashable, Optional
+import orjson
+from app.config import settings
+from app.utils.cache_backends import CacheBackendError, create_backend
+from app.utils.circuit_breaker import CLOSED, CircuitBreaker
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Stored values carry their own expiry in front of the JSON, so the store can keep them past it for get_stale()
+_EXPIRES = struct.Struct("<d")
+# What _call() returns when the store failed or is being skipped
+_UNAVAILABLE = object()
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class SharedCache:
+    """TTLCache's interface over a store every worker on the host shares.
+
+    Keys are namespaced and JSON-encoded (tuples become lists), values are
+    JSON-like and encoded with orjson. An entry lives in the store for
+    `ttl + stale_ttl` seconds and answers get() for the first `ttl` of
+    them, get_stale() for all of them.
+
+    A store that fails is skipped, not retried on every call: three errors
+    in a row open a breaker for a few seconds, so a dead Redis costs
+    misses, not timeouts. While the store is unavailable, reads and writes
+    go to `fallback`, a TTLCache local to this worker, if one is given.
+    """
+
+    def __init__(self, backend, namespace: str, ttl: float, stale_ttl: float = 0, fallback: Optional[TTLCache] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.fallback = fallback
+        self._prefix = namespace + ":"
+        self._breaker = CircuitBreaker(failure_threshold=3, reset_timeout=5)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.errors = 0
+
+    def _key(self, key: Hashable) -> str:
+        return self._prefix + orjson.dumps(key).decode()
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _call(self, method: str, *args) -> Any:
+        """Run a backend call; _UNAVAILABLE when the store is down or being skipped"""
+        if not self._breaker.allow():
+            return _UNAVAILABLE
+        try:
+            result = getattr(self.backend, method)(*args)
+        except CacheBackendError as e:
+            self._count(errors=1)
+            if self._breaker.state == CLOSED:
+                logger.warning("shared cache %s: %s", self.namespace, e)
+            self._breaker.record_failure()
+            return _UNAVAILABLE
+        self._breaker.record_success()
+        return result
+
+    def _lookup(self, keys: list[Hashable], stale: bool) -> dict[Hashable, Any]:
+        encoded = {self._key(key): key for key in keys}
+        stored = self._call("get_many", list(encoded))
+        if stored is _UNAVAILABLE:
+            if self.fallback is None:
+                return {}
+            if not stale:
+                return self.fallback.get_many(keys)
+            missing = object()
+            found = {key: self.fallback.get_stale(key, missing) for key in keys}
+            return {key: value for key, value in found.items() if value is not missing}
+        now = time.time()
+        found = {}
+        for encoded_key, data in stored.items():
+            (expires_at,) = _EXPIRES.unpack_from(data)
+            if stale or expires_at > now:
+                found[encoded[encoded_key]] = orjson.loads(data[_EXPIRES.size:])
+        return found
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: list[Hashable]) -> dict[Hashable, Any]:
+        """The fresh entries among `keys`, in one round trip"""
+        found = self._lookup(keys, stale=False)
+        self._count(hits=len(found), misses=len(set(keys)) - len(found))
+        return found
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """The entry even if expired, as long as it is within `stale_ttl` of expiring"""
+        found = self._lookup([key], stale=True)
+        if key not in found:
+            return default
+        self._count(stale_hits=1)
+        return found[key]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: dict[Hashable, Any], ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = _EXPIRES.pack(time.time() + ttl)
+        stored = self._call("set_many", {
+            self._key(key): expires_at + orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+            for key, value in items.items()
+        }, ttl + self.stale_ttl)
+        if stored is _UNAVAILABLE and self.fallback is not None:
+            self.fallback.set_many(items, ttl)
+
+    def delete(self, key: Hashable):
+        self._call("delete_many", [self._key(key)])
+        # The fallback may hold the key from an earlier outage
+        if self.fallback is not None:
+            self.fallback.delete(key)
+
+    def clear(self):
+        self._call("clear", self._prefix)
+        if self.fallback is not None:
+            self.fallback.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                **self.backend.stats(),
+                "namespace": self.namespace,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "errors": self.errors,
+                "circuit": self._breaker.state,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+def shared_backend(url: str, timeout: float, max_entries: int):
+    """The process-wide store for `url`, connected on first use"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(url, timeout=timeout, max_entries=max_entries)
+        return _backend
+
+
+def make_cache(
+    namespace: str,
+    max_entries: int,
+    ttl: float,
+    max_bytes: Optional[int] = None,
+    stale_ttl: float = 0
+):
+    """A SharedCache when CACHE_URL is set (with a local TTLCache for when the store is down), else a TTLCache"""
+    if not settings.CACHE_URL:
+        return TTLCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes, stale_ttl=stale_ttl)
+    backend = shared_backend(settings.CACHE_URL, settings.CACHE_TIMEOUT, settings.CACHE_MAX_ENTRIES)
+    fallback = TTLCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes, stale_ttl=stale_ttl)
+    return SharedCache(backend, namespace, ttl=ttl, stale_ttl=stale_ttl, fallback=fallback)
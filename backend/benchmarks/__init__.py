@@ -0,0 +1,27 @@
+import os
+
+# Benchmarks run without a .env file; give the settings object what it needs
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+os.environ.setdefault("TMDB_API_KEY", "benchmark-key")
+
+
+def use_fake_tmdb(server):
+    """Point every TMDB call at a running FakeTMDBServer"""
+    from app.config import settings
+    from app.services import tmdb_service
+
+    settings.TMDB_BASE_URL = server.base_url
+    tmdb_service.TMDB_BASE_URL = server.base_url
+
+
+def lift_tmdb_rate_limit():
+    """Take the outbound TMDB rate limit out of the way, for benchmarks that measure something else.
+
+    The governor's token bucket holds each process to TMDB_RATE_LIMIT; the
+    circuit breaker and retries stay as configured.
+    """
+    from app.services import tmdb_client
+    from app.utils.rate_limit import TokenBucket
+
+    tmdb_client.governor.bucket = TokenBucket(1e6)
@@ -0,0 +1,86 @@
+"""ALS matrix factorization on a synthetic MovieLens-scale dataset: training time and recall@K.
+
+    python -m benchmarks.bench_als                               # ML-1M scale
+    python -m benchmarks.bench_als --factors 128 --threads 8 --explicit
+
+Hides one liked item for `--eval-users` users, trains on the rest and
+reports how often the hidden item is in the top-K (recall@K with one
+held-out item per user), for users folded in from their interactions as
+the service would and for their stored training factors, alongside the
+per-user scoring latency.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import numpy as np
+from app.recommender.als import ALS
+from benchmarks.synthetic_ratings import generate, hold_out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=6040)
+    parser.add_argument("--items", type=int, default=3706)
+    parser.add_argument("--ratings", type=int, default=1000000)
+    parser.add_argument("--factors", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=15)
+    parser.add_argument("--regularization", type=float, default=1.0)
+    parser.add_argument("--alpha", type=float, default=1.0)
+    parser.add_argument("--explicit", action="store_true")
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--eval-users", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    user_ids, item_ids, ratings = generate(args.users, args.items, args.ratings)
+    train, hidden = hold_out(user_ids, item_ids, ratings, args.eval_users)
+    print(f"generated {len(ratings)} ratings in {time.perf_counter() - start:.1f} s")
+
+    model = ALS(
+        factors=args.factors,
+        regularization=args.regularization,
+        alpha=args.alpha,
+        iterations=args.iterations,
+        implicit=not args.explicit,
+        threads=args.threads
+    )
+    start = time.perf_counter()
+    model.fit(user_ids[train], item_ids[train], ratings[train])
+    elapsed = time.perf_counter() - start
+    print(f"fit: {elapsed:.2f} s ({elapsed / args.iterations:.2f} s/iteration, {args.threads} threads), "
+          f"{model.n_items} items, factors {model.stats()['factor_bytes'] / 2 ** 20:.1f} MiB")
+
+    order = np.argsort(user_ids[train], kind="stable")
+    train_users, train_items, train_ratings = user_ids[train][order], item_ids[train][order], ratings[train][order]
+    users = np.array(sorted(hidden))
+    bounds = np.searchsorted(train_users, users, side="left"), np.searchsorted(train_users, users, side="right")
+
+    timings, folded_hits, stored_hits = [], 0, 0
+    for user, lo, hi in zip(users.tolist(), *bounds):
+        start = time.perf_counter()
+        recommended, _ = model.recommend(train_items[lo:hi], train_ratings[lo:hi], k=args.k)
+        timings.append(time.perf_counter() - start)
+        folded_hits += hidden[user] in recommended
+
+        recommended, _ = model.recommend_user(user, k=args.k, exclude=train_items[lo:hi])
+        stored_hits += hidden[user] in recommended
+
+    timings.sort()
+    print(f"recommend (fold-in + scoring): p50 {statistics.median(timings) * 1000:.3f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.3f} ms")
+    print(f"recall@{args.k}: {folded_hits / len(hidden):.3f} folded in, {stored_hits / len(hidden):.3f} stored factors "
+          f"over {len(hidden)} users (random would be ~{args.k / model.n_items:.3f})")
+
+    with tempfile.TemporaryDirectory() as directory:
+        model.save(directory)
+        start = time.perf_counter()
+        loaded = ALS.load(directory, implicit=not args.explicit, alpha=args.alpha, regularization=args.regularization)
+        print(f"load (memory-mapped): {(time.perf_counter() - start) * 1000:.1f} ms")
+        del loaded
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare sync (threadpool) and async handlers for /api/content/search.
+
+    python -m benchmarks.bench_async_routes --requests 1000 --concurrency 500 --latency 0.2
+
+Both apps run in-process behind httpx's ASGI transport and talk to a local
+fake TMDB server that answers after `latency` seconds. The sync app uses the
+original `def` handler shape, so every in-flight TMDB wait holds one of the
+threadpool's workers; the async app is the real application router.
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI, Query
+from benchmarks import lift_tmdb_rate_limit, use_fake_tmdb
+from benchmarks.fake_tmdb import FakeTMDBServer
+
+
+def build_sync_app() -> FastAPI:
+    from app.services import tmdb_service
+
+    sync_app = FastAPI()
+
+    @sync_app.get("/api/content/search")
+    def search(query: str = Query(...), page: int = Query(1)):
+        return tmdb_service.search_content(query, page)
+
+    return sync_app
+
+
+async def _drive(app, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one(i):
+            async with semaphore:
+                # Unique queries so the response cache never answers
+                response = await client.get("/api/content/search", params={"query": f"bench {time.monotonic_ns()} {i}"})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    from app.services import tmdb_client
+    await tmdb_client.aclose_session()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with FakeTMDBServer(latency=args.latency) as server:
+        use_fake_tmdb(server)
+        lift_tmdb_rate_limit()
+        from app.config import settings
+        from app.main import app
+
+        settings.TMDB_POOL_SIZE = args.concurrency
+        settings.TMDB_ASYNC_MAX_CONNECTIONS = args.concurrency
+
+        for label, target in (("sync", build_sync_app()), ("async", app)):
+            elapsed = asyncio.run(_drive(target, args.requests, args.concurrency))
+            print(f"{label:<6} {args.requests / elapsed:8.0f} req/s   total {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Availability refresh throughput: one transaction per title vs batched replaces.
+
+    python -m benchmarks.bench_availability_writes --contents 20000
+    python -m benchmarks.bench_availability_writes --url postgresql://localhost/bench --batch-size 500
+
+Seeds a fresh database (SQLite file by default) with contents that already
+have availability rows, then refreshes every one of them with fake TMDB
+provider lists twice: through save_content_availability (delete, add,
+commit per title) and through save_availability_batch in batches.
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Content, Platform, StreamingAvailability
+from app.services import streaming_service
+from app.services.tmdb_service import parse_watch_providers
+from benchmarks.fake_tmdb import PROVIDER_IDS, watch_providers
+
+
+def seed(engine, contents: int, chunk: int = 50000):
+    with engine.begin() as conn:
+        conn.execute(Platform.__table__.insert(), [
+            {"id": i, "name": f"p{pid}", "display_name": f"Provider {pid}", "tmdb_provider_id": pid}
+            for i, pid in enumerate(PROVIDER_IDS, start=1)
+        ])
+        for start in range(0, contents, chunk):
+            ids = range(start + 1, min(start + chunk, contents) + 1)
+            conn.execute(Content.__table__.insert(), [{"id": i, "title": f"Title {i}", "type": "movie"} for i in ids])
+            conn.execute(StreamingAvailability.__table__.insert(), [
+                {"content_id": i, "platform_id": None, "region": "US", "last_checked": datetime(2026, 1, 1)}
+                for i in ids
+            ])
+
+
+def providers(contents: int, shift: int) -> dict[tuple[int, str], list[dict]]:
+    # Shifted ids give each pass a different provider set, so every title really changes
+    return {
+        (content_id, "US"): parse_watch_providers(watch_providers(content_id + shift), "US")["providers"]
+        for content_id in range(1, contents + 1)
+    }
+
+
+def per_item(Session, results: dict) -> float:
+    db = Session()
+    try:
+        start = time.perf_counter()
+        for (content_id, region), tmdb_providers in results.items():
+            streaming_service.save_content_availability(db, content_id, region, tmdb_providers)
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def batched(Session, results: dict, batch_size: int) -> float:
+    keys = list(results)
+    db = Session()
+    try:
+        start = time.perf_counter()
+        for offset in range(0, len(keys), batch_size):
+            streaming_service.save_availability_batch(db, {key: results[key] for key in keys[offset:offset + batch_size]})
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: fresh SQLite file)")
+    parser.add_argument("--contents", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        path = os.path.abspath("benchmark_availability_writes.db")
+        if os.path.exists(path):
+            os.remove(path)
+        url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    seed(engine, args.contents)
+    print(f"{engine.dialect.name}: {args.contents} titles, batches of {args.batch_size}")
+
+    for label, run in (
+        ("per item", lambda results: per_item(Session, results)),
+        ("batched", lambda results: batched(Session, results, args.batch_size)),
+    ):
+        shift = 1 if label == "per item" else 2
+        seconds = run(providers(args.contents, shift))
+        with engine.connect() as conn:
+            rows = conn.execute(func.count(StreamingAvailability.id).select()).scalar()
+        print(f"{label:<10} {seconds:8.2f} s   {args.contents / seconds:9.0f} titles/s   {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Content similarity index on a synthetic catalog: build, precompute, query and add latency.
+
+    python -m benchmarks.bench_content_similarity --titles 100000
+
+Titles get 1-3 genres, a cast drawn from a shared pool, a director and a
+short overview drawn from a Zipf vocabulary, roughly like TMDB metadata.
+"""
+import argparse
+import statistics
+import time
+import numpy as np
+from app.recommender.content_similarity import ContentSimilarityIndex
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family", "Fantasy",
+    "History", "Horror", "Music", "Mystery", "Romance", "Science Fiction", "Thriller", "War", "Western"
+]
+
+
+def catalog(titles: int, seed: int = 0) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    # Letters only, since the tokenizer drops digits
+    vocabulary = ["".join(chr(97 + (i // 26 ** p) % 26) for p in range(4)) for i in range(20000)]
+    word_weights = 1 / np.arange(1, len(vocabulary) + 1)
+    word_weights /= word_weights.sum()
+    words = rng.choice(len(vocabulary), size=(titles, 40), p=word_weights)
+
+    contents = []
+    for i in range(titles):
+        contents.append({
+            "id": i + 1,
+            "genres": [GENRES[g] for g in rng.choice(len(GENRES), size=rng.integers(1, 4), replace=False)],
+            "cast": [f"Actor {a}" for a in rng.integers(0, titles // 2 + 1, size=5)],
+            "director": f"Director {rng.integers(0, titles // 10 + 1)}",
+            "overview": " ".join(vocabulary[w] for w in words[i, :rng.integers(15, 40)])
+        })
+    return contents
+
+
+def percentiles(timings: list[float]) -> str:
+    timings = sorted(timings)
+    return f"p50 {statistics.median(timings) * 1000:.3f} ms, p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=100000)
+    parser.add_argument("--neighbors", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--adds", type=int, default=200)
+    args = parser.parse_args()
+
+    contents = catalog(args.titles + args.adds)
+    base, extra = contents[:args.titles], contents[args.titles:]
+    rng = np.random.default_rng(1)
+
+    index = ContentSimilarityIndex(neighbors=args.neighbors)
+    start = time.perf_counter()
+    index.build(base)
+    print(f"build features: {time.perf_counter() - start:.2f} s for {len(base)} titles")
+
+    ids = rng.integers(1, args.titles + 1, size=args.queries)
+    timings = []
+    for content_id in ids:
+        start = time.perf_counter()
+        index.similar(int(content_id), 20)
+        timings.append(time.perf_counter() - start)
+    print(f"query before precompute (computed on demand): {percentiles(timings)}")
+
+    start = time.perf_counter()
+    index.precompute()
+    print(f"precompute all neighbour lists: {time.perf_counter() - start:.2f} s")
+
+    timings = []
+    for content_id in rng.integers(1, args.titles + 1, size=args.queries):
+        start = time.perf_counter()
+        index.similar(int(content_id), 20)
+        timings.append(time.perf_counter() - start)
+    print(f"query precomputed: {percentiles(timings)}")
+
+    timings = []
+    for content in extra:
+        start = time.perf_counter()
+        index.add(content)
+        timings.append(time.perf_counter() - start)
+    print(f"incremental add: {percentiles(timings)}")
+    print(index.stats())
+
+
+if __name__ == "__main__":
+    main()
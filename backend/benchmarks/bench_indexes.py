@@ -0,0 +1,175 @@
+"""Query plans and latencies for the hot lookups with and without the composite indexes.
+
+    python -m benchmarks.bench_indexes --ratings 2000000 --availability 1000000
+    python -m benchmarks.bench_indexes --url postgresql://localhost/bench
+
+Seeds a fresh database (SQLite file by default), drops the composite
+indexes, runs each query, then creates them and runs the queries again.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select, text
+from app.database import Base
+from app.models import Content, Platform, StreamingAvailability, User, UserContent
+
+STATUSES = ["watched", "want_to_watch", "not_interested"]
+COMPOSITE_INDEXES = [
+    index
+    for table in (UserContent.__table__, StreamingAvailability.__table__)
+    for index in table.indexes
+    if len(index.columns) > 1
+]
+
+
+def seed(engine, users: int, contents: int, ratings: int, availability: int, chunk: int = 50000):
+    rng = random.Random(7)
+    now = datetime(2026, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(Platform.__table__.insert(), [
+            {"id": i, "name": f"p{i}", "display_name": f"Platform {i}", "tmdb_provider_id": i} for i in range(1, 9)
+        ])
+        for start in range(0, users, chunk):
+            conn.execute(User.__table__.insert(), [
+                {"id": i, "email": f"u{i}@bench", "username": f"u{i}", "password_hash": "x"}
+                for i in range(start + 1, min(start + chunk, users) + 1)
+            ])
+        for start in range(0, contents, chunk):
+            conn.execute(Content.__table__.insert(), [
+                {"id": i, "title": f"Title {i}", "type": "movie"}
+                for i in range(start + 1, min(start + chunk, contents) + 1)
+            ])
+
+    # Ratings: a heavy-tailed number per user, so some power users own tens of thousands of rows
+    weights = [1 / (rank ** 0.8) for rank in range(1, users + 1)]
+    total_weight = sum(weights)
+    per_user = [max(1, min(contents, int(ratings * w / total_weight))) for w in weights]
+
+    rows = []
+    with engine.begin() as conn:
+        for user_id, count in enumerate(per_user, start=1):
+            for content_id in rng.sample(range(1, contents + 1), count):
+                updated = now - timedelta(seconds=rng.randrange(3 * 365 * 86400))
+                rows.append({
+                    "user_id": user_id,
+                    "content_id": content_id,
+                    "rating": rng.randint(1, 5),
+                    "status": rng.choice(STATUSES),
+                    "created_at": updated,
+                    "updated_at": updated
+                })
+                if len(rows) >= chunk:
+                    conn.execute(UserContent.__table__.insert(), rows)
+                    rows = []
+        if rows:
+            conn.execute(UserContent.__table__.insert(), rows)
+
+        rows = []
+        seen = set()
+        while len(seen) < availability:
+            key = (rng.randint(1, contents), rng.randint(1, 8), rng.choice(["US", "GB", "CA", "DE"]))
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append({"content_id": key[0], "platform_id": key[1], "region": key[2], "last_checked": now})
+            if len(rows) >= chunk:
+                conn.execute(StreamingAvailability.__table__.insert(), rows)
+                rows = []
+        if rows:
+            conn.execute(StreamingAvailability.__table__.insert(), rows)
+
+    return per_user
+
+
+def queries(power_user: int, contents: int):
+    rng = random.Random(11)
+    content_id = rng.randint(1, contents)
+    return {
+        "availability (content_id, region)": select(StreamingAvailability).where(
+            StreamingAvailability.content_id == content_id,
+            StreamingAvailability.region == "US"
+        ),
+        "ratings by user, newest first": select(UserContent).where(
+            UserContent.user_id == power_user
+        ).order_by(UserContent.updated_at.desc(), UserContent.id.desc()).limit(100),
+        "ratings by user + status, newest first": select(UserContent).where(
+            UserContent.user_id == power_user,
+            UserContent.status == "watched"
+        ).order_by(UserContent.updated_at.desc(), UserContent.id.desc()).limit(100),
+        "rating by (user_id, content_id)": select(UserContent).where(
+            UserContent.user_id == power_user,
+            UserContent.content_id == content_id
+        ),
+    }
+
+
+def explain(conn, statement) -> str:
+    compiled = statement.compile(conn, compile_kwargs={"literal_binds": True})
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+        return "; ".join(row[-1] for row in rows)
+    rows = conn.execute(text(f"EXPLAIN {compiled}")).fetchall()
+    return " | ".join(row[0].strip() for row in rows)
+
+
+def measure(conn, statement, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(statement).fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(engine, statements: dict, repeat: int, label: str):
+    print(f"\n== {label}")
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        for name, statement in statements.items():
+            print(f"{name:<40} {measure(conn, statement, repeat) * 1000:9.3f} ms   {explain(conn, statement)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="database URL (default: fresh SQLite file)")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--contents", type=int, default=100000)
+    parser.add_argument("--ratings", type=int, default=2000000)
+    parser.add_argument("--availability", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        path = os.path.abspath("benchmark_indexes.db")
+        if os.path.exists(path):
+            os.remove(path)
+        url = f"sqlite:///{path}"
+    engine = create_engine(url)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for index in COMPOSITE_INDEXES:
+            index.drop(conn)
+
+    start = time.perf_counter()
+    per_user = seed(engine, args.users, args.contents, args.ratings, args.availability)
+    print(f"seeded {sum(per_user)} ratings, {args.availability} availability rows in {time.perf_counter() - start:.1f} s")
+    print(f"power user owns {per_user[0]} ratings")
+
+    statements = queries(power_user=1, contents=args.contents)
+    run(engine, statements, args.repeat, "without composite indexes")
+
+    with engine.begin() as conn:
+        for index in COMPOSITE_INDEXES:
+            index.create(conn)
+    run(engine, statements, args.repeat, "with composite indexes")
+
+
+if __name__ == "__main__":
+    main()
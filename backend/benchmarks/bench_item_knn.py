@@ -0,0 +1,76 @@
+"""Item-item CF on a synthetic MovieLens-scale dataset: fit time, serving latency, hit rate.
+
+    python -m benchmarks.bench_item_knn                          # ML-1M scale
+    python -m benchmarks.bench_item_knn --users 162000 --items 62000 --ratings 25000000
+
+Hides one liked item for `--eval-users` users, fits ItemKNN on the rest and
+reports how often the hidden item lands in the top-K, alongside the latency
+of the per-user scoring pass. The held-out ratings are then fed back through
+`update` in batches, as the rating event consumer would.
+"""
+import argparse
+import statistics
+import time
+import numpy as np
+from app.recommender.item_knn import ItemKNN
+from benchmarks.synthetic_ratings import generate, hold_out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=6040)
+    parser.add_argument("--items", type=int, default=3706)
+    parser.add_argument("--ratings", type=int, default=1000000)
+    parser.add_argument("--neighbors", type=int, default=50)
+    parser.add_argument("--shrinkage", type=float, default=10)
+    parser.add_argument("--eval-users", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--update-batch", type=int, default=100)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    user_ids, item_ids, ratings = generate(args.users, args.items, args.ratings)
+    train, hidden = hold_out(user_ids, item_ids, ratings, args.eval_users)
+    print(f"generated {len(ratings)} ratings in {time.perf_counter() - start:.1f} s")
+
+    model = ItemKNN(neighbors=args.neighbors, shrinkage=args.shrinkage)
+    start = time.perf_counter()
+    model.fit(user_ids[train], item_ids[train], ratings[train])
+    print(f"fit: {time.perf_counter() - start:.2f} s, {model.n_items} items, "
+          f"neighbour arrays {model.stats()['neighbor_bytes'] / 2 ** 20:.1f} MiB")
+
+    # Group the training rows by user once, as the service gets them from one indexed query
+    order = np.argsort(user_ids[train], kind="stable")
+    train_users, train_items, train_ratings = user_ids[train][order], item_ids[train][order], ratings[train][order]
+    bounds = np.searchsorted(train_users, np.array(sorted(hidden)), side="left"), \
+        np.searchsorted(train_users, np.array(sorted(hidden)), side="right")
+
+    timings, hits, history = [], 0, []
+    for user, lo, hi in zip(sorted(hidden), *bounds):
+        start = time.perf_counter()
+        recommended, _ = model.recommend(train_items[lo:hi], train_ratings[lo:hi], k=args.k)
+        timings.append(time.perf_counter() - start)
+        hits += hidden[user] in recommended
+        history.append(hi - lo)
+
+    timings.sort()
+    print(f"recommend: p50 {statistics.median(timings) * 1000:.3f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.3f} ms "
+          f"(median history {int(statistics.median(history))} items)")
+    print(f"hit rate@{args.k}: {hits / len(hidden):.3f} over {len(hidden)} users "
+          f"(random would be ~{args.k / model.n_items:.3f})")
+
+    held = np.flatnonzero(~train)
+    changes = list(zip(user_ids[held].tolist(), item_ids[held].tolist(), ratings[held].tolist()))
+    timings = []
+    for start_at in range(0, len(changes), args.update_batch):
+        start = time.perf_counter()
+        model.update(changes[start_at:start_at + args.update_batch])
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"update: p50 {statistics.median(timings) * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms "
+          f"per batch of {args.update_batch} ratings")
+
+
+if __name__ == "__main__":
+    main()
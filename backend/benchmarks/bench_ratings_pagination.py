@@ -0,0 +1,116 @@
+"""Offset vs cursor pagination of get_user_ratings on a large ratings table.
+
+    python -m benchmarks.bench_ratings_pagination --ratings 200000 --page-size 100
+
+Seeds one power user with `--ratings` rows (plus background users), then
+times individual pages at increasing depth in offset mode and cursor mode,
+and the three count modes.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.database import Base
+from app.models import Content, User, UserContent
+from app.services.rating_service import get_user_ratings
+
+STATUSES = ["watched", "want_to_watch", "not_interested"]
+
+
+def seed(engine, ratings: int, other_users: int, chunk: int = 50000):
+    rng = random.Random(3)
+    now = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "email": f"u{i}@bench", "username": f"u{i}", "password_hash": "x"}
+            for i in range(1, other_users + 2)
+        ])
+        for start in range(0, ratings, chunk):
+            conn.execute(Content.__table__.insert(), [
+                {"id": i, "title": f"Title {i}", "type": "movie"}
+                for i in range(start + 1, min(start + chunk, ratings) + 1)
+            ])
+
+        rows = []
+        for user_id in range(1, other_users + 2):
+            count = ratings if user_id == 1 else 50
+            for content_id in (range(1, ratings + 1) if user_id == 1 else rng.sample(range(1, ratings + 1), count)):
+                updated = now - timedelta(seconds=rng.randrange(3 * 365 * 86400), microseconds=rng.randrange(10 ** 6))
+                rows.append({
+                    "user_id": user_id,
+                    "content_id": content_id,
+                    "rating": rng.randint(1, 5),
+                    "status": rng.choice(STATUSES),
+                    "created_at": updated,
+                    "updated_at": updated
+                })
+                if len(rows) >= chunk:
+                    conn.execute(UserContent.__table__.insert(), rows)
+                    rows = []
+        if rows:
+            conn.execute(UserContent.__table__.insert(), rows)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="database URL (default: fresh SQLite file)")
+    parser.add_argument("--ratings", type=int, default=200000)
+    parser.add_argument("--other-users", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        path = os.path.abspath("benchmark_pagination.db")
+        if os.path.exists(path):
+            os.remove(path)
+        url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    seed(engine, args.ratings, args.other_users)
+
+    pages = args.ratings // args.page_size
+    checkpoints = sorted({1, 10, 100, pages // 2, pages - 1} - {0})
+
+    with Session(engine) as db:
+        # Warm the page cache so page 1 isn't charged for it
+        get_user_ratings(db, user_id=1, limit=args.page_size, count_mode="exact")
+        db.expunge_all()
+
+        print(f"{'page':>8} {'offset ms':>10} {'cursor ms':>10}")
+        cursor = None
+        cursor_times = {}
+        for page in range(1, max(checkpoints) + 1):
+            result, elapsed = timed(lambda: get_user_ratings(
+                db, user_id=1, limit=args.page_size, cursor=cursor, count_mode="none"
+            ))
+            cursor_times[page] = elapsed
+            cursor = result["next_cursor"]
+            db.expunge_all()
+
+        for page in checkpoints:
+            _, offset_ms = timed(lambda: get_user_ratings(
+                db, user_id=1, limit=args.page_size, offset=(page - 1) * args.page_size, count_mode="none"
+            ))
+            db.expunge_all()
+            print(f"{page:>8} {offset_ms:>10.2f} {cursor_times[page]:>10.2f}")
+
+        print()
+        for mode in ("exact", "estimate", "none"):
+            result, elapsed = timed(lambda: get_user_ratings(db, user_id=1, limit=args.page_size, count_mode=mode))
+            db.expunge_all()
+            print(f"count={mode:<9} {elapsed:8.2f} ms   total={result['total']} exact={result['total_exact']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Search latency: the local catalog index and typeahead suggestions vs a TMDB round trip.
+
+    python -m benchmarks.bench_search --contents 200000 --queries 2000
+    python -m benchmarks.bench_search --latency 0.15
+
+Seeds a fresh SQLite catalog of synthetic titles, builds the search index
+and times search_local (index lookup plus the row fetch) on queries typed a
+prefix at a time, as a search box sends them, and search_service.suggest
+on the same prefixes. The TMDB path is the real
+tmdb_service.search_content against the local fake server answering after
+`latency` seconds, with unique queries so its response cache never hits.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Content
+from app.services import search_service, tmdb_service
+from benchmarks import use_fake_tmdb
+from benchmarks.fake_tmdb import FakeTMDBServer
+
+WORDS = (
+    "star night dark river city last lost secret house love war king queen dead blue road home girl "
+    "man world time heart fire shadow ghost black summer winter island storm dream blood wild silent "
+    "empire return rise fall edge game story legend hunter crown sky sea golden broken little great"
+).split()
+
+
+def seed(engine, contents: int, chunk: int = 50000) -> list[str]:
+    rng = random.Random(3)
+    titles = []
+    with engine.begin() as conn:
+        for start in range(0, contents, chunk):
+            rows = []
+            for content_id in range(start + 1, min(start + chunk, contents) + 1):
+                title = " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 4)))
+                titles.append(title)
+                rows.append({
+                    "id": content_id,
+                    "title": title,
+                    "type": rng.choice(["movie", "tv"]),
+                    "overview": " ".join(rng.choice(WORDS) for _ in range(30)),
+                    "cast": [f"Actor{rng.randrange(20000)} Surname{rng.randrange(5000)}" for _ in range(5)],
+                    "director": f"Director{rng.randrange(3000)}"
+                })
+            conn.execute(Content.__table__.insert(), rows)
+    return titles
+
+
+def typed_queries(titles: list[str], count: int) -> list[str]:
+    """Every prefix of random titles, from three characters on"""
+    rng = random.Random(5)
+    queries = []
+    while len(queries) < count:
+        title = rng.choice(titles).lower()
+        queries.extend(title[:length] for length in range(3, len(title) + 1))
+    return queries[:count]
+
+
+def report(label: str, timings: list[float]):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{label:<8} p50 {statistics.median(timings) * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contents", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--tmdb-queries", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake TMDB response time in seconds")
+    args = parser.parse_args()
+
+    path = os.path.abspath("benchmark_search.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    titles = seed(engine, args.contents)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    try:
+        start = time.perf_counter()
+        search_service.build_search_index(db)
+        stats = search_service.stats()
+        print(
+            f"indexed {stats['titles']} titles, {stats['terms']} terms, {stats['postings']} postings, "
+            f"{stats['suggest']['keys']} suggestion keys in {time.perf_counter() - start:.1f} s"
+        )
+
+        timings, local_hits = [], 0
+        for query in typed_queries(titles, args.queries):
+            start = time.perf_counter()
+            result = search_service.search_local(db, query)
+            timings.append(time.perf_counter() - start)
+            local_hits += result is not None
+        report("local", timings)
+        print(f"         {local_hits}/{len(timings)} queries answered locally")
+
+        timings = []
+        for query in typed_queries(titles, args.queries):
+            start = time.perf_counter()
+            search_service.suggest(query)
+            timings.append(time.perf_counter() - start)
+        report("suggest", timings)
+    finally:
+        db.close()
+
+    with FakeTMDBServer(latency=args.latency) as server:
+        use_fake_tmdb(server)
+        timings = []
+        for i in range(args.tmdb_queries):
+            start = time.perf_counter()
+            tmdb_service.search_content(f"bench {time.monotonic_ns()} {i}")
+            timings.append(time.perf_counter() - start)
+        report("tmdb", timings)
+
+
+if __name__ == "__main__":
+    main()
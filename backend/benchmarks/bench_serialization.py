@@ -0,0 +1,126 @@
+"""Response serialization CPU: FastAPI's default path vs the orjson path, per request.
+
+    python -m benchmarks.bench_serialization --rounds 200
+
+For /api/user/ratings pages of 100 and 500 rows, "before" is what FastAPI
+does with the response_model: validate the ORM rows into
+UserRatingsListResponse (from_attributes), then dump it to JSON. "after" is
+what the route does now: read the fields off the rows into dicts and
+encode them with orjson, streamed in chunks from STREAM_MIN_ITEMS rows on.
+
+For /api/content/trending with 20 (TMDB's page), 100 and 500 results,
+"before" is the default JSONResponse of a plain dict (jsonable_encoder
+walk, then json.dumps) and "after" is FastJSONResponse.
+
+The rows are loaded once; only serialization is timed, in process CPU
+time. Each pair is also checked to encode the same document.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Content, User, UserContent
+from app.routes.user import UserRatingsListResponse, _rating_item
+from app.services.rating_service import get_user_ratings
+from app.utils.json_response import FastJSONResponse, json_list_response
+from benchmarks.fake_tmdb import trending
+
+ratings_adapter = TypeAdapter(UserRatingsListResponse)
+
+
+def seed(engine, ratings: int):
+    now = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "email": "u1@bench", "username": "u1", "password_hash": "x"}])
+        conn.execute(Content.__table__.insert(), [
+            {
+                "id": i, "title": f"Title {i}", "type": "movie" if i % 2 else "tv",
+                "poster_path": f"/poster{i}.jpg", "release_year": 1990 + i % 35
+            }
+            for i in range(1, ratings + 1)
+        ])
+        conn.execute(UserContent.__table__.insert(), [
+            {
+                "user_id": 1, "content_id": i, "rating": 1 + i % 5, "status": "watched",
+                "review_text": f"Review of title {i}, which was fine." if i % 3 == 0 else None,
+                "created_at": now - timedelta(minutes=i, microseconds=i),
+                "updated_at": now - timedelta(minutes=i, microseconds=i)
+            }
+            for i in range(1, ratings + 1)
+        ])
+
+
+def body(response, loop) -> bytes:
+    if isinstance(response, StreamingResponse):
+        async def drain():
+            return b"".join([chunk async for chunk in response.body_iterator])
+        return loop.run_until_complete(drain())
+    return response.body
+
+
+def cpu_per_call(fn, rounds: int) -> float:
+    fn()
+    start = time.process_time()
+    for _ in range(rounds):
+        fn()
+    return (time.process_time() - start) / rounds * 1000
+
+
+def compare(label: str, before, after, rounds: int):
+    assert json.loads(before()) == json.loads(after()), f"{label}: documents differ"
+    before_ms, after_ms = cpu_per_call(before, rounds), cpu_per_call(after, rounds)
+    print(f"{label:<20} before {before_ms:7.3f} ms   after {after_ms:7.3f} ms   {before_ms / after_ms:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.abspath("benchmark_serialization.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    seed(engine, 500)
+    db = sessionmaker(bind=engine)()
+    loop = asyncio.new_event_loop()
+
+    try:
+        for rows in (100, 500):
+            result = get_user_ratings(db, 1, limit=rows)
+
+            def before(result=result):
+                return ratings_adapter.dump_json(ratings_adapter.validate_python(result, from_attributes=True))
+
+            def after(result=result):
+                head = {key: value for key, value in result.items() if key != "ratings"}
+                ratings = [_rating_item(user_content) for user_content in result["ratings"]]
+                return body(json_list_response(head, "ratings", ratings), loop)
+
+            compare(f"ratings {rows} rows", before, after, args.rounds)
+
+        page = trending("all", "week")
+        for results in (20, 100, 500):
+            data = {**page, "results": (page["results"] * (results // len(page["results"]) + 1))[:results]}
+            compare(
+                f"trending {results}",
+                lambda data=data: JSONResponse(jsonable_encoder(data)).body,
+                lambda data=data: FastJSONResponse(data).body,
+                args.rounds
+            )
+    finally:
+        loop.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
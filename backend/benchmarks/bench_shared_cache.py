@@ -0,0 +1,117 @@
+"""Shared response cache: TMDB calls and latency across several workers, per backend.
+
+    python -m benchmarks.bench_shared_cache --workers 4 --queries 500
+    python -m benchmarks.bench_shared_cache --latency 0.1 --redis-latency 0.0005
+
+Runs `workers` processes, like uvicorn --workers, that each send the same
+`queries` searches through tmdb_service.search_content against the local
+fake TMDB server, with the search cache in memory (one per worker), in a
+SQLite file and on the local fake Redis. Reports how many requests reached
+TMDB and the per-search latency. Then times 100-key reads and writes on
+each shared backend, one key per call vs one get_many/set_many.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+from app.config import settings
+from app.services import tmdb_service
+from app.utils.cache_backends import create_backend
+from app.utils.shared_cache import SharedCache
+from app.utils.ttl_cache import TTLCache
+from benchmarks import lift_tmdb_rate_limit, use_fake_tmdb
+from benchmarks.fake_redis import FakeRedisServer
+from benchmarks.fake_tmdb import FakeTMDBServer
+
+
+def make_search_cache(url):
+    if url is None:
+        return TTLCache(max_entries=settings.TMDB_CACHE_MAX_ENTRIES, ttl=600)
+    return SharedCache(create_backend(url), "bench:search", ttl=600)
+
+
+def worker(url, queries: list[str], start, timings):
+    tmdb_service.search_cache = make_search_cache(url)
+    # Measure the cache, not the outbound rate limit
+    lift_tmdb_rate_limit()
+    start.wait()
+    local = []
+    for query in queries:
+        begin = time.perf_counter()
+        tmdb_service.search_content(query)
+        local.append(time.perf_counter() - begin)
+    timings.extend(local)
+
+
+def run_workers(url, workers: int, queries: list[str], tmdb: FakeTMDBServer) -> tuple[int, list[float]]:
+    context = multiprocessing.get_context("fork")
+    manager = context.Manager()
+    start, timings = context.Barrier(workers), manager.list()
+    sent = tmdb.requests
+    # Each worker starts at a different point of the list, as different users would hit them
+    offsets = [i * len(queries) // workers for i in range(workers)]
+    processes = [
+        context.Process(target=worker, args=(url, queries[offset:] + queries[:offset], start, timings))
+        for offset in offsets
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    result = list(timings)
+    manager.shutdown()
+    return tmdb.requests - sent, result
+
+
+def time_batches(url, keys: int = 100, rounds: int = 50) -> tuple[float, float, float, float]:
+    cache = SharedCache(create_backend(url), "bench:batch", ttl=600)
+    items = {("key", i): {"results": [{"id": i, "title": f"Title {i}"}] * 5} for i in range(keys)}
+
+    def per_round(action) -> float:
+        begin = time.perf_counter()
+        for _ in range(rounds):
+            action()
+        return (time.perf_counter() - begin) / rounds * 1000
+
+    single_set = per_round(lambda: [cache.set(key, value) for key, value in items.items()])
+    batch_set = per_round(lambda: cache.set_many(items))
+    single_get = per_round(lambda: [cache.get(key) for key in items])
+    batch_get = per_round(lambda: cache.get_many(list(items)))
+    return single_set, batch_set, single_get, batch_get
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake TMDB response time in seconds")
+    parser.add_argument("--redis-latency", type=float, default=0.0, help="fake Redis time per command in seconds")
+    args = parser.parse_args()
+
+    path = os.path.abspath("benchmark_shared_cache.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    queries = [f"bench query {i}" for i in range(args.queries)]
+
+    with FakeTMDBServer(latency=args.latency) as tmdb, FakeRedisServer(latency=args.redis_latency) as redis:
+        use_fake_tmdb(tmdb)
+        backends = (("memory", None), ("sqlite", f"sqlite:///{path}"), ("redis", redis.url))
+
+        print(f"{args.workers} workers x {args.queries} searches, TMDB answering in {args.latency * 1000:.0f} ms")
+        for label, url in backends:
+            sent, timings = run_workers(url, args.workers, queries, tmdb)
+            timings.sort()
+            print(
+                f"{label:<7} {sent:6d} TMDB requests   "
+                f"mean {statistics.mean(timings) * 1000:7.2f} ms   p50 {statistics.median(timings) * 1000:7.3f} ms"
+            )
+
+        print("100 keys, ms per round:   set x100   set_many   get x100   get_many")
+        for label, url in backends[1:]:
+            print(f"{label:<25}" + "".join(f"{ms:11.2f}" for ms in time_batches(url)))
+
+
+if __name__ == "__main__":
+    main()
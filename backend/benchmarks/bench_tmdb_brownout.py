@@ -0,0 +1,95 @@
+"""TMDB brownout: how long API threads are held when TMDB turns slow and fails.
+
+    python -m benchmarks.bench_tmdb_brownout --threads 16 --seconds 10
+    python -m benchmarks.bench_tmdb_brownout --latency 2 --status 429
+
+Points tmdb_service at the local fake server answering every request with
+`status` after `latency` seconds, then has `threads` workers call
+tmdb_service.search_content with unique queries for `seconds`, twice:
+with the governor effectively off (no rate limit, no retries, a breaker
+that never opens) and with the configured one. Reports calls answered,
+how long each held its thread, and the governor's per-endpoint counters.
+"""
+import argparse
+import statistics
+import threading
+import time
+from fastapi import HTTPException
+from app.config import settings
+from app.services import tmdb_client, tmdb_service
+from benchmarks import use_fake_tmdb
+from benchmarks.fake_tmdb import FakeTMDBServer
+
+
+def ungoverned() -> tmdb_client.TMDBGovernor:
+    return tmdb_client.TMDBGovernor(
+        rate=1e9, burst=1e9, max_wait=0, retries=0, base_delay=0, max_delay=0,
+        failure_threshold=10 ** 9, reset_timeout=0
+    )
+
+
+def governed() -> tmdb_client.TMDBGovernor:
+    return tmdb_client.TMDBGovernor(
+        rate=settings.TMDB_RATE_LIMIT,
+        burst=settings.TMDB_RATE_BURST,
+        max_wait=settings.TMDB_RATE_LIMIT_MAX_WAIT,
+        retries=settings.TMDB_RETRIES,
+        base_delay=settings.TMDB_RETRY_BASE_DELAY,
+        max_delay=settings.TMDB_RETRY_MAX_DELAY,
+        failure_threshold=settings.TMDB_BREAKER_FAILURES,
+        reset_timeout=settings.TMDB_BREAKER_RESET
+    )
+
+
+def run(threads: int, seconds: float) -> tuple[list[float], int]:
+    timings, errors, lock = [], 0, threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(n: int):
+        nonlocal errors
+        i = 0
+        while time.monotonic() < deadline:
+            i += 1
+            start = time.perf_counter()
+            try:
+                tmdb_service.search_content(f"brownout {n} {i} {time.monotonic_ns()}")
+                failed = 0
+            except HTTPException:
+                failed = 1
+            with lock:
+                timings.append(time.perf_counter() - start)
+                errors += failed
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=1.0, help="fake TMDB response time in seconds")
+    parser.add_argument("--status", type=int, default=503, help="status the fake TMDB answers with")
+    args = parser.parse_args()
+
+    with FakeTMDBServer(latency=args.latency, error_status=args.status) as server:
+        use_fake_tmdb(server)
+        for label, governor in (("ungoverned", ungoverned()), ("governed", governed())):
+            tmdb_client.governor = governor
+            sent = server.requests
+            timings, errors = run(args.threads, args.seconds)
+            timings.sort()
+            print(
+                f"{label:<11} {len(timings):7d} calls  {errors:7d} errors  {server.requests - sent:5d} sent to TMDB   "
+                f"p50 {statistics.median(timings) * 1000:8.2f} ms   p95 {timings[int(len(timings) * 0.95)] * 1000:8.2f} ms"
+            )
+            counters = governor.stats()["endpoints"].get("/search/multi", {})
+            print(f"{'':<11} {counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compare bare requests.get against the pooled TMDB session.
+
+    python -m benchmarks.bench_tmdb_pool --requests 500 --threads 16 --connect-delay 0.02
+
+The fake server charges `connect-delay` per new connection, so the gap between
+the two runs is the handshake cost the pooled client avoids.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks import lift_tmdb_rate_limit, use_fake_tmdb
+from benchmarks.fake_tmdb import FakeTMDBServer
+
+
+def _run(label: str, fetch, url: str, total: int, threads: int, server: FakeTMDBServer):
+    server.connections = 0
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        fetch(url, {"query": f"q{i % 50}", "page": 1}).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:<8} {total / elapsed:8.0f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:6.1f} ms   "
+        f"p99 {p99 * 1000:6.1f} ms   "
+        f"connections {server.connections}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--connect-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with FakeTMDBServer(connect_delay=args.connect_delay) as server:
+        use_fake_tmdb(server)
+        lift_tmdb_rate_limit()
+        from app.config import settings
+        from app.services import tmdb_client
+
+        settings.TMDB_POOL_SIZE = max(settings.TMDB_POOL_SIZE, args.threads)
+        url = f"{server.base_url}/search/multi"
+
+        _run("bare", lambda u, p: requests.get(u, params=p, timeout=10), url, args.requests, args.threads, server)
+        _run("pooled", tmdb_client.get, url, args.requests, args.threads, server)
+        tmdb_client.close_session()
+
+
+if __name__ == "__main__":
+    main()
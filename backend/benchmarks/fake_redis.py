@@ -0,0 +1,143 @@
+"""Local stand-in for a Redis server, for the shared cache benchmarks.
+
+Speaks RESP and keeps everything in one dict with millisecond expiry; it
+implements only what RedisBackend sends (PING, AUTH, SELECT, GET, MGET,
+SET with EX/PX, DEL, SCAN, FLUSHDB, DBSIZE). Each request sleeps `latency`
+seconds, standing in for a network hop to a Redis on another host.
+
+    with FakeRedisServer() as server:
+        settings.CACHE_URL = server.url
+"""
+import fnmatch
+import threading
+import time
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+
+
+class Error(str):
+    """An error reply"""
+
+
+OK = object()  # the +OK simple string reply
+
+
+class FakeRedisServer(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.data: dict[bytes, tuple[bytes, float]] = {}
+        self.commands = 0
+        self.lock = threading.Lock()
+        self._thread = None
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "FakeRedisServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _get(self, key: bytes):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, command: list[bytes]):
+        name, args = command[0].upper(), command[1:]
+        with self.lock:
+            self.commands += 1
+            if name in (b"PING", b"AUTH", b"SELECT", b"FLUSHDB"):
+                if name == b"FLUSHDB":
+                    self.data.clear()
+                return OK
+            if name == b"GET":
+                return self._get(args[0])
+            if name == b"MGET":
+                return [self._get(key) for key in args]
+            if name == b"SET":
+                expires_at = 0.0
+                options = [arg.upper() for arg in args[2:]]
+                for option, value in zip(options, args[3:]):
+                    if option == b"EX":
+                        expires_at = time.monotonic() + int(value)
+                    elif option == b"PX":
+                        expires_at = time.monotonic() + int(value) / 1000
+                self.data[args[0]] = (args[1], expires_at)
+                return OK
+            if name == b"DEL":
+                return sum(self.data.pop(key, None) is not None for key in args)
+            if name == b"DBSIZE":
+                return len(self.data)
+            if name == b"SCAN":
+                # One pass over everything; a real server pages with the cursor
+                pattern = args[args.index(b"MATCH") + 1].decode() if b"MATCH" in args else "*"
+                keys = [key for key in list(self.data) if self._get(key) is not None and fnmatch.fnmatchcase(key.decode(), pattern)]
+                return [b"0", keys]
+            return Error(f"ERR unknown command '{name.decode()}'")
+
+
+def _encode(reply) -> bytes:
+    if reply is OK:
+        return b"+OK\r\n"
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Error):
+        return b"-%s\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+
+
+class _Handler(StreamRequestHandler):
+    disable_nagle_algorithm = True  # as Redis does; pipelined replies would otherwise wait on delayed ACKs
+
+    def handle(self):
+        server = self.server
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if not line.startswith(b"*"):
+                self.wfile.write(b"-ERR inline commands are not supported\r\n")
+                return
+            command = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                command.append(self.rfile.read(length + 2)[:-2])
+            if server.latency:
+                time.sleep(server.latency)
+            self.wfile.write(_encode(server.execute(command)))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a local fake Redis server")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeRedisServer(port=args.port, latency=args.latency)
+    print(f"Fake Redis listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,191 @@
+"""Local fake of the TMDB v3 API used by the benchmarks.
+
+Serves deterministic payloads for the endpoints tmdb_service calls. Each new
+TCP connection sleeps `connect_delay` seconds before it is served, which
+stands in for the DNS + TCP + TLS setup cost of talking to the real API, and
+each request sleeps `latency` seconds. Setting `error_status` (e.g. 503 or
+429) makes that fraction `error_rate` of requests fail, to simulate a brownout.
+
+    with FakeTMDBServer(connect_delay=0.02) as server:
+        settings.TMDB_BASE_URL = server.base_url
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+PROVIDER_IDS = [8, 9, 337, 15, 384]
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Romance", "Thriller", "Animation"]
+
+
+def _title(media_type: str, tmdb_id: int) -> str:
+    return f"Fake {'Movie' if media_type == 'movie' else 'Show'} {tmdb_id}"
+
+
+def _summary(media_type: str, tmdb_id: int) -> dict:
+    item = {
+        "id": tmdb_id,
+        "media_type": media_type,
+        "overview": f"Overview for {media_type} {tmdb_id}",
+        "poster_path": f"/poster{tmdb_id}.jpg",
+        "vote_average": round((tmdb_id % 90) / 10 + 1, 1),
+        "popularity": float(tmdb_id % 1000)
+    }
+    if media_type == "movie":
+        item["title"] = _title(media_type, tmdb_id)
+        item["release_date"] = f"{1980 + tmdb_id % 45}-01-01"
+    else:
+        item["name"] = _title(media_type, tmdb_id)
+        item["first_air_date"] = f"{1980 + tmdb_id % 45}-01-01"
+    return item
+
+
+def movie_details(tmdb_id: int) -> dict:
+    data = _summary("movie", tmdb_id)
+    data.update({
+        "runtime": 90 + tmdb_id % 60,
+        "backdrop_path": f"/backdrop{tmdb_id}.jpg",
+        "genres": [{"id": i, "name": GENRES[(tmdb_id + i) % len(GENRES)]} for i in range(2)],
+        "credits": {
+            "cast": [{"name": f"Actor {(tmdb_id * 7 + i) % 500}"} for i in range(8)],
+            "crew": [{"job": "Director", "name": f"Director {tmdb_id % 200}"}]
+        },
+        "videos": {"results": [{"type": "Trailer", "site": "YouTube", "key": f"yt{tmdb_id}"}]}
+    })
+    return data
+
+
+def tv_details(tmdb_id: int) -> dict:
+    data = _summary("tv", tmdb_id)
+    data.update({
+        "episode_run_time": [30 + tmdb_id % 30],
+        "backdrop_path": f"/backdrop{tmdb_id}.jpg",
+        "genres": [{"id": i, "name": GENRES[(tmdb_id + i) % len(GENRES)]} for i in range(2)],
+        "credits": {"cast": [{"name": f"Actor {(tmdb_id * 7 + i) % 500}"} for i in range(8)]},
+        "videos": {"results": []}
+    })
+    return data
+
+
+def watch_providers(tmdb_id: int) -> dict:
+    providers = [
+        {"provider_id": pid, "provider_name": f"Provider {pid}"}
+        for i, pid in enumerate(PROVIDER_IDS) if (tmdb_id >> i) & 1
+    ]
+    return {"id": tmdb_id, "results": {"US": {"flatrate": providers}, "GB": {"flatrate": providers[:1]}}}
+
+
+def search(query: str, page: int) -> dict:
+    base = sum(ord(c) for c in query) * 100 + page * 20
+    results = [_summary("movie" if i % 2 else "tv", base + i) for i in range(20)]
+    return {"page": page, "results": results, "total_pages": 5, "total_results": 100}
+
+
+def trending(media_type: str, time_window: str) -> dict:
+    offset = 1000 if time_window == "day" else 2000
+    kinds = ["movie", "tv"] if media_type == "all" else [media_type]
+    results = [_summary(kinds[i % len(kinds)], offset + i) for i in range(20)]
+    return {"page": 1, "results": results, "total_pages": 1, "total_results": len(results)}
+
+
+ROUTES = [
+    (re.compile(r"^/3/search/multi$"), lambda m, q: search(q.get("query", [""])[0], int(q.get("page", ["1"])[0]))),
+    (re.compile(r"^/3/trending/(all|movie|tv)/(day|week)$"), lambda m, q: trending(m.group(1), m.group(2))),
+    (re.compile(r"^/3/(movie|tv)/(\d+)/watch/providers$"), lambda m, q: watch_providers(int(m.group(2)))),
+    (re.compile(r"^/3/movie/(\d+)$"), lambda m, q: movie_details(int(m.group(1)))),
+    (re.compile(r"^/3/tv/(\d+)$"), lambda m, q: tv_details(int(m.group(1)))),
+]
+
+
+class FakeTMDBServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, connect_delay: float = 0.0, latency: float = 0.0,
+                 error_status: Optional[int] = None, error_rate: float = 1.0):
+        self.connect_delay = connect_delay
+        self.latency = latency
+        self.error_status = error_status
+        self.error_rate = error_rate
+        self.connections = 0
+        self.requests = 0
+        self._counter_lock = threading.Lock()
+        self._thread = None
+        super().__init__((host, port), _Handler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/3"
+
+    def process_request_thread(self, request, client_address):
+        with self._counter_lock:
+            self.connections += 1
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        super().process_request_thread(request, client_address)
+
+    def start(self) -> "FakeTMDBServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server._counter_lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_status and random.random() < server.error_rate:
+            self._send(server.error_status, {"status_message": "Simulated failure."})
+            return
+
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        for pattern, handler in ROUTES:
+            match = pattern.match(parsed.path)
+            if match:
+                self._send(200, handler(match, query))
+                return
+        self._send(404, {"status_message": "The resource you requested could not be found."})
+
+    def _send(self, code: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a local fake TMDB API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connect-delay", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeTMDBServer(port=args.port, connect_delay=args.connect_delay, latency=args.latency)
+    print(f"Fake TMDB listening on {server.base_url}")
+    server.serve_forever()
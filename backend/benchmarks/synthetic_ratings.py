@@ -0,0 +1,53 @@
+"""Synthetic MovieLens-like ratings for recommender benchmarks.
+
+Items fall into latent "genres". Each user prefers a couple of them and
+rates items there higher; item popularity within a genre is heavy-tailed and
+user activity is lognormal, so the shape is close to MovieLens (ML-1M is
+6040 users x 3706 items x 1M ratings, ML-25M is 162k x 62k x 25M).
+"""
+import numpy as np
+
+
+def generate(users: int, items: int, ratings: int, genres: int = 20, seed: int = 0):
+    """Return (user_ids, item_ids, ratings) arrays with unique (user, item) pairs"""
+    rng = np.random.default_rng(seed)
+
+    item_genre = rng.integers(0, genres, size=items)
+    genre_order = np.argsort(item_genre, kind="stable")
+    genre_start = np.searchsorted(item_genre[genre_order], np.arange(genres))
+    genre_size = np.bincount(item_genre, minlength=genres)
+    favourites = rng.integers(0, genres, size=(users, 2))
+
+    activity = rng.lognormal(mean=0, sigma=1.0, size=users)
+    activity /= activity.sum()
+
+    # Oversample, since duplicate (user, item) draws are dropped below
+    draws = int(ratings * 2)
+    user = rng.choice(users, size=draws, p=activity)
+    in_favourite = rng.random(draws) < 0.7
+    genre = np.where(in_favourite, favourites[user, rng.integers(0, 2, size=draws)], rng.integers(0, genres, size=draws))
+    # Power-law rank within the genre: low ranks are the popular titles
+    rank = (rng.random(draws) ** 3 * genre_size[genre]).astype(np.int64)
+    item = genre_order[genre_start[genre] + np.minimum(rank, genre_size[genre] - 1)]
+
+    _, first = np.unique(user.astype(np.int64) * items + item, return_index=True)
+    first = np.sort(first)[:ratings]
+    user, item, in_favourite = user[first], item[first], in_favourite[first]
+
+    score = np.where(in_favourite, 4.0, 2.7) + rng.normal(0, 0.9, size=len(user))
+    rating = np.clip(np.rint(score), 1, 5).astype(np.float32)
+    return user.astype(np.int64), item.astype(np.int64) + 1, rating
+
+
+def hold_out(user_ids, item_ids, ratings, eval_users: int, seed: int = 0):
+    """Hide one rating >= 4 for up to `eval_users` users; returns (train mask, {user: hidden item})"""
+    rng = np.random.default_rng(seed)
+    liked = np.flatnonzero(ratings >= 4)
+    rng.shuffle(liked)
+    _, first = np.unique(user_ids[liked], return_index=True)
+    picked = liked[first]
+    picked = picked[rng.permutation(len(picked))[:eval_users]]
+
+    train = np.ones(len(user_ids), dtype=bool)
+    train[picked] = False
+    return train, dict(zip(user_ids[picked].tolist(), item_ids[picked].tolist()))
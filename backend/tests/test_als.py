@@ -0,0 +1,47 @@
+import numpy as np
+from app.recommender.als import ALS
+
+
+def fitted() -> ALS:
+    # Item 10 is the most watched, then 20; 30 and 40 once each
+    interactions = [
+        (1, 10, 5), (1, 20, 4), (2, 10, 5), (2, 30, 4), (3, 10, 4), (3, 20, 5), (4, 40, 5), (4, 10, 3)
+    ]
+    users, items, values = zip(*interactions)
+    return ALS(factors=4, iterations=5, threads=1).fit(users, items, np.array(values, dtype=np.float32))
+
+
+def test_cold_start_user_gets_popular_items():
+    model = fitted()
+
+    recommended, scores = model.recommend([], [], k=3)
+
+    assert recommended.tolist()[:2] == [10, 20]
+    assert len(recommended) == 3
+    assert (scores == 0).all()
+
+
+def test_cold_start_with_only_unknown_items_respects_exclude_and_allowed():
+    model = fitted()
+    allowed = np.isin(model.item_ids, [20, 30, 40])
+
+    recommended, _ = model.recommend([999], [5.0], k=5, exclude=[20], allowed=allowed)
+
+    assert recommended.tolist() == [30, 40]
+
+
+def test_known_user_is_scored_by_factors():
+    model = fitted()
+
+    recommended, scores = model.recommend([10, 20], [5.0, 5.0], k=2)
+
+    assert 10 not in recommended and 20 not in recommended
+    assert len(recommended) == 2 and scores[0] >= scores[1]
+
+
+def test_saved_model_keeps_popularity(tmp_path):
+    fitted().save(str(tmp_path))
+
+    recommended, _ = ALS.load(str(tmp_path)).recommend([], [], k=2)
+
+    assert recommended.tolist() == [10, 20]
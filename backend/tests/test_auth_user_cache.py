@@ -0,0 +1,27 @@
+from fastapi.security import HTTPAuthorizationCredentials
+from app.models import User
+from app.utils import jwt_utils
+
+
+def current_user(db, user_id: int):
+    token = jwt_utils.create_access_token({"sub": user_id})
+    return jwt_utils.get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+
+
+def test_cached_user_is_dropped_by_invalidate_user(engine, db, statements):
+    jwt_utils.user_cache.clear()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "email": "u1@test", "username": "u1", "password_hash": "x"}])
+
+    assert current_user(db, 1).username == "u1"
+    statements.clear()
+    # The next request reads the cached row
+    assert current_user(db, 1).username == "u1"
+    assert statements == []
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.update().values(username="renamed"))
+    jwt_utils.invalidate_user(1)
+
+    assert current_user(db, 1).username == "renamed"
+    jwt_utils.user_cache.clear()
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.models import Content, Platform, StreamingAvailability
+from app.services import streaming_service
+
+
+@pytest.fixture
+def catalog(engine):
+    with engine.begin() as conn:
+        conn.execute(Platform.__table__.insert(), [
+            {"id": 1, "name": "netflix", "display_name": "Netflix", "tmdb_provider_id": 8},
+            {"id": 2, "name": "hulu", "display_name": "Hulu", "tmdb_provider_id": 15},
+        ])
+        conn.execute(Content.__table__.insert(), [{"id": i, "title": f"Title {i}", "type": "movie"} for i in (1, 2)])
+
+
+def platforms_of(engine, content_id: int) -> list:
+    db = sessionmaker(bind=engine)()
+    try:
+        return sorted(
+            (record.platform_id or 0)
+            for record in db.query(StreamingAvailability).filter(StreamingAvailability.content_id == content_id)
+        )
+    finally:
+        db.close()
+
+
+def test_batch_replaces_rows_and_drops_repeats(engine, db, catalog):
+    streaming_service.save_availability_batch(db, {(1, "US"): [{"provider_id": 8}, {"provider_id": 15}], (2, "US"): []})
+    written = streaming_service.save_availability_batch(
+        db, {(1, "US"): [{"provider_id": 15}, {"provider_id": 15}, {"provider_id": 999}]}
+    )
+
+    assert written == {(1, "US"): [2]}
+    assert platforms_of(engine, 1) == [2]
+    # No tracked platform still leaves a row marking the title checked
+    assert platforms_of(engine, 2) == [0]
+
+
+def test_failed_insert_keeps_the_old_rows(engine, db, catalog, monkeypatch):
+    streaming_service.save_availability_batch(db, {(1, "US"): [{"provider_id": 8}]})
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(db, "execute", fail)
+    with pytest.raises(RuntimeError):
+        streaming_service.save_availability_batch(db, {(1, "US"): [{"provider_id": 15}]})
+    monkeypatch.undo()
+
+    # The DELETE was rolled back with the INSERT, and the session is usable again
+    assert platforms_of(engine, 1) == [1]
+    assert db.query(StreamingAvailability).count() == 1
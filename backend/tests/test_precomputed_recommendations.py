@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models import Content, User, UserContent, UserRecommendation
+from app.services import rating_service, recommendation_service
+
+
+@pytest.fixture
+def live(monkeypatch):
+    """Replaces live scoring; records the users it was asked for"""
+    calls = []
+
+    def rank(db, user_id, k, region, available_only):
+        calls.append(user_id)
+        return [3], [0.5]
+
+    monkeypatch.setattr(recommendation_service, "_rank", rank)
+    recommendation_service.recommendation_cache.clear()
+    yield calls
+    recommendation_service.recommendation_cache.clear()
+
+
+def seed(engine, generated_at: datetime, rated_at: datetime):
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "email": "u1@test", "username": "u1", "password_hash": "x"}])
+        conn.execute(Content.__table__.insert(), [{"id": i, "title": f"Title {i}", "type": "movie"} for i in (1, 2, 3)])
+        conn.execute(UserContent.__table__.insert(), [
+            {"user_id": 1, "content_id": 3, "rating": 5, "status": "watched", "created_at": rated_at, "updated_at": rated_at}
+        ])
+        conn.execute(UserRecommendation.__table__.insert(), [
+            {"user_id": 1, "content_id": content_id, "region": "US", "rank": rank, "score": score,
+             "run_id": "run", "generated_at": generated_at}
+            for rank, (content_id, score) in enumerate([(2, 0.9), (1, 0.7)], start=1)
+        ])
+
+
+def recommended_ids(db, **kwargs) -> list[int]:
+    return [item["content"].id for item in recommendation_service.get_recommendations(db, 1, **kwargs)]
+
+
+def test_fresh_batch_rows_are_served_without_scoring(engine, db, live):
+    now = datetime.utcnow()
+    seed(engine, generated_at=now - timedelta(hours=1), rated_at=now - timedelta(days=1))
+
+    assert recommended_ids(db) == [2, 1]
+    assert live == []
+
+
+def test_rating_after_the_batch_run_scores_live(engine, db, live):
+    now = datetime.utcnow()
+    seed(engine, generated_at=now - timedelta(hours=1), rated_at=now - timedelta(minutes=5))
+
+    assert recommended_ids(db) == [3]
+    assert live == [1]
+
+
+def test_old_batch_rows_are_ignored(engine, db, live):
+    now = datetime.utcnow()
+    seed(engine, generated_at=now - timedelta(days=30), rated_at=now - timedelta(days=60))
+
+    assert recommended_ids(db) == [3]
+    assert recommended_ids(db, available_only=False) == [3]
+    assert live == [1, 1]
+
+
+def test_deleting_a_rating_discards_the_batch_rows(engine, db, live):
+    now = datetime.utcnow()
+    seed(engine, generated_at=now - timedelta(hours=1), rated_at=now - timedelta(days=1))
+
+    rating_service.delete_rating(db, 1, 3)
+
+    assert db.query(UserRecommendation).count() == 0
+    assert recommended_ids(db) == [3]
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models import Content, User, UserContent
+from app.routes.user import _rating_item
+from app.services.rating_service import get_user_ratings
+
+
+def seed(engine, ratings: int):
+    now = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "email": "u1@test", "username": "u1", "password_hash": "x"}])
+        conn.execute(Content.__table__.insert(), [
+            {"id": i, "title": f"Title {i}", "type": "movie", "poster_path": f"/p{i}.jpg", "release_year": 2000}
+            for i in range(1, ratings + 1)
+        ])
+        conn.execute(UserContent.__table__.insert(), [
+            {
+                "user_id": 1, "content_id": i, "rating": 1 + i % 5, "status": "watched",
+                "created_at": now - timedelta(minutes=i), "updated_at": now - timedelta(minutes=i)
+            }
+            for i in range(1, ratings + 1)
+        ])
+
+
+def list_ratings(db, statements, **kwargs) -> tuple[list, int]:
+    statements.clear()
+    result = get_user_ratings(db, 1, **kwargs)
+    # Reading the content the way the route does must not go back to the database
+    items = [_rating_item(user_content) for user_content in result["ratings"]]
+    return items, len(statements)
+
+
+@pytest.mark.parametrize("count_mode", ["exact", "estimate", "none"])
+def test_listing_ratings_runs_a_fixed_number_of_queries(engine, db, statements, count_mode):
+    seed(engine, 60)
+
+    few, few_queries = list_ratings(db, statements, limit=5, count_mode=count_mode)
+    db.expunge_all()
+    many, many_queries = list_ratings(db, statements, limit=50, count_mode=count_mode)
+
+    assert len(few) == 5 and len(many) == 50
+    assert all(item["content"]["title"] == f"Title {item['content_id']}" for item in many)
+    assert many_queries == few_queries
+    assert few_queries == (1 if count_mode == "none" else 2)
+
+
+def test_cursor_pages_run_a_fixed_number_of_queries(engine, db, statements):
+    seed(engine, 60)
+
+    first = get_user_ratings(db, 1, limit=20, count_mode="none")
+    db.expunge_all()
+    items, queries = list_ratings(db, statements, limit=20, cursor=first["next_cursor"], count_mode="none")
+
+    assert [item["content_id"] for item in items] == list(range(21, 41))
+    assert queries == 1
@@ -0,0 +1,48 @@
+from app.recommender.recommendation_cache import RecommendationCache
+
+
+def test_invalidating_a_user_drops_their_entries_and_in_flight_results():
+    cache = RecommendationCache(max_entries=10, ttl=60)
+    cache.set((1, "US", True), [10, 20], [0.9, 0.8], token=cache.token(1))
+    stale_token = cache.token(1)
+
+    cache.invalidate_user(1)
+    cache.set((1, "US", True), [30], [0.5], token=stale_token)
+
+    assert cache.get((1, "US", True)) is None
+    assert cache.stats()["discarded"] == 1
+
+
+def test_user_generations_stay_bounded():
+    cache = RecommendationCache(max_entries=3, ttl=60)
+
+    for user_id in range(100):
+        cache.invalidate_user(user_id)
+
+    assert cache.stats()["tracked_users"] == 3
+
+
+def test_token_from_before_an_invalidation_pushed_out_still_fails():
+    cache = RecommendationCache(max_entries=2, ttl=60)
+    stale_token = cache.token(1)
+    cache.invalidate_user(1)
+    # Users 2 and 3 push user 1's generation out of the bounded map
+    cache.invalidate_user(2)
+    cache.invalidate_user(3)
+
+    cache.set((1, "US", True), [10], [0.9], token=stale_token)
+    assert cache.get((1, "US", True)) is None
+
+    cache.set((1, "US", True), [10], [0.9], token=cache.token(1))
+    assert cache.get((1, "US", True)) == ([10], [0.9])
+
+
+def test_invalidating_content_drops_entries_listing_it():
+    cache = RecommendationCache(max_entries=10, ttl=60)
+    cache.set((1, "US", True), [10, 20], [0.9, 0.8], token=cache.token(1))
+    cache.set((2, "US", True), [30], [0.7], token=cache.token(2))
+
+    cache.invalidate_content([(20, "US")])
+
+    assert cache.get((1, "US", True)) is None
+    assert cache.get((2, "US", True)) == ([30], [0.7])
@@ -0,0 +1,109 @@
+import time
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+from app.models import Content, User, UserContent
+from app.recommender.artifacts import ArtifactStore
+from app.recommender.item_knn import ItemKNN
+from app.services import recommendation_service, streaming_service
+
+
+@pytest.fixture
+def untrained(engine, monkeypatch):
+    monkeypatch.setattr(recommendation_service, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(recommendation_service, "artifact_store", None)
+    monkeypatch.setattr(recommendation_service, "_model", None)
+    monkeypatch.setattr(recommendation_service, "_model_built_at", None)
+    recommendation_service.recommendation_cache.clear()
+    yield
+    recommendation_service.recommendation_cache.clear()
+
+
+def wait_for_model(timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while recommendation_service._model is None or recommendation_service._build_lock.locked():
+        assert time.monotonic() < deadline, "recommender model was not built"
+        time.sleep(0.01)
+
+
+def wait_for_lock(timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while recommendation_service._build_lock.locked():
+        assert time.monotonic() < deadline, "recommender build did not finish"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def artifact_worker(tmp_path, monkeypatch, untrained):
+    """A worker following an artifact store; records any attempt to train"""
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(recommendation_service, "artifact_store", store)
+    monkeypatch.setattr(recommendation_service, "_artifact_version", None)
+    trained = []
+    monkeypatch.setattr(recommendation_service, "build_model", lambda db: trained.append(db))
+    yield store, trained
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "email": f"u{i}@test", "username": f"u{i}", "password_hash": "x"} for i in (1, 2, 3)
+        ])
+        conn.execute(Content.__table__.insert(), [{"id": i, "title": f"Title {i}", "type": "movie"} for i in (1, 2, 3)])
+        conn.execute(UserContent.__table__.insert(), [
+            {"user_id": user_id, "content_id": content_id, "rating": 5, "status": "watched"}
+            for user_id, content_id in [(1, 1), (2, 1), (2, 2), (3, 1), (3, 2), (3, 3)]
+        ])
+
+
+def test_requests_get_503_until_the_background_build_finishes(engine, db, untrained):
+    seed(engine)
+
+    with pytest.raises(HTTPException) as raised:
+        recommendation_service.get_recommendations(db, 1, available_only=False)
+    assert raised.value.status_code == 503
+    assert int(raised.value.headers["Retry-After"]) > 0
+
+    wait_for_model()
+    results = recommendation_service.get_recommendations(db, 1, available_only=False)
+
+    assert [item["content"].id for item in results][:1] == [2]
+    assert recommendation_service.stats()["trained"]
+
+
+def test_start_build_is_refused_while_a_build_is_running(untrained):
+    with recommendation_service._build_lock:
+        assert not recommendation_service.start_build()
+
+
+
+def test_artifact_workers_wait_for_a_published_version_instead_of_training(artifact_worker):
+    store, trained = artifact_worker
+
+    with pytest.raises(HTTPException) as raised:
+        recommendation_service.get_model()
+    assert raised.value.status_code == 503
+
+    wait_for_lock()
+    assert recommendation_service._model is None
+    assert trained == []
+
+
+def test_artifact_workers_load_the_published_version(engine, db, artifact_worker, monkeypatch):
+    store, trained = artifact_worker
+    seed(engine)
+    # What jobs/publish_model does in its own process
+    published = ItemKNN(neighbors=5)
+    published.fit(*recommendation_service.load_interactions(db))
+    version = store.publish(
+        {"item_knn": published.save, "platforms": streaming_service.platform_index.save},
+        meta={"trained_from": time.time(), "items": published.n_items}
+    )
+
+    with pytest.raises(HTTPException):
+        recommendation_service.get_model()
+    wait_for_model()
+
+    assert recommendation_service.stats()["artifact_version"] == version
+    assert recommendation_service.get_model().n_items == 3
+    assert trained == []
@@ -0,0 +1,38 @@
+import pytest
+from app.models import Content
+from app.services import search_service
+
+
+@pytest.fixture
+def catalog(engine, db, monkeypatch):
+    with engine.begin() as conn:
+        conn.execute(Content.__table__.insert(), [
+            {"id": i, "title": f"Alien {i}", "type": "movie" if i % 2 else "tv", "release_year": 1979 + i}
+            for i in range(1, 26)
+        ])
+    monkeypatch.setattr(search_service, "search_index", search_service.SearchIndex())
+    monkeypatch.setattr(search_service, "suggest_index", search_service.SuggestIndex())
+    monkeypatch.setattr(search_service, "_built_at", 0.0)
+    monkeypatch.setattr(search_service.settings, "SUGGEST_SNAPSHOT_DIR", None)
+    search_service.build_search_index(db)
+
+
+def test_local_pages_cover_the_local_matches(db, catalog):
+    first = search_service.search_local(db, "alien", page=1)
+    second = search_service.search_local(db, "alien", page=2)
+
+    assert first["source"] == "local" and len(first["results"]) == 20
+    assert len(second["results"]) == 5
+    assert first["total_pages"] == second["total_pages"] == 2
+    assert first["total_results"] == 25
+
+
+def test_pages_past_the_local_matches_go_to_tmdb(db, catalog):
+    assert search_service.search_local(db, "alien", page=3) is None
+    assert search_service.search_local(db, "alien", page=50) is None
+    assert search_service.search_local(db, "alien", page=50, min_results=1) is None
+
+
+def test_too_few_matches_go_to_tmdb(db, catalog):
+    assert search_service.search_local(db, "predator", page=1) is None
+    assert search_service.search_local(db, "predator", page=1, min_results=1) is None
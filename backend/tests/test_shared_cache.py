@@ -0,0 +1,120 @@
+import time
+import pytest
+from app.utils.cache_backends import CacheBackendError, RedisBackend, SQLiteBackend
+from app.utils.shared_cache import SharedCache
+from app.utils.ttl_cache import TTLCache
+from benchmarks.fake_redis import FakeRedisServer
+
+
+@pytest.fixture(params=["redis", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        yield SQLiteBackend(str(tmp_path / "cache.db"))
+        return
+    with FakeRedisServer() as server:
+        yield RedisBackend(server.url, timeout=1)
+
+
+class FailingBackend:
+    """A store that is down"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _fail(self, *args):
+        self.calls += 1
+        raise CacheBackendError("store is down")
+
+    get_many = set_many = delete_many = clear = _fail
+
+    def stats(self) -> dict:
+        return {"backend": "failing"}
+
+
+def test_get_and_set_round_trip(backend):
+    cache = SharedCache(backend, "test", ttl=60)
+    cache.set(("search", "alien", 1), {"results": [{"id": 1}], "page": 1})
+
+    assert cache.get(("search", "alien", 1)) == {"results": [{"id": 1}], "page": 1}
+    assert cache.get(("search", "alien", 2), "default") == "default"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(backend):
+    cache = SharedCache(backend, "test", ttl=0.2)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    time.sleep(0.3)
+    assert cache.get("key") is None
+
+
+def test_get_stale_answers_within_stale_ttl(backend):
+    cache = SharedCache(backend, "test", ttl=0.2, stale_ttl=60)
+    cache.set("key", {"id": 1})
+    time.sleep(0.3)
+
+    assert cache.get("key") is None
+    assert cache.get_stale("key") == {"id": 1}
+    assert cache.get_stale("other", "default") == "default"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_get_many_and_set_many(backend):
+    cache = SharedCache(backend, "test", ttl=60)
+    cache.set_many({("id", i): {"id": i} for i in range(5)})
+
+    found = cache.get_many([("id", i) for i in range(8)])
+
+    assert found == {("id", i): {"id": i} for i in range(5)}
+    assert cache.stats()["hits"] == 5 and cache.stats()["misses"] == 3
+
+
+def test_delete_and_clear_stay_in_namespace(backend):
+    cache, other = SharedCache(backend, "test", ttl=60), SharedCache(backend, "other", ttl=60)
+    cache.set_many({"a": 1, "b": 2})
+    other.set("a", 3)
+
+    cache.delete("a")
+    assert cache.get_many(["a", "b"]) == {"b": 2}
+    cache.clear()
+    assert cache.get("b") is None
+    assert other.get("a") == 3
+
+
+def test_failing_store_falls_back_to_local_cache():
+    backend = FailingBackend()
+    cache = SharedCache(backend, "test", ttl=60, stale_ttl=60, fallback=TTLCache(max_entries=10, ttl=60, stale_ttl=60))
+
+    cache.set("key", "value")
+    cache.set_many({"a": 1, "b": 2})
+
+    assert cache.get("key") == "value"
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+    assert cache.get_stale("a") == 1
+    cache.delete("a")
+    assert cache.get("a") is None
+    # Three errors open the breaker; after that the store is not called at all
+    assert backend.calls == 3
+    assert cache.stats()["errors"] == 3 and cache.stats()["circuit"] == "open"
+
+
+def test_failing_store_without_fallback_behaves_as_empty():
+    cache = SharedCache(FailingBackend(), "test", ttl=60)
+
+    cache.set("key", "value")
+
+    assert cache.get("key", "default") == "default"
+    assert cache.get_stale("key") is None
+    assert cache.get_many(["key"]) == {}
+
+
+def test_unreachable_redis_falls_back_to_local_cache():
+    with FakeRedisServer() as server:
+        url = server.url
+    cache = SharedCache(RedisBackend(url), "test", ttl=60, fallback=TTLCache(max_entries=10, ttl=60))
+
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    assert cache.stats()["errors"] == 2
@@ -0,0 +1,48 @@
+import time
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+from app.models import Content
+from app.recommender.content_similarity import ContentSimilarityIndex
+from app.services import similarity_service
+
+
+@pytest.fixture
+def unbuilt(engine, monkeypatch):
+    monkeypatch.setattr(similarity_service, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(similarity_service, "similarity_index", ContentSimilarityIndex(neighbors=5))
+    monkeypatch.setattr(similarity_service, "_built", False)
+
+
+def wait_for_build(timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not similarity_service._built or similarity_service._build_lock.locked():
+        assert time.monotonic() < deadline, "similarity index was not built"
+        time.sleep(0.01)
+
+
+def test_requests_get_503_until_the_background_build_finishes(engine, db, unbuilt):
+    with engine.begin() as conn:
+        conn.execute(Content.__table__.insert(), [
+            {"id": i, "title": f"Title {i}", "type": "movie", "genres": ["Drama", "Crime" if i % 2 else "Comedy"],
+             "director": "Someone", "overview": f"A story about {'crime' if i % 2 else 'jokes'}"}
+            for i in range(1, 7)
+        ])
+
+    with pytest.raises(HTTPException) as raised:
+        similarity_service.get_similar_content(db, 1)
+    assert raised.value.status_code == 503
+    assert int(raised.value.headers["Retry-After"]) > 0
+
+    wait_for_build()
+    results = similarity_service.get_similar_content(db, 1, limit=3)
+
+    assert 0 < len(results) <= 3
+    assert 1 not in [item["content"].id for item in results]
+    assert similarity_service.stats()["built"]
+
+
+def test_start_build_runs_once(engine, unbuilt):
+    assert similarity_service.start_build()
+    wait_for_build()
+    assert not similarity_service.start_build()
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from app.utils.single_flight import AsyncSingleFlight
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight, calls = AsyncSingleFlight(), []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "row"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        return results, calls, flight.stats()
+
+    results, calls, stats = run(scenario())
+    assert results == ["row"] * 5
+    assert len(calls) == 1
+    assert stats == {"in_flight": 0, "executions": 1, "coalesced": 4}
+
+
+def test_cancelling_the_first_caller_leaves_the_others_their_result():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "row"
+
+        leader = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.do("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return leader, await asyncio.gather(*followers), flight.stats()
+
+    leader, results, stats = run(scenario())
+    assert leader.cancelled()
+    assert results == ["row"] * 3
+    assert stats["in_flight"] == 0 and stats["executions"] == 1
+
+
+def test_errors_reach_every_caller_and_the_key_is_freed():
+    async def scenario():
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise LookupError("not on TMDB")
+
+        results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+        return results, flight.stats()
+
+    results, stats = run(scenario())
+    assert all(isinstance(result, LookupError) for result in results)
+    assert stats["in_flight"] == 0
+
+
+def test_a_call_whose_callers_all_went_away_still_finishes():
+    async def scenario():
+        flight, stored = AsyncSingleFlight(), []
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            stored.append("row")
+
+        caller = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0.05)
+        return stored, flight.stats()
+
+    stored, stats = run(scenario())
+    assert stored == ["row"]
+    assert stats["in_flight"] == 0
@@ -0,0 +1,29 @@
+from app.services.tmdb_client import TMDBGovernor
+
+
+def make_governor(**overrides) -> TMDBGovernor:
+    options = dict(
+        rate=100, burst=100, max_wait=1, retries=2, base_delay=0.25, max_delay=4,
+        failure_threshold=5, reset_timeout=30
+    )
+    return TMDBGovernor(**{**options, **overrides})
+
+
+def test_retry_delay_backs_off_within_max_delay():
+    governor = make_governor()
+
+    assert 0 <= governor.retry_delay("/search/multi", 0) <= 0.25
+    assert 0 <= governor.retry_delay("/search/multi", 1) <= 0.5
+    assert governor.retry_delay("/search/multi", 2) is None
+    assert governor.stats()["endpoints"]["/search/multi"]["retries"] == 2
+
+
+def test_retry_delay_waits_out_a_short_retry_after():
+    assert make_governor().retry_delay("/search/multi", 0, "3") >= 3
+
+
+def test_retry_after_past_max_delay_gives_up_instead_of_truncating():
+    governor = make_governor()
+
+    assert governor.retry_delay("/search/multi", 0, "10") is None
+    assert "/search/multi" not in governor.stats()["endpoints"]